@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# MICRO-BATCHING PENTRU EMBEDDINGS
+# =========================
+# Request-urile care cer un embedding în aceeași fereastră scurtă (ex: 15 ms)
+# sunt trimise providerului într-un singur apel batch; fiecare apelant primește
+# vectorul lui. Mai puține round-trip-uri și mai puțină presiune pe rate limit.
+
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "15"))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+
+
+class EmbeddingBatcher:
+    def __init__(self, provider, window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch: int = EMBED_BATCH_MAX):
+        self.provider = provider
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending = []
+        self._timer = None
+        self._loop = None
+        self._tasks = set()  # referințe la batch-urile în zbor (loop-ul ține doar weak refs)
+        self.batches_sent = 0
+        self.texts_sent = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch > 1
+
+    async def embed(self, text: str):
+        """Vectorul pentru `text` (sau None dacă providerul a eșuat)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Alt event loop (ex: teste / restart) - nu amestecăm future-uri între loop-uri
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._send_done)
+
+    def _send_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Embedding Batch Task Error: %r", task.exception())
+
+    async def _send(self, batch):
+        # Textele identice din același batch se trimit o singură dată
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches_sent += 1
+        self.texts_sent += len(unique_texts)
+
+        by_text = {}
+        try:
+            vectors = await self.provider.aembed(unique_texts)
+            if vectors and len(vectors) == len(unique_texts):
+                by_text = dict(zip(unique_texts, vectors))
+        except Exception as e:
+            logger.warning("Embedding Batch Error: %s", e)
+        finally:
+            # Și la anulare: niciun apelant nu rămâne să aștepte un future nerezolvat
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text.get(text))
@@ -0,0 +1,467 @@
+"""
+Benchmark offline pentru drumul critic al analizei (fără Groq / HF reali).
+
+Providerii sunt înlocuiți cu dubluri deterministe (embeddings "hashing" + JSON fix
+de la "Groq"), cu latență configurabilă. Corpusul e generat determinist într-o bază
+SQLite separată și crește treptat până la fiecare dimensiune cerută.
+
+Scenarii, pentru fiecare dimensiune de corpus:
+    similarity  - `ml_logic.calculate_similarity` (vector deja calculat)
+    analyze     - `ml_logic.analyze_new_dream` (sincron, cu sesiune DB)
+    endpoint    - `POST /dreams/` prin ASGI, cu N clienți concurenți
+    cold_start  - proces nou: `import main` + lifespan + prewarm (main.STARTUP_TIMES)
+
+Exemple:
+    python benchmark.py
+    python benchmark.py --sizes 10 1000 100000 --concurrency 1 8 32
+    python benchmark.py --embed-latency-ms 0 --groq-latency-ms 0 --output bench.json
+    python benchmark.py --compare benchmark_results/old.json --max-regression 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import embeddings
+import metrics
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+
+# Vocabular pentru visele generate (suficient de mic ca să apară și potriviri reale)
+MOTIFS = [
+    "ocean", "teeth", "flying", "falling", "snake", "house", "mother", "school", "exam",
+    "forest", "train", "mirror", "fire", "water", "stairs", "door", "dog", "wolf",
+    "bridge", "storm", "city", "garden", "child", "key", "moon", "car", "river", "tower",
+]
+# Rulat într-un proces nou (cold start real): providerul fals, import, lifespan, prewarm
+COLD_START_SCRIPT = """
+import asyncio, json, time
+import embeddings
+provider = embeddings.HashingEmbeddingProvider({dim})
+provider.name = "bench/hashing-{dim}"
+embeddings._provider = provider
+
+import main
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        if main.app.state.prewarm_task is not None:
+            await main.app.state.prewarm_task
+
+asyncio.run(boot())
+print(json.dumps(main.STARTUP_TIMES))
+"""
+COLD_START_RUNS = 10
+
+PLACES = ["at night", "in my old school", "under the sea", "in a dark forest", "on a rooftop",
+          "in a crowded station", "in my grandmother's house", "above the clouds"]
+FEELINGS = ["afraid", "calm", "lost", "happy", "anxious", "curious", "ashamed", "free"]
+
+
+# =========================
+# DUBLURI PENTRU PROVIDERI
+# =========================
+class FakeEmbeddingProvider(embeddings.HashingEmbeddingProvider):
+    """Vectori determiniști (hashing) + latență simulată per apel (ca un API remote)."""
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0):
+        super().__init__(dim)
+        self.name = f"bench/hashing-{dim}"
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def vectors(self, texts: list) -> list:
+        """Fără latență - pentru generarea corpusului."""
+        return super().embed(texts)
+
+    def embed(self, texts: list, timeout: float = None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.vectors(texts)
+
+    async def aembed(self, texts: list):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.vectors(texts)
+
+
+class FakeGroq:
+    """Răspuns JSON fix (aceeași schemă ca promptul Groq), derivat determinist din text."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def _canned(self, dream_text: str) -> dict:
+        words = [w.strip(".,") for w in dream_text.lower().split()]
+        motifs = [m for m in MOTIFS if m in words][:5] or ["unknown"]
+        return {
+            "summary": f"A dream about {', '.join(motifs)}.",
+            "motifs": motifs,
+            "emotions": [f for f in FEELINGS if f in words][:3],
+            "themes": ["transformation", "control"] if "falling" in words else ["freedom", "memory"],
+            "interpretation": "Benchmark interpretation.",
+            "advice": "What are you holding on to?",
+        }
+
+    def interpret(self, dream_text: str, timeout: float = None) -> dict:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._canned(dream_text)
+
+    async def ainterpret(self, dream_text: str) -> dict:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._canned(dream_text)
+
+
+def dream_text(rng: random.Random, serial: int) -> str:
+    motifs = rng.sample(MOTIFS, 3)
+    return (
+        f"I saw a {motifs[0]} and a {motifs[1]} {rng.choice(PLACES)}, "
+        f"then the {motifs[2]} appeared and I felt {rng.choice(FEELINGS)}. Entry {serial}."
+    )
+
+
+# =========================
+# MĂSURĂTORI
+# =========================
+def percentiles(samples_ms: list) -> dict:
+    if not samples_ms:
+        return {"n": 0}
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+STAGES = ("sanitize", "groq", "embedding", "db_fetch", "scoring", "commit")
+
+
+def stage_totals() -> dict:
+    """(count, sum) pe etapă din histogramele `metrics` - diferența între două citiri = un scenariu."""
+    return {s: metrics.stage_seconds.snapshot(stage=s) for s in STAGES}
+
+
+def stage_breakdown(before: dict, after: dict) -> dict:
+    """Media (ms) pe apel pentru fiecare etapă care a rulat între cele două citiri."""
+    out = {}
+    for stage in STAGES:
+        count = after[stage]["count"] - before[stage]["count"]
+        if count:
+            out[stage] = round(1000 * (after[stage]["sum"] - before[stage]["sum"]) / count, 3)
+    return out
+
+
+def peak_memory_mb(fn, *args) -> float:
+    """Vârful de memorie Python alocată în timpul lui `fn` (rulare separată, netemporizată)."""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux raportează în KB, macOS în bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+# =========================
+# RULARE
+# =========================
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.serial = 0
+        self.start_day = date(2024, 1, 1)
+        self.results = []
+
+        # Providerii falși trebuie instalați ÎNAINTE de importul ml_logic / main
+        self.embedder = FakeEmbeddingProvider(args.dim, args.embed_latency_ms)
+        embeddings._provider = self.embedder
+        self.groq = FakeGroq(args.groq_latency_ms)
+
+        global models, ml_logic, main, SessionLocal
+        import models, ml_logic, main
+        from database import SessionLocal, engine, migrate_schema
+        migrate_schema(engine)  # main nu mai migrează la import (vezi lifespan)
+        ml_logic.interpret_dream_groq = self.groq.interpret
+        ml_logic.interpret_dream_groq_async = self.groq.ainterpret
+        # main.py configurează logging-ul la import; logurile per vis doar cu --verbose
+        logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    def next_entry(self):
+        self.serial += 1
+        text = dream_text(self.rng, self.serial)
+        day = self.start_day + timedelta(days=self.rng.randrange(730))
+        return text, day
+
+    # -------------------------
+    # CORPUS
+    # -------------------------
+    def grow_corpus(self, target: int) -> int:
+        from sqlalchemy import func, insert
+
+        db = SessionLocal()
+        try:
+            current = db.query(func.count(models.Dream.id)).scalar()
+            while current < target:
+                batch = [self.next_entry() for _ in range(min(2000, target - current))]
+                vectors = self.embedder.vectors([t for t, _ in batch])
+                db.execute(insert(models.Dream), [
+                    {
+                        "content": text, "date_occurred": day, "cluster_label": "UNIQUE",
+                        "similarity_percentage": 0, "similar_count": 0, "interpretation": "seed",
+                        **ml_logic.embedding_columns(vec),
+                    }
+                    for (text, day), vec in zip(batch, vectors)
+                ])
+                db.commit()
+                current += len(batch)
+            # Indexul in-memory se încarcă (o dată) în afara măsurătorilor
+            ml_logic.sync_similarity_index_from_db(db)
+            return current
+        finally:
+            db.close()
+
+    def record(self, corpus_size: int, scenario: str, samples: list, stages_before: dict, **extra):
+        row = {
+            "corpus_size": corpus_size, "scenario": scenario, **percentiles(samples), **extra,
+            "stage_mean_ms": stage_breakdown(stages_before, stage_totals()),
+        }
+        self.results.append(row)
+        tail = " ".join(f"{k}={v}" for k, v in extra.items())
+        print(f"  {scenario:<22} p50={row.get('p50_ms')}ms p95={row.get('p95_ms')}ms p99={row.get('p99_ms')}ms {tail}")
+
+    # -------------------------
+    # SCENARII
+    # -------------------------
+    def bench_similarity(self, size: int):
+        entries = [self.next_entry() for _ in range(self.args.iterations)]
+        vectors = self.embedder.vectors([t for t, _ in entries])
+
+        def run(pairs):
+            for (text, day), vec in pairs:
+                ml_logic.calculate_similarity(text, None, datetime.combine(day, datetime.min.time()), new_vec=vec)
+
+        samples, before = [], stage_totals()
+        for pair in zip(entries, vectors):
+            t0 = time.perf_counter()
+            run([pair])
+            samples.append((time.perf_counter() - t0) * 1000)
+        peak = peak_memory_mb(run, list(zip(entries, vectors))[:10])
+        self.record(size, "calculate_similarity", samples, before, peak_memory_mb=peak)
+
+    def bench_analyze(self, size: int):
+        entries = [self.next_entry() for _ in range(self.args.iterations)]
+
+        def run(batch):
+            db = SessionLocal()
+            try:
+                for text, day in batch:
+                    ml_logic.analyze_new_dream(text, current_date_str=day.isoformat(), db=db)
+            finally:
+                db.close()
+
+        samples, before = [], stage_totals()
+        for entry in entries:
+            t0 = time.perf_counter()
+            run([entry])
+            samples.append((time.perf_counter() - t0) * 1000)
+        peak = peak_memory_mb(run, [self.next_entry() for _ in range(10)])
+        self.record(size, "analyze_new_dream", samples, before, peak_memory_mb=peak)
+
+    def bench_cold_start(self, size: int):
+        script = COLD_START_SCRIPT.format(dim=self.args.dim)
+        env = {**os.environ, "LOG_LEVEL": "WARNING", "MIGRATE_ON_STARTUP": "1", "PREWARM_ON_STARTUP": "1"}
+        env.pop("GROQ_API_KEY", None)
+        samples, phases, before = [], [], stage_totals()
+        for _ in range(min(self.args.iterations, COLD_START_RUNS)):
+            t0 = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+            samples.append((time.perf_counter() - t0) * 1000)
+            phases.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        mean_ms = lambda phase: round(1000 * sum(p.get(phase, 0) for p in phases) / len(phases), 3)
+        self.record(size, "cold_start", samples, before, import_ms=mean_ms("import"),
+                    startup_ms=mean_ms("startup"), prewarm_ms=mean_ms("prewarm"))
+
+    async def _endpoint_run(self, concurrency: int, total: int):
+        import httpx
+
+        entries = [self.next_entry() for _ in range(total)]
+        queue = asyncio.Queue()
+        for entry in entries:
+            queue.put_nowait(entry)
+        samples, errors = [], 0
+
+        async def client_loop(client):
+            nonlocal errors
+            while not queue.empty():
+                text, day = queue.get_nowait()
+                t0 = time.perf_counter()
+                response = await client.post("/dreams/", json={"content": text, "date_occurred": day.isoformat()})
+                samples.append((time.perf_counter() - t0) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+            wall = time.perf_counter() - t0
+        return samples, errors, wall
+
+    def bench_endpoint(self, size: int):
+        for concurrency in self.args.concurrency:
+            total = max(self.args.iterations, concurrency * 4)
+            before = stage_totals()
+            samples, errors, wall = asyncio.run(self._endpoint_run(concurrency, total))
+            self.record(
+                size, f"endpoint[c={concurrency}]", samples, before,
+                concurrency=concurrency, throughput_rps=round(len(samples) / wall, 2), errors=errors,
+            )
+
+    def run(self):
+        scenarios = set(self.args.scenarios)
+        for size in sorted(self.args.sizes):
+            t0 = time.perf_counter()
+            actual = self.grow_corpus(size)
+            print(f"📚 Corpus: {actual} vise (seed {time.perf_counter() - t0:.1f}s, index {len(ml_logic.get_similarity_index())})")
+            if "similarity" in scenarios:
+                self.bench_similarity(size)
+            if "analyze" in scenarios:
+                self.bench_analyze(size)
+            if "cold_start" in scenarios:
+                self.bench_cold_start(size)
+            # Endpoint-ul salvează vise noi, deci rulează ultimul la fiecare dimensiune
+            if "endpoint" in scenarios:
+                self.bench_endpoint(size)
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "config": {
+                    "sizes": sorted(self.args.sizes), "iterations": self.args.iterations,
+                    "concurrency": self.args.concurrency, "dim": self.args.dim, "seed": self.args.seed,
+                    "embed_latency_ms": self.args.embed_latency_ms, "groq_latency_ms": self.args.groq_latency_ms,
+                    "index_mode": os.getenv("SIMILARITY_INDEX_MODE", "exact"),
+                    "index_storage": os.getenv("SIMILARITY_INDEX_STORAGE", "float32"),
+                    "index_shards": os.getenv("SIMILARITY_SHARDS", str(os.cpu_count())),
+                },
+                "provider_calls": {"embedding": self.embedder.calls, "groq": self.groq.calls},
+                "max_rss_mb": max_rss_mb(),
+            },
+            "results": self.results,
+        }
+
+
+# =========================
+# COMPARARE ÎNTRE COMMIT-URI
+# =========================
+def compare(baseline: dict, current: dict, metric: str = "p95_ms") -> float:
+    """Afișează diferențele pe `metric` și returnează cea mai mare regresie (%)."""
+    old = {(r["corpus_size"], r["scenario"]): r for r in baseline.get("results", [])}
+    worst = 0.0
+    print(f"\n🔎 vs {baseline.get('meta', {}).get('commit', '?')} ({metric}):")
+    for row in current["results"]:
+        prev = old.get((row["corpus_size"], row["scenario"]))
+        if not prev or not prev.get(metric) or metric not in row:
+            continue
+        change = 100.0 * (row[metric] - prev[metric]) / prev[metric]
+        worst = max(worst, change)
+        print(f"  {row['corpus_size']:>7} {row['scenario']:<22} {prev[metric]:>10.3f} -> {row[metric]:>10.3f} ({change:+.1f}%)")
+    return worst
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the dream analysis hot path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--scenarios", nargs="+", default=["similarity", "analyze", "cold_start", "endpoint"],
+                        choices=["similarity", "analyze", "cold_start", "endpoint"])
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per scenario and corpus size")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0)
+    parser.add_argument("--groq-latency-ms", type=float, default=400.0)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="SQLite file (default: a temporary file)")
+    parser.add_argument("--output", default=None, help="JSON results path (default: benchmark_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare p95 latency against")
+    parser.add_argument("--max-regression", type=float, default=None, help="Exit 1 if any p95 regresses by more than N percent")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-dream logs from ml_logic")
+    args = parser.parse_args(argv)
+
+    # Baza de benchmark e mereu separată de cea reală
+    tmp_dir = None
+    if args.db is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="dream-bench-")
+        args.db = os.path.join(tmp_dir.name, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+
+    try:
+        report = Bench(args).run()
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    output = args.output or os.path.join(
+        "benchmark_results", f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Rezultate salvate în {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            worst = compare(json.load(f), report)
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"❌ Regresie p95 de {worst:.1f}% (limită {args.max_regression}%)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import os
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+
+import models, schemas, ml_logic, dream_store, metrics, jobs
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# IMPORT JURNAL (POST /dreams/bulk)
+# =========================
+# Intrările vin ca JSON array sau NDJSON și sunt parsate pe măsură ce sosesc.
+# Pe fiecare chunk: embeddings într-un singur batch, interpretări Groq cu
+# concurență limitată, un singur INSERT multi-rând, apoi scoring + un UPDATE bulk.
+
+BULK_MAX_ENTRIES = int(os.getenv("BULK_MAX_ENTRIES", "1000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "64"))
+BULK_INTERPRET_CONCURRENCY = int(os.getenv("BULK_INTERPRET_CONCURRENCY", "4"))
+
+
+class BulkParseError(ValueError):
+    pass
+
+
+# -------------------------
+# PARSARE STREAMING
+# -------------------------
+async def iter_ndjson(chunks):
+    """Un obiect JSON pe linie; liniile goale sunt ignorate."""
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield _decode_line(line, line_no)
+    if buffer.strip():
+        yield _decode_line(buffer, line_no + 1)
+
+
+def _decode_line(line: bytes, line_no: int):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return BulkParseError(f"line {line_no}: {e}")
+
+
+async def iter_json_array(chunks):
+    """
+    Parsează incremental `[ {...}, {...} ]`: fiecare element e decodat imediat
+    ce e complet, fără să ținem tot body-ul în memorie.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    finished = False
+    pending = b""
+
+    async for chunk in chunks:
+        # Chunk-urile pot tăia un caracter UTF-8 multi-byte la mijloc
+        pending += chunk
+        try:
+            buffer += pending.decode("utf-8")
+            pending = b""
+        except UnicodeDecodeError as e:
+            buffer += pending[:e.start].decode("utf-8")
+            pending = pending[e.start:]
+
+        while not finished:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != "[":
+                    raise BulkParseError("Body must be a JSON array or NDJSON")
+                started = True
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith(","):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith("]"):
+                finished = True
+                break
+            if not buffer:
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                break  # element incomplet - așteptăm următorul chunk
+            yield item
+            buffer = buffer[end:]
+
+    if not finished:
+        raise BulkParseError("Unexpected end of JSON array")
+
+
+def iter_entries(chunks, content_type: str):
+    if "ndjson" in (content_type or "") or "jsonlines" in (content_type or ""):
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks)
+
+
+async def prefetch(entries):
+    """
+    Citește toate intrările (max BULK_MAX_ENTRIES + 1) înainte de a porni un răspuns
+    streaming: StreamingResponse ascultă `receive` pentru disconnect, deci body-ul nu
+    mai poate fi citit în paralel cu trimiterea rezultatelor.
+    """
+    items, error = [], None
+    try:
+        async for item in entries:
+            items.append(item)
+            if len(items) > BULK_MAX_ENTRIES:
+                break
+    except BulkParseError as e:
+        error = e
+
+    async def replay():
+        for item in items:
+            yield item
+        if error is not None:
+            raise error
+
+    return replay()
+
+
+# -------------------------
+# PROCESARE PE CHUNK-URI
+# -------------------------
+def _validate(raw, index: int):
+    if isinstance(raw, Exception):
+        return None, {"index": index, "status": "error", "error": str(raw)}
+    try:
+        return schemas.DreamCreate.model_validate(raw), None
+    except ValidationError as e:
+        return None, {"index": index, "status": "error", "error": e.errors(include_url=False, include_context=False)}
+
+
+def _insert_chunk(db, entries, analyses, embeddings) -> list:
+    """Un singur INSERT multi-rând; rândurile sunt în PROCESSING până la scoring."""
+    rows = []
+    for entry, analysis, vec in zip(entries, analyses, embeddings):
+        rows.append({
+            "content": entry["dream"].content,
+            "date_occurred": entry["date"],
+            "cluster_label": "PROCESSING",
+            "interpretation": (analysis or {}).get("summary", "Analysis processed."),
+            **ml_logic.embedding_columns(vec),
+        })
+    result = db.execute(insert(models.Dream).returning(models.Dream.id, sort_by_parameter_order=True), rows)
+    return [row.id for row in result]
+
+
+def _score_and_update_chunk(db, entries, ids, analyses, embeddings) -> list:
+    """
+    Scoring în ordinea jurnalului: fiecare vis e comparat cu tot corpusul + intrările
+    anterioare din chunk, apoi un singur UPDATE bulk (după primary key).
+    Indexul de similaritate primește visele doar după commit: un chunk eșuat (rollback)
+    nu lasă în index id-uri pe care SQLite le va da altor vise.
+    """
+    updates, results, pending, registrations, repairs = [], [], [], [], []
+    for entry, dream_id, analysis, vec in zip(entries, ids, analyses, embeddings):
+        current_date = ml_logic.parse_date(entry["date"].isoformat())
+        analysis_result = ml_logic.score_analyzed_dream(entry["clean_text"], analysis, vec, current_date, pending=pending)
+        if vec is not None:
+            pending.append((vec, entry["date"]))
+        registrations.append((dream_id, vec, entry["date"], analysis_result.get("simhash")))
+        if analysis_result.get("fallback"):
+            repairs.append(dream_id)
+
+        # Atributele pe care `apply_analysis` / `update_aggregates` le scriu
+        row = SimpleNamespace(id=dream_id, date_occurred=entry["date"], semantic_cluster_id=None, simhash=None)
+        dream_store.apply_analysis(row, analysis_result, ml_logic.embedding_columns(vec))
+        dream_store.update_aggregates(db, row, analysis_result)
+        updates.append({
+            "id": dream_id,
+            "cluster_label": row.cluster_label,
+            "similarity_percentage": row.similarity_percentage,
+            "similar_count": row.similar_count,
+            "interpretation": row.interpretation,
+            "analysis_json": row.analysis_json,
+            "semantic_cluster_id": row.semantic_cluster_id,
+            "simhash": row.simhash,
+        })
+        results.append({
+            "index": entry["index"],
+            "status": "created",
+            "id": dream_id,
+            "label": row.cluster_label,
+            "percentage": row.similarity_percentage,
+            "degraded": analysis_result.get("degraded", False),
+        })
+
+    db.execute(update(models.Dream), updates)
+    with metrics.timed("commit"):
+        db.commit()
+    for registration in registrations:
+        ml_logic.register_dream(*registration)
+    for dream_id in repairs:
+        jobs.job_queue.schedule_repair(dream_id)
+    return results
+
+
+async def _process_chunk(db, entries: list) -> list:
+    clean_texts = [e["clean_text"] for e in entries]
+
+    # Embeddings (un batch) și interpretări (concurență limitată) în paralel
+    embeddings, analyses = await asyncio.gather(
+        ml_logic.embed_texts_async(clean_texts),
+        ml_logic.interpret_texts_async(clean_texts, BULK_INTERPRET_CONCURRENCY),
+    )
+
+    def write():
+        try:
+            ids = _insert_chunk(db, entries, analyses, embeddings)
+            return _score_and_update_chunk(db, entries, ids, analyses, embeddings)
+        except Exception:
+            db.rollback()
+            raise
+
+    try:
+        return await asyncio.to_thread(write)
+    except Exception as e:
+        logger.error("❌ Bulk chunk eșuat: %s", e)
+        return [{"index": e_["index"], "status": "error", "error": "Database write failed"} for e_ in entries]
+
+
+async def import_dreams(db, raw_entries):
+    """
+    Async generator: primește intrările brute (parsate streaming) și produce
+    rezultatul pentru fiecare intrare, în ordinea în care chunk-urile se termină.
+    """
+    await asyncio.to_thread(ml_logic.sync_similarity_index_from_db, db)
+
+    chunk = []
+    index = -1
+    try:
+        async for raw in raw_entries:
+            index += 1
+            if index >= BULK_MAX_ENTRIES:
+                yield {"index": index, "status": "error", "error": f"Too many entries (max {BULK_MAX_ENTRIES})"}
+                break
+
+            dream, error = _validate(raw, index)
+            if error:
+                yield error
+                continue
+            chunk.append({
+                "index": index,
+                "dream": dream,
+                "clean_text": ml_logic.sanitize_text(dream.content),
+                "date": dream_store.parse_date_occurred(dream.date_occurred),
+            })
+
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                for result in await _process_chunk(db, chunk):
+                    yield result
+                chunk = []
+    except BulkParseError as e:
+        yield {"index": index + 1, "status": "error", "error": str(e)}
+
+    if chunk:
+        for result in await _process_chunk(db, chunk):
+            yield result
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+import models
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# CACHE (CONTENT-ADDRESSED) PENTRU GROQ + EMBEDDINGS
+# =========================
+# Cheia = sha256(tip + model + text sanitizat). Două niveluri:
+#   1. LRU în memorie (limită de mărime + TTL)
+#   2. tabela `analysis_cache` din DB (supraviețuiește restart-urilor)
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_DB_TTL_SECONDS = float(os.getenv("CACHE_DB_TTL_SECONDS", "0"))  # 0 = nu expiră
+CACHE_PERSISTENT = os.getenv("CACHE_PERSISTENT", "1") != "0"
+
+
+def content_key(kind: str, text: str, model: str) -> str:
+    return hashlib.sha256(f"{kind}\x00{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """LRU thread-safe cu TTL per intrare."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if self.ttl and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class AnalysisCache:
+    """
+    Cache pe două niveluri pentru rezultatele providerilor.
+    Rezultatele eșuate (None) nu se salvează niciodată.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS,
+                 persistent: bool = CACHE_PERSISTENT, db_ttl: float = CACHE_DB_TTL_SECONDS):
+        self.memory = LRUCache(maxsize, ttl)
+        self.persistent = persistent
+        self.db_ttl = db_ttl
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "inflight_joins": 0, "writes": 0, "db_errors": 0}
+        self._counters_lock = threading.Lock()
+        self._inflight = {}
+
+    def _bump(self, name: str):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        hits = counters["memory_hits"] + counters["db_hits"] + counters["inflight_joins"]
+        lookups = hits + counters["misses"]
+        counters["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        counters["memory_entries"] = len(self.memory)
+        return counters
+
+    # -------------------------
+    # NIVELUL 2 (DB)
+    # -------------------------
+    def _db_get(self, key: str):
+        if not self.persistent:
+            return None
+        db = SessionLocal()
+        try:
+            row = db.get(models.AnalysisCacheEntry, key)
+            if row is None:
+                return None
+            if self.db_ttl and row.created_at < datetime.utcnow() - timedelta(seconds=self.db_ttl):
+                return None
+            return json.loads(row.value)
+        except Exception as e:
+            self._bump("db_errors")
+            logger.warning("Cache DB Error: %s", e)
+            return None
+        finally:
+            db.close()
+
+    def _db_set(self, key: str, kind: str, model: str, value):
+        if not self.persistent:
+            return
+        db = SessionLocal()
+        try:
+            db.merge(models.AnalysisCacheEntry(
+                key=key, kind=kind, model=model,
+                value=json.dumps(value), created_at=datetime.utcnow(),
+            ))
+            db.commit()
+        except Exception as e:
+            # Ex: două request-uri identice scriu aceeași cheie simultan
+            db.rollback()
+            self._bump("db_errors")
+            logger.warning("Cache DB Error: %s", e)
+        finally:
+            db.close()
+
+    # -------------------------
+    # API PUBLIC
+    # -------------------------
+    def get(self, kind: str, text: str, model: str):
+        key = content_key(kind, text, model)
+        value = self.memory.get(key)
+        if value is not None:
+            self._bump("memory_hits")
+            return value
+        value = self._db_get(key)
+        if value is not None:
+            self._bump("db_hits")
+            self.memory.set(key, value)
+            return value
+        self._bump("misses")
+        return None
+
+    def set(self, kind: str, text: str, model: str, value):
+        if value is None:
+            return
+        key = content_key(kind, text, model)
+        self.memory.set(key, value)
+        self._db_set(key, kind, model, value)
+        self._bump("writes")
+
+    def get_or_compute(self, kind: str, text: str, model: str, compute):
+        value = self.get(kind, text, model)
+        if value is None:
+            value = compute(text)
+            self.set(kind, text, model, value)
+        return value
+
+    async def get_or_compute_async(self, kind: str, text: str, model: str, compute):
+        """
+        Ca `get_or_compute`, dar `compute` e o corutină. Request-urile identice
+        simultane (ex: dublu-submit din formular) așteaptă același apel, nu fac unul nou.
+        """
+        key = content_key(kind, text, model)
+        value = self.memory.get(key)
+        if value is not None:
+            self._bump("memory_hits")
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._bump("inflight_joins")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not pending.cancelled() or getattr(task, "cancelling", lambda: 0)():
+                    raise
+            # Doar apelantul care calcula a fost anulat (ex: client SSE deconectat), nu și noi:
+            # intrarea lui a fost ștearsă, deci calculăm noi (sau ne alăturăm următorului)
+            return await self.get_or_compute_async(kind, text, model, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await asyncio.to_thread(self._db_get, key)
+            if value is not None:
+                self._bump("db_hits")
+                self.memory.set(key, value)
+            else:
+                self._bump("misses")
+                value = await compute(text)
+                if value is not None:
+                    self.memory.set(key, value)
+                    await asyncio.to_thread(self._db_set, key, kind, model, value)
+                    self._bump("writes")
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marcăm excepția ca citită, chiar dacă nu așteaptă nimeni
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self.memory.clear()
+
+
+analysis_cache = AnalysisCache()
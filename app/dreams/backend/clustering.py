@@ -0,0 +1,191 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import models
+
+# =========================
+# CLUSTERE SEMANTICE (INCREMENTAL, PE ZI)
+# =========================
+# Clusterer online bazat pe prag (leader-follower cu medie mobilă):
+#   - visul nou intră în cel mai apropiat cluster al zilei dacă cos >= CLUSTER_JOIN_THRESHOLD
+#   - altfel deschide un cluster nou (până la CLUSTER_MAX_PER_DAY, apoi merge la cel mai apropiat)
+# Centroidul = suma vectorilor / mărime, deci actualizarea e exactă și O(dim).
+# Nu re-clusterizăm niciodată de la zero la afișare.
+
+CLUSTER_JOIN_THRESHOLD = float(os.getenv("CLUSTER_JOIN_THRESHOLD", "0.75"))
+CLUSTER_MAX_PER_DAY = int(os.getenv("CLUSTER_MAX_PER_DAY", "24"))
+CLUSTER_LABEL_MOTIFS = 2
+
+
+def _unit(vec: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+def _centroid(cluster: models.SemanticCluster) -> np.ndarray:
+    return _unit(np.frombuffer(cluster.vector_sum, dtype="<f4"))
+
+
+def _label(motif_counts: dict) -> str:
+    top = [m for m, _ in Counter(motif_counts).most_common(CLUSTER_LABEL_MOTIFS)]
+    return " / ".join(m.upper() for m in top) if top else "UNKNOWN / ABSTRACT"
+
+
+def _motifs(interpretation: dict) -> list:
+    motifs = []
+    for m in (interpretation or {}).get("motifs") or []:
+        if isinstance(m, str):
+            term = " ".join(m.lower().split())
+            if term and term not in motifs:
+                motifs.append(term)
+    return motifs
+
+
+def assign_dream(db: Session, db_dream: models.Dream, vec, interpretation: dict, model: str):
+    """
+    Asignează visul unui cluster al zilei lui și actualizează centroidul + motivele.
+    Nu face commit (se salvează odată cu visul). Returnează clusterul sau None fără vector.
+    """
+    if vec is None or len(vec) == 0:
+        return None
+    v = _unit(np.asarray(vec, dtype=np.float32).reshape(-1))
+    day = db_dream.date_occurred
+
+    query = (
+        db.query(models.SemanticCluster)
+        .filter(models.SemanticCluster.day == day)
+        .filter(models.SemanticCluster.embedding_model == model)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Doi workeri nu actualizează același centroid în paralel
+        query = query.with_for_update()
+    clusters = [c for c in query.all() if len(c.vector_sum) == v.nbytes]
+
+    best, best_score = None, -1.0
+    if clusters:
+        centroids = np.vstack([_centroid(c) for c in clusters])
+        scores = centroids @ v
+        idx = int(np.argmax(scores))
+        best, best_score = clusters[idx], float(scores[idx])
+
+    if best is None or (best_score < CLUSTER_JOIN_THRESHOLD and len(clusters) < CLUSTER_MAX_PER_DAY):
+        best = models.SemanticCluster(
+            day=day, embedding_model=model,
+            vector_sum=np.zeros_like(v).astype("<f4").tobytes(),
+            size=0, motif_counts="{}",
+        )
+        db.add(best)
+
+    best.vector_sum = (np.frombuffer(best.vector_sum, dtype="<f4") + v).astype("<f4").tobytes()
+    best.size = (best.size or 0) + 1
+    _count_motifs(best, interpretation)
+
+    db.flush()  # avem nevoie de id-ul clusterului nou
+    db_dream.semantic_cluster_id = best.id
+    return best
+
+
+def _count_motifs(cluster: models.SemanticCluster, interpretation: dict):
+    counts = json.loads(cluster.motif_counts or "{}")
+    for motif in _motifs(interpretation):
+        counts[motif] = counts.get(motif, 0) + 1
+    cluster.motif_counts = json.dumps(counts)
+    cluster.label = _label(counts)
+    cluster.updated_at = datetime.utcnow()
+
+
+def add_motifs(db: Session, db_dream: models.Dream, interpretation: dict):
+    """
+    Motivele unui vis deja asignat (fără motive - interpretarea reală a venit după salvare).
+    Centroidul și mărimea rămân. Nu face commit. Returnează clusterul sau None.
+    """
+    if db_dream.semantic_cluster_id is None:
+        return None
+    query = db.query(models.SemanticCluster).filter(models.SemanticCluster.id == db_dream.semantic_cluster_id)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()
+    cluster = query.first()
+    if cluster is not None:
+        _count_motifs(cluster, interpretation)
+    return cluster
+
+
+def clusters_for_range(db: Session, start, end, model: str, limit: int = 12, keywords: int = 5) -> list:
+    """
+    Clusterele din intervalul [start, end]. Pentru mai multe zile, clusterele zilnice
+    apropiate (cos >= prag) sunt unite - citim doar centroizii, nu visele.
+    """
+    rows = (
+        db.query(models.SemanticCluster)
+        .filter(models.SemanticCluster.day >= start)
+        .filter(models.SemanticCluster.day <= end)
+        .filter(models.SemanticCluster.embedding_model == model)
+        .order_by(models.SemanticCluster.size.desc(), models.SemanticCluster.id)
+        .all()
+    )
+
+    merged = []  # [suma vectorilor, mărime, Counter motive, set zile]
+    for row in rows:
+        vec_sum = np.frombuffer(row.vector_sum, dtype="<f4").astype(np.float32)
+        target = None
+        if start != end and merged:
+            centroids = np.vstack([_unit(m[0]) for m in merged])
+            scores = centroids @ _unit(vec_sum)
+            idx = int(np.argmax(scores))
+            if scores[idx] >= CLUSTER_JOIN_THRESHOLD:
+                target = merged[idx]
+        if target is None:
+            merged.append([vec_sum.copy(), row.size, Counter(json.loads(row.motif_counts or "{}")), {row.day}])
+        else:
+            target[0] += vec_sum
+            target[1] += row.size
+            target[2].update(json.loads(row.motif_counts or "{}"))
+            target[3].add(row.day)
+
+    total = sum(m[1] for m in merged) or 1
+    merged.sort(key=lambda m: -m[1])
+    return [
+        {
+            "label": _label(m[2]),
+            "count": m[1],
+            "percentage": int(round(100 * m[1] / total)),
+            "keywords": [k for k, _ in m[2].most_common(keywords)],
+            "start": min(m[3]).isoformat(),
+            "end": max(m[3]).isoformat(),
+        }
+        for m in merged[:limit]
+    ]
+
+
+def rebuild(db: Session, model: str) -> int:
+    """Re-clusterizează toate visele cu embedding (o singură dată, pentru date vechi)."""
+    db.query(models.Dream).update({"semantic_cluster_id": None}, synchronize_session=False)
+    db.query(models.SemanticCluster).delete()
+    db.commit()
+
+    ids = [r.id for r in (
+        db.query(models.Dream.id)
+        .filter(models.Dream.embedding.isnot(None))
+        .filter(models.Dream.embedding_model == model)
+        .order_by(models.Dream.id)
+        .all()
+    )]
+    for i, dream_id in enumerate(ids, 1):
+        db_dream = db.get(models.Dream, dream_id)
+        try:
+            extra = json.loads(db_dream.analysis_json) if db_dream.analysis_json else {}
+        except ValueError:
+            extra = {}
+        # Interpretarea de rezervă nu are motive reale (vezi `dream_store.update_aggregates`)
+        ai_data = None if extra.get("fallback") else extra.get("ai_data")
+        assign_dream(db, db_dream, np.frombuffer(db_dream.embedding, dtype="<f4"), ai_data, model)
+        if i % 500 == 0:
+            db.commit()
+            db.expunge_all()
+    db.commit()
+    return len(ids)
@@ -0,0 +1,138 @@
+import json
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+# =========================
+# AGREGATE ZILNICE (TEME + MOTIVE)
+# =========================
+# La fiecare vis analizat incrementăm contoarele zilei (în aceeași tranzacție),
+# iar `/dreams/stats/{date}` citește doar aceste tabele mici.
+
+MAX_TERM_LENGTH = 64
+
+
+def normalize_terms(values) -> list:
+    terms = []
+    for value in values or []:
+        if not isinstance(value, str):
+            continue
+        term = " ".join(value.lower().split())[:MAX_TERM_LENGTH]
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _upsert_increment(db: Session, model, keys: dict, counter: str = "count", extra: dict = None, versioned: bool = False):
+    """INSERT ... ON CONFLICT DO UPDATE counter = counter + 1 (atomic, SQLite și Postgres)."""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+    values = {**keys, counter: 1, **(extra or {})}
+    update = {counter: getattr(model, counter) + 1, **(extra or {})}
+    if versioned:
+        values["version"] = 1
+        update["version"] = model.version + 1
+
+    stmt = insert(model).values(**values).on_conflict_do_update(index_elements=list(keys), set_=update)
+    db.execute(stmt)
+
+
+def record_dream(db: Session, day, interpretation: dict, new_dream: bool = True):
+    """
+    Adaugă un vis la agregatele zilei `day`. Nu face commit -
+    se salvează odată cu visul, în aceeași tranzacție.
+    `interpretation=None`: visul se numără, fără teme / motive (interpretarea de rezervă).
+    `new_dream=False`: visul e deja numărat, se adaugă doar temele / motivele lui.
+    """
+    interpretation = interpretation or {}
+    themes = normalize_terms(interpretation.get("themes"))
+    motifs = normalize_terms(interpretation.get("motifs"))
+
+    if new_dream:
+        _upsert_increment(db, models.DailyDreamCount, {"day": day}, counter="total",
+                          extra={"updated_at": datetime.utcnow()}, versioned=True)
+    else:
+        # Totalul rămâne, dar versiunea crește: ETag-ul zilei se schimbă
+        db.query(models.DailyDreamCount).filter(models.DailyDreamCount.day == day).update(
+            {"version": models.DailyDreamCount.version + 1, "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+    for theme in themes:
+        _upsert_increment(db, models.DailyThemeStat, {"day": day, "theme": theme})
+        for motif in motifs:
+            _upsert_increment(db, models.DailyThemeMotif, {"day": day, "theme": theme, "motif": motif})
+
+
+def day_version(db: Session, day):
+    """(total, version, updated_at) pentru ziua `day`, sau None dacă nu există vise."""
+    row = db.get(models.DailyDreamCount, day)
+    if row is None:
+        return None
+    return row.total, row.version, row.updated_at
+
+
+def daily_clusters(db: Session, day, limit: int = 6, keywords: int = 5) -> list:
+    """
+    Temele dominante ale zilei, în formatul `DreamCluster` din frontend:
+    { date, dominant_topic, keywords, count }.
+    """
+    themes = (
+        db.query(models.DailyThemeStat.theme, models.DailyThemeStat.count)
+        .filter(models.DailyThemeStat.day == day)
+        .order_by(models.DailyThemeStat.count.desc(), models.DailyThemeStat.theme)
+        .limit(limit)
+        .all()
+    )
+    if not themes:
+        return []
+
+    motif_rows = (
+        db.query(models.DailyThemeMotif.theme, models.DailyThemeMotif.motif, models.DailyThemeMotif.count)
+        .filter(models.DailyThemeMotif.day == day)
+        .filter(models.DailyThemeMotif.theme.in_([t.theme for t in themes]))
+        .order_by(models.DailyThemeMotif.count.desc(), models.DailyThemeMotif.motif)
+        .all()
+    )
+    by_theme = {}
+    for row in motif_rows:
+        bucket = by_theme.setdefault(row.theme, [])
+        if len(bucket) < keywords:
+            bucket.append(row.motif)
+
+    return [
+        {
+            "date": day.isoformat(),
+            "dominant_topic": t.theme.upper(),
+            "keywords": by_theme.get(t.theme, []),
+            "count": t.count,
+        }
+        for t in themes
+    ]
+
+
+def rebuild(db: Session) -> int:
+    """Reconstruiește toate agregatele din `analysis_json` (o singură dată, pentru date vechi)."""
+    db.query(models.DailyThemeMotif).delete()
+    db.query(models.DailyThemeStat).delete()
+    db.query(models.DailyDreamCount).delete()
+
+    processed = 0
+    rows = (
+        db.query(models.Dream.date_occurred, models.Dream.analysis_json)
+        .filter(models.Dream.cluster_label.notin_(["PROCESSING", "FAILED"]))
+        .order_by(models.Dream.id)
+        .yield_per(500)
+    )
+    for row in rows:
+        try:
+            extra = json.loads(row.analysis_json) if row.analysis_json else {}
+        except ValueError:
+            extra = {}
+        # Visele cu interpretarea de rezervă se numără, dar placeholder-ul lor nu intră în teme / motive
+        record_dream(db, row.date_occurred, None if extra.get("fallback") else extra.get("ai_data"))
+        processed += 1
+    db.commit()
+    return processed
@@ -1,5 +1,6 @@
+import logging
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -32,5 +33,52 @@ else:
         max_overflow=20      # Conexiuni extra permise la trafic mare
     )
 
+logger = logging.getLogger(__name__)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def add_missing_columns(bind=engine):
+    """
+    `create_all` creează doar tabelele lipsă, nu modifică tabelele existente.
+    Adăugăm coloanele noi (nullable) cu ALTER TABLE ca să nu pierdem datele vechi.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                logger.info("🛠️ Coloană nouă: %s.%s (%s)", table.name, column.name, col_type)
+
+
+def add_missing_indexes(bind=engine):
+    """Indexurile declarate în modele, dar create după ce tabela exista deja."""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(conn)
+                logger.info("🛠️ Index nou: %s", index.name)
+
+
+def migrate_schema(bind=engine):
+    """Tabele noi + coloane noi + indexuri noi. Idempotent, sigur la fiecare pornire."""
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    add_missing_indexes(bind)
+
+    # Full-text (FTS5 / tsvector) nu se descrie în modele - DDL specific dialectului
+    import search
+    search.install_fulltext(bind)
@@ -0,0 +1,318 @@
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, tuple_
+from sqlalchemy.orm import Session
+
+import models, daily_stats, clustering, fastjson, search
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# DATA ACCESS (LEAN) PENTRU CALCULUL DE SIMILARITATE
+# =========================
+# Calculul de similaritate are nevoie doar de id, dată, vector și amprenta SimHash.
+# Nu hidratăm obiecte ORM complete (content, interpretation, analysis_json).
+
+SIMILARITY_COLUMNS = (
+    models.Dream.id,
+    models.Dream.date_occurred,
+    models.Dream.embedding,
+    models.Dream.embedding_model,
+    models.Dream.embedding_dim,
+    models.Dream.simhash,
+)
+
+
+def iter_similarity_rows(db: Session, model: str, after_id: int = 0, limit: int = None, batch_size: int = 1000):
+    """
+    Rândurile (id, date_occurred, embedding, embedding_model, embedding_dim, simhash) cu id > `after_id`,
+    care au un vector generat cu `model`, în ordinea id-ului.
+    Rândurile sunt citite în loturi de `batch_size` (yield_per), nu toate odată.
+    """
+    query = (
+        db.query(*SIMILARITY_COLUMNS)
+        .filter(models.Dream.id > after_id)
+        .filter(models.Dream.embedding.isnot(None))
+        .filter(models.Dream.embedding_model == model)
+        .order_by(models.Dream.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    yield from query.yield_per(batch_size)
+
+
+def ids_in_date_window(db: Session, model: str, day, days: int) -> list:
+    """Id-urile viselor cu vector din [day - days, day + days] (range query pe `ix_dreams_date_occurred`)."""
+    rows = (
+        db.query(models.Dream.id)
+        .filter(models.Dream.date_occurred >= day - timedelta(days=days))
+        .filter(models.Dream.date_occurred <= day + timedelta(days=days))
+        .filter(models.Dream.embedding.isnot(None))
+        .filter(models.Dream.embedding_model == model)
+        .all()
+    )
+    return [r.id for r in rows]
+
+
+def iter_fingerprints(db: Session, up_to_id: int, batch_size: int = 5000):
+    """(id, simhash) pentru visele cu id <= `up_to_id` care au amprentă - fără vectori."""
+    query = (
+        db.query(models.Dream.id, models.Dream.simhash)
+        .filter(models.Dream.id <= up_to_id)
+        .filter(models.Dream.simhash.isnot(None))
+    )
+    yield from query.yield_per(batch_size)
+
+
+def similarity_rows_by_ids(db: Session, ids: list, chunk_size: int = 500):
+    """Aceleași coloane ca `iter_similarity_rows`, pentru o listă explicită de id-uri."""
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        yield from db.query(*SIMILARITY_COLUMNS).filter(models.Dream.id.in_(chunk)).all()
+
+
+def has_analyzed_dreams(db: Session) -> bool:
+    """EXISTS pe `dreams`, fără visele încă în analiză: visul nou are cu ce să fie comparat?"""
+    return db.query(exists().where(models.Dream.cluster_label.notin_(_UNFINISHED_LABELS))).scalar()
+
+
+# =========================
+# SCRIERE / CITIRE VISE ANALIZATE
+# =========================
+# Folosite și de endpoint-ul sincron, și de worker-ii din background (jobs.py).
+
+def parse_date_occurred(date_occurred):
+    """
+    ⬇️ FIX PENTRU SQLITE DATE ERROR ⬇️
+    SQLite vrea obiect `date`, nu string. Dacă formatul e greșit, folosim data de azi.
+    """
+    parsed_date_obj = datetime.now().date() # Default: Azi
+    
+    if date_occurred:
+        try:
+            if isinstance(date_occurred, str):
+                # Încercăm să convertim string-ul "YYYY-MM-DD" în obiect date
+                # Ajustează formatul dacă primești altceva (ex: ISO cu T)
+                parsed_date_obj = datetime.strptime(date_occurred, "%Y-%m-%d").date()
+            else:
+                # Dacă Pydantic a convertit deja în obiect date/datetime
+                parsed_date_obj = date_occurred
+        except ValueError:
+            # Dacă formatul e greșit, rămâne data de azi (fallback)
+            logger.warning("⚠️ Format dată invalid: %s. Se folosește azi.", date_occurred)
+    return parsed_date_obj
+
+def apply_analysis(db_dream: models.Dream, analysis_result: dict, embedding_data: dict):
+    """Copiază rezultatul din `ml_logic.analyze_new_dream*` în coloanele (flat) ale visului."""
+    interp_data = analysis_result.get("interpretation", {})
+    resonance_data = analysis_result.get("resonance", {})
+    similarity_data = analysis_result.get("similarity", {})
+
+    # Mapăm datele noi la coloanele VECHI din DB
+    db_dream.cluster_label = resonance_data.get("label", "UNIQUE")
+    db_dream.similarity_percentage = resonance_data.get("percentage", 0)
+    db_dream.similar_count = similarity_data.get("similar_count", 0)
+
+    # Salvăm sumarul text
+    db_dream.interpretation = interp_data.get("summary", "Analysis processed.")
+
+    # Salvăm tot obiectul JSON bogat în coloana 'analysis_json'
+    extra = {
+        "ai_data": interp_data,
+        "temporal_matches": similarity_data.get("temporal_matches", 0),
+        "is_sync": resonance_data.get("is_sync", False)
+    }
+    if analysis_result.get("fallback"):
+        # Interpretare de rezervă: rebuild-urile agregatelor îi sar temele / motivele
+        extra["fallback"] = True
+    db_dream.analysis_json = json.dumps(extra)
+
+    # Vectorul visului (calculat o singură dată, refolosit la următoarele comparații)
+    for column, value in embedding_data.items():
+        setattr(db_dream, column, value)
+
+    # Amprenta SimHash (lookup-ul de near-duplicate, fără API)
+    if analysis_result.get("simhash") is not None:
+        db_dream.simhash = analysis_result["simhash"]
+
+def update_aggregates(db: Session, db_dream: models.Dream, analysis_result: dict, replaces_degraded: bool = False):
+    """
+    Agregatele zilei (teme / motive), indexul de căutare și clusterul semantic, actualizate
+    incremental în aceeași tranzacție cu visul. Se apelează după `apply_analysis`, înainte de commit.
+    Cu interpretarea de rezervă (`fallback`) visul se numără în ziua lui și intră în cluster
+    după vector, dar fără teme / motive și fără `dream_terms`: "System Offline" e un placeholder.
+    Fără vector, doar clusterul lipsește - interpretarea reală se numără și se indexează.
+    `replaces_degraded`: visul e deja numărat (și asignat), acum primește interpretarea reală
+    (vezi `replace_interpretation`).
+    """
+    interp_data = analysis_result.get("interpretation")
+    fallback = bool(analysis_result.get("fallback"))
+    daily_stats.record_dream(db, db_dream.date_occurred, None if fallback else interp_data,
+                             new_dream=not replaces_degraded)
+    if not fallback:
+        search.index_dream(db, db_dream, interp_data)
+    if replaces_degraded:
+        clustering.add_motifs(db, db_dream, interp_data)
+    else:
+        clustering.assign_dream(db, db_dream, analysis_result.get("embedding"),
+                                None if fallback else interp_data, db_dream.embedding_model)
+
+def replace_interpretation(db: Session, db_dream: models.Dream, interpretation: dict):
+    """
+    Un vis salvat degradat primește interpretarea reală (retry din jobs.py): textul, `analysis_json`
+    și agregatele care l-au sărit. Scorul de similaritate rămâne cel calculat la salvare.
+    Nu face commit.
+    """
+    try:
+        extra = json.loads(db_dream.analysis_json) if db_dream.analysis_json else {}
+    except ValueError:
+        extra = {}
+    extra["ai_data"] = interpretation
+    extra.pop("fallback", None)
+    db_dream.interpretation = interpretation.get("summary", "Analysis processed.")
+    db_dream.analysis_json = json.dumps(extra)
+
+    update_aggregates(db, db_dream, {"interpretation": interpretation}, replaces_degraded=True)
+
+def has_fallback(analysis_json: str) -> bool:
+    """True dacă rândul a fost salvat cu interpretarea de rezervă (vezi `apply_analysis`)."""
+    if not analysis_json:
+        return False
+    try:
+        return bool(json.loads(analysis_json).get("fallback"))
+    except ValueError:
+        return False
+
+def dream_to_response(db_dream: models.Dream) -> dict:
+    """Structura (nested) din `schemas.DreamResponse`, reconstruită din coloanele salvate."""
+    extra = {}
+    if db_dream.analysis_json:
+        try:
+            extra = json.loads(db_dream.analysis_json)
+        except ValueError:
+            extra = {}
+
+    return {
+        "id": db_dream.id,
+        "content": db_dream.content,
+        "date_occurred": str(db_dream.date_occurred), # Convertim înapoi în string pt JSON response
+        "resonance": {
+            "label": db_dream.cluster_label,
+            "percentage": db_dream.similarity_percentage or 0,
+            "is_sync": extra.get("is_sync", False)
+        },
+        "similarity": {
+            "similar_count": db_dream.similar_count or 0,
+            "temporal_matches": extra.get("temporal_matches", 0)
+        },
+        "interpretation": extra.get("ai_data")
+    }
+
+
+# =========================
+# ISTORIC PAGINAT (GET /dreams)
+# =========================
+# Paginare keyset pe (date_occurred, id), cele mai noi primele: fiecare pagină e un
+# range scan pe indexul `ix_dreams_date_occurred_id`, indiferent cât de departe e
+# pagina (fără OFFSET). Citim doar coloanele câmpurilor cerute; `analysis_json`
+# (cea mai mare coloană) doar la `fields=analysis`.
+
+HISTORY_FIELDS = {
+    "id": (models.Dream.id,),
+    "date_occurred": (models.Dream.date_occurred,),
+    "content": (models.Dream.content,),
+    "label": (models.Dream.cluster_label,),
+    "percentage": (models.Dream.similarity_percentage,),
+    "similar_count": (models.Dream.similar_count,),
+    "summary": (models.Dream.interpretation,),
+    "status": (models.Dream.cluster_label,),
+    "analysis": (models.Dream.analysis_json,),
+}
+DEFAULT_HISTORY_FIELDS = tuple(f for f in HISTORY_FIELDS if f != "analysis")
+
+# Etichetele visurilor încă neanalizate (vezi jobs.PENDING_LABEL / jobs.FAILED_LABEL)
+_UNFINISHED_LABELS = ("PROCESSING", "FAILED")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(day, dream_id: int) -> str:
+    raw = f"{day.isoformat()}|{dream_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Cursorul opac -> (date, id). Ridică `InvalidCursor` dacă a fost modificat."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        day, dream_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split("|")
+        return datetime.strptime(day, "%Y-%m-%d").date(), int(dream_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor(cursor)
+
+
+def _history_value(field: str, value):
+    if field == "date_occurred":
+        return value.isoformat()
+    if field == "status":
+        return value if value in _UNFINISHED_LABELS else "DONE"
+    if field == "analysis":
+        return fastjson.raw(value)
+    return value
+
+
+def history_columns(fields=DEFAULT_HISTORY_FIELDS):
+    """(coloanele de citit, poziția fiecărui câmp în rând) - id și date_occurred sunt mereu primele."""
+    columns = [models.Dream.id, models.Dream.date_occurred]
+    for field in fields:
+        for column in HISTORY_FIELDS[field]:
+            if column not in columns:
+                columns.append(column)
+    slots = {field: columns.index(HISTORY_FIELDS[field][0]) for field in fields}
+    return columns, slots
+
+
+def history_items(rows, slots: dict) -> list:
+    return [
+        {field: _history_value(field, row[slot]) for field, slot in slots.items()}
+        for row in rows
+    ]
+
+
+def history_page(db: Session, limit: int, cursor: str = None, fields=DEFAULT_HISTORY_FIELDS,
+                 labels=None, start=None, end=None):
+    """
+    O pagină din istoric: (items, next_cursor). `items` sunt dict-uri plate cu exact
+    câmpurile din `fields`; `next_cursor` e None pe ultima pagină.
+    """
+    columns, slots = history_columns(fields)
+
+    query = db.query(*columns)
+    if labels:
+        query = query.filter(models.Dream.cluster_label.in_(labels))
+    if start:
+        query = query.filter(models.Dream.date_occurred >= start)
+    if end:
+        query = query.filter(models.Dream.date_occurred <= end)
+    if cursor:
+        day, dream_id = decode_cursor(cursor)
+        # Comparație pe rând: (date_occurred, id) < (day, dream_id), direct pe index
+        query = query.filter(tuple_(models.Dream.date_occurred, models.Dream.id) < (day, dream_id))
+
+    # Un rând în plus ne spune dacă mai există o pagină, fără COUNT(*)
+    rows = (
+        query.order_by(models.Dream.date_occurred.desc(), models.Dream.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return history_items(rows, slots), next_cursor
@@ -0,0 +1,218 @@
+import abc
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+
+import numpy as np
+
+import metrics
+from http_clients import clients
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# EMBEDDING PROVIDERS
+# =========================
+# Toți providerii primesc o listă de texte și returnează o listă de vectori
+# (sau None la eroare). `name` ajunge în `Dream.embedding_model`, deci vectorii
+# din provideri diferiți nu se amestecă niciodată în indexul de similaritate.
+#
+# EMBEDDING_PROVIDER=hf (implicit) | local | sentence-transformers
+
+
+class EmbeddingProvider(abc.ABC):
+    name = "unknown"
+    dim = 0
+
+    @abc.abstractmethod
+    def embed(self, texts: list, timeout: float = None):
+        """Vectorii pentru `texts` (în ordine), sau None dacă providerul a eșuat."""
+
+    async def aembed(self, texts: list):
+        # Implicit: rulăm varianta sincronă într-un thread
+        return await asyncio.to_thread(self.embed, texts)
+
+
+# -------------------------
+# HUGGING FACE (API)
+# -------------------------
+class HuggingFaceEmbeddingProvider(EmbeddingProvider):
+    """BAAI/bge-small-en-v1.5 prin HF Inference Router."""
+
+    def __init__(self, model: str = "BAAI/bge-small-en-v1.5", dim: int = 384, timeout: float = 20):
+        self.name = model
+        self.dim = dim
+        self.timeout = timeout  # Timeout mai mare pt batch
+        self.api_url = f"https://router.huggingface.co/hf-inference/models/{model}"
+
+    def _request(self, texts: list):
+        """Headers + payload. Returnează None dacă lipsește token-ul."""
+        hf_token = os.getenv("HF_TOKEN")
+        if not hf_token:
+            logger.error("❌ Lipsă HF_TOKEN")
+            metrics.provider_errors.inc(provider="embedding", reason="missing_key")
+            return None
+        headers = {"Authorization": f"Bearer {hf_token}"}
+        payload = {
+            "inputs": texts,
+            "options": {"wait_for_model": True}
+        }
+        return headers, payload
+
+    def _parse(self, status_code: int, data, texts: list):
+        if status_code != 200:
+            logger.warning("HF API Error: %s - %s", status_code, data)
+            metrics.provider_errors.inc(provider="embedding", reason=f"http_{status_code}")
+            return None
+
+        # Verificăm dacă avem eroare în JSON
+        if isinstance(data, dict) and 'error' in data:
+            logger.warning("HF API Error Message: %s", data['error'])
+            metrics.provider_errors.inc(provider="embedding", reason="api_error")
+            return None
+
+        if not isinstance(data, list):
+            logger.warning("HF API Error: răspuns neașteptat (%s)", type(data).__name__)
+            metrics.provider_errors.inc(provider="embedding", reason="bad_response")
+            return None
+
+        # Un singur input poate veni ca vector plat în loc de [[...]]
+        if len(texts) == 1 and data and not isinstance(data[0], list):
+            data = [data]
+        return data
+
+    def embed(self, texts: list, timeout: float = None):
+        request_parts = self._request(texts)
+        if request_parts is None:
+            return None
+        headers, payload = request_parts
+
+        try:
+            response = clients.client().post(self.api_url, headers=headers, json=payload, timeout=timeout or self.timeout)
+            data = response.json() if response.status_code == 200 else response.text
+            return self._parse(response.status_code, data, texts)
+        except Exception as e:
+            logger.warning("Embedding Error: %s", e)
+            metrics.provider_errors.inc(provider="embedding", reason=type(e).__name__)
+            return None
+
+    async def aembed(self, texts: list):
+        request_parts = self._request(texts)
+        if request_parts is None:
+            return None
+        headers, payload = request_parts
+
+        try:
+            response = await clients.async_client().post(self.api_url, headers=headers, json=payload, timeout=self.timeout)
+            data = response.json() if response.status_code == 200 else response.text
+            return self._parse(response.status_code, data, texts)
+        except Exception as e:
+            logger.warning("Embedding Error: %s", e)
+            metrics.provider_errors.inc(provider="embedding", reason=type(e).__name__)
+            return None
+
+
+# -------------------------
+# LOCAL (CPU, FĂRĂ REȚEA)
+# -------------------------
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Vectorizator local, determinist: "hashing trick" peste cuvinte, bigrame de cuvinte
+    și trigrame de caractere, cu tf sublinear și normalizare L2.
+    Nu e un model semantic, dar merge offline și e suficient pentru dubluri / parafraze
+    apropiate și pentru teste de throughput fără rețea.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.name = f"local/hashing-v1-{dim}"
+        self.dim = dim
+
+    def _features(self, text: str):
+        words = _TOKEN_RE.findall(text.lower())
+        for w in words:
+            yield "w:" + w, 1.0
+            padded = f"#{w}#"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+        for a, b in zip(words, words[1:]):
+            yield f"b:{a}_{b}", 1.0
+
+    def _vector(self, text: str):
+        counts = {}
+        for feature, weight in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 63) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign * weight
+
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for bucket, value in counts.items():
+            # tf sublinear, păstrând semnul
+            vec[bucket] = math.copysign(1.0 + math.log(abs(value)), value) if value else 0.0
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def embed(self, texts: list, timeout: float = None):
+        return [self._vector(t or "") for t in texts]
+
+    async def aembed(self, texts: list):
+        # Microsecunde per text - nu merită un thread
+        return self.embed(texts)
+
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """
+    Același model (bge-small) rulat local pe CPU cu `sentence-transformers`.
+    Vectorii sunt compatibili cu cei de la HF, deci numele modelului e același.
+    Dependință opțională: `pip install sentence-transformers`.
+    """
+
+    def __init__(self, model: str = "BAAI/bge-small-en-v1.5"):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: list, timeout: float = None):
+        try:
+            vectors = self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+            return vectors.astype(np.float32).tolist()
+        except Exception as e:
+            logger.warning("Embedding Error: %s", e)
+            metrics.provider_errors.inc(provider="embedding", reason=type(e).__name__)
+            return None
+
+
+# -------------------------
+# SELECȚIE PROVIDER
+# -------------------------
+_provider = None
+
+
+def provider_from_env() -> EmbeddingProvider:
+    kind = os.getenv("EMBEDDING_PROVIDER", "hf").lower()
+    if kind == "local":
+        return HashingEmbeddingProvider(dim=int(os.getenv("LOCAL_EMBEDDING_DIM", "384")))
+    if kind in ("sentence-transformers", "st"):
+        return SentenceTransformerEmbeddingProvider(os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"))
+    if kind != "hf":
+        logger.warning("⚠️ EMBEDDING_PROVIDER necunoscut: %s. Folosim HF.", kind)
+    return HuggingFaceEmbeddingProvider()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    global _provider
+    if _provider is None:
+        _provider = provider_from_env()
+        logger.info("🧭 Embedding provider: %s (%d dim)", _provider.name, _provider.dim)
+    return _provider
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# CLIENȚI HTTP PARTAJAȚI (GROQ + HUGGING FACE)
+# =========================
+# Un singur pool de conexiuni keep-alive per proces, refolosit de toți providerii:
+# fără handshake TCP + TLS nou la fiecare vis. HTTP/2 e activat automat dacă
+# pachetul `h2` e instalat (`pip install httpx[http2]`).
+# Clienții sync se creează leneș; cei async sunt legați de event loop-ul curent.
+# `httpx` (~75 ms) se importă abia la primul client, nu la pornire.
+# `startup()` (din prewarm, în background) îi creează din timp; `shutdown()` închide tot.
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+# Implicit SDK-ul Groq așteaptă 60 s și reîncearcă de 2 ori; bugetul real vine din resilience.py
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "20"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "0"))
+
+
+def _http2_available() -> bool:
+    if os.getenv("HTTP2_ENABLED", "1") == "0":
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+HTTP2 = _http2_available()
+
+
+def _client_options() -> dict:
+    import httpx
+    return {
+        "http2": HTTP2,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+class ClientPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._loop = None
+        self._groq = {}        # api_key -> Groq
+        self._async_groq = {}  # api_key -> AsyncGroq (pentru loop-ul curent)
+
+    # -------------------------
+    # HTTPX
+    # -------------------------
+    def client(self) -> "httpx.Client":
+        if self._client is None:
+            import httpx
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**_client_options())
+                    logger.info("🌐 Client HTTP partajat (http2=%s, max %d conexiuni)", HTTP2, HTTP_MAX_CONNECTIONS)
+        return self._client
+
+    def async_client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._loop is not loop:
+            import httpx
+            # Alt event loop (ex: teste / restart): conexiunile vechi nu pot fi refolosite
+            self._loop = loop
+            self._async_client = httpx.AsyncClient(**_client_options())
+            self._async_groq = {}
+        return self._async_client
+
+    # -------------------------
+    # GROQ (SDK-ul primește clientul nostru httpx)
+    # -------------------------
+    def groq(self, api_key: str):
+        client = self._groq.get(api_key)
+        if client is None:
+            from groq import Groq
+            http_client = self.client()
+            with self._lock:
+                client = self._groq.get(api_key)
+                if client is None:
+                    client = self._groq[api_key] = Groq(
+                        api_key=api_key, http_client=http_client,
+                        timeout=GROQ_TIMEOUT_SECONDS, max_retries=GROQ_MAX_RETRIES,
+                    )
+        return client
+
+    def async_groq(self, api_key: str):
+        http_client = self.async_client()
+        client = self._async_groq.get(api_key)
+        if client is None:
+            from groq import AsyncGroq
+            client = self._async_groq[api_key] = AsyncGroq(
+                api_key=api_key, http_client=http_client,
+                timeout=GROQ_TIMEOUT_SECONDS, max_retries=GROQ_MAX_RETRIES,
+            )
+        return client
+
+    # -------------------------
+    # PORNIRE / OPRIRE
+    # -------------------------
+    async def startup(self):
+        """Creează pool-urile înainte de primul request (prewarm)."""
+        self.client()
+        self.async_client()
+
+    async def shutdown(self):
+        async_client, self._async_client, self._loop = self._async_client, None, None
+        self._async_groq = {}
+        if async_client is not None:
+            await async_client.aclose()
+        with self._lock:
+            client, self._client = self._client, None
+            self._groq = {}
+        if client is not None:
+            client.close()
+
+
+clients = ClientPool()
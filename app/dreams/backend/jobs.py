@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+from database import SessionLocal
+import models, ml_logic, dream_store, metrics
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# ANALIZĂ ÎN BACKGROUND (WORKER POOL)
+# =========================
+# `POST /dreams/?mode=async` salvează visul imediat (cluster_label = "PROCESSING")
+# și pune id-ul în coadă. Un număr limitat de workeri rulează analiza și
+# actualizează rândul; clientul face polling pe `GET /dreams/{id}`.
+# Visele salvate cu interpretarea de rezervă (Groq căzut) intră din nou în coadă după
+# JOB_REPAIR_DELAY_SECONDS (dublat la fiecare rundă eșuată, cel mult JOB_REPAIR_MAX_ROUNDS),
+# iar la pornire sunt reluate cele rămase: când Groq răspunde, primesc interpretarea
+# reală și intră în agregatele pe care le-au sărit.
+#
+# Cu mai mulți workeri uvicorn, fiecare proces are coada lui și toate reiau aceleași
+# rânduri la pornire. Înainte de analiză rândul e revendicat atomic (UPDATE ...
+# claimed_until, doar dacă nu are un lease valid): un singur proces îl analizează, iar
+# dacă acela moare, lease-ul expiră și rândul e preluat de altul.
+
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "2"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))
+JOB_REPAIR_DELAY_SECONDS = float(os.getenv("JOB_REPAIR_DELAY_SECONDS", "30"))
+JOB_REPAIR_MAX_ROUNDS = int(os.getenv("JOB_REPAIR_MAX_ROUNDS", "5"))
+JOB_CLAIM_LEASE_SECONDS = float(os.getenv("JOB_CLAIM_LEASE_SECONDS", "120"))
+
+PENDING_LABEL = "PROCESSING"
+FAILED_LABEL = "FAILED"
+FALLBACK_PATTERN = '%"fallback": true%'  # `analysis_json` cu interpretarea de rezervă
+
+
+def _has_work():
+    """Rândurile la care un worker mai are ceva de făcut: analiza sau reparația interpretării."""
+    return or_(models.Dream.cluster_label == PENDING_LABEL, models.Dream.analysis_json.like(FALLBACK_PATTERN))
+
+
+def _unclaimed(now: datetime):
+    return or_(models.Dream.claimed_until.is_(None), models.Dream.claimed_until < now)
+
+
+class AnalysisJobQueue:
+    def __init__(self, max_queue: int = JOB_QUEUE_MAX, concurrency: int = JOB_CONCURRENCY,
+                 max_retries: int = JOB_MAX_RETRIES, retry_backoff: float = JOB_RETRY_BACKOFF_SECONDS,
+                 repair_delay: float = JOB_REPAIR_DELAY_SECONDS, repair_rounds: int = JOB_REPAIR_MAX_ROUNDS,
+                 claim_lease: float = JOB_CLAIM_LEASE_SECONDS):
+        self.max_queue = max_queue
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.repair_delay = repair_delay
+        self.repair_rounds = max(0, repair_rounds)
+        self.claim_lease = claim_lease
+        self._repair_round = {}  # dream_id -> runda de reparare în curs
+        self._queue = None
+        self._workers = []
+        self._loop = None
+        self._active = 0
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "degraded": 0, "repaired": 0,
+                          "retried": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers) and self._loop is asyncio.get_running_loop()
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "active": self._active,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    # -------------------------
+    # PORNIRE / OPRIRE
+    # -------------------------
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        await self.recover_pending()
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def recover_pending(self):
+        """
+        După un restart, visele rămase în PROCESSING intră din nou în coadă, apoi
+        (cât mai e loc) cele mai noi vise salvate degradat. Toate procesele le văd pe aceleași:
+        fiecare rând e revendicat abia înainte de analiză (vezi `_claim`).
+        """
+        def pending_ids():
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(models.Dream.id)
+                    .filter(models.Dream.cluster_label == PENDING_LABEL)
+                    .order_by(models.Dream.id)
+                    .limit(self.max_queue)
+                    .all()
+                )
+                pending = [r.id for r in rows]
+                rows = (
+                    db.query(models.Dream.id)
+                    .filter(models.Dream.analysis_json.like(FALLBACK_PATTERN))
+                    .order_by(models.Dream.id.desc())
+                    .limit(self.max_queue - len(pending))
+                    .all()
+                ) if len(pending) < self.max_queue else []
+                return pending, [r.id for r in rows]
+            finally:
+                db.close()
+
+        pending, degraded = await asyncio.to_thread(pending_ids)
+        for dream_id in pending + degraded:
+            self.submit(dream_id)
+        if pending:
+            logger.info("🔁 %d vise reluate din PROCESSING.", len(pending))
+        if degraded:
+            logger.info("🔁 %d vise degradate trimise din nou la interpretare.", len(degraded))
+
+    # -------------------------
+    # COADA
+    # -------------------------
+    def schedule_repair(self, dream_id: int, round_number: int = 0) -> bool:
+        """
+        Pune visul (salvat cu `local_fallback`) din nou în coadă peste `repair_delay * 2^runda`
+        secunde. Se poate apela și din threadpool. False dacă nu avem coadă pornită
+        (ex: script) sau rundele s-au terminat - visul e reluat la următoarea pornire.
+        """
+        if round_number >= self.repair_rounds:
+            return False
+        return self._offer_later(dream_id, self.repair_delay * (2 ** round_number), round_number)
+
+    def _offer_later(self, dream_id: int, delay: float, repair_round: int = None) -> bool:
+        loop = self._loop
+        if not self._workers or loop is None or loop.is_closed():
+            return False
+
+        def offer():
+            if self._queue is None:
+                return
+            try:
+                self._queue.put_nowait(dream_id)
+                if repair_round is not None:
+                    self._repair_round[dream_id] = repair_round
+            except asyncio.QueueFull:
+                # Coada e plină de vise noi: rândul așteaptă următoarea pornire
+                pass
+
+        loop.call_soon_threadsafe(loop.call_later, delay, offer)
+        return True
+
+    def full(self) -> bool:
+        """True (și contorizat ca refuz) dacă un `submit` acum ar fi refuzat - verificat înainte de a salva visul."""
+        if self._queue is not None and self._queue.full():
+            self._counters["rejected"] += 1
+            return True
+        return False
+
+    def submit(self, dream_id: int) -> bool:
+        """False dacă coada e plină (apelantul răspunde cu 503)."""
+        try:
+            self._queue.put_nowait(dream_id)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            return False
+        self._counters["submitted"] += 1
+        return True
+
+    async def _worker(self, worker_id: int):
+        while True:
+            dream_id = await self._queue.get()
+            self._active += 1
+            try:
+                await self._run_with_retries(dream_id)
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+    async def _run_with_retries(self, dream_id: int):
+        for attempt in range(self.max_retries + 1):
+            is_last = attempt == self.max_retries
+            try:
+                if await self._process(dream_id, accept_degraded=is_last):
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("❌ Job vis #%s (încercarea %d): %s", dream_id, attempt + 1, e)
+                if is_last:
+                    await asyncio.to_thread(self._mark_failed, dream_id)
+                    self._counters["failed"] += 1
+                    return
+            self._counters["retried"] += 1
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    async def _process(self, dream_id: int, accept_degraded: bool) -> bool:
+        """
+        Rulează analiza și actualizează rândul. Returnează False dacă un provider
+        a picat și mai avem încercări (rezultatul degradat se salvează doar la final).
+        """
+        claimed, retry_in = await asyncio.to_thread(self._claim, dream_id, self.claim_lease)
+        if not claimed:
+            if retry_in is not None:
+                # Alt proces lucrează la vis; dacă moare, lease-ul lui expiră și îl preluăm noi
+                self._offer_later(dream_id, retry_in + 1)
+            return True
+
+        db = SessionLocal()
+        try:
+            db_dream = await asyncio.to_thread(db.get, models.Dream, dream_id)
+            if db_dream is None:
+                return True
+            if db_dream.cluster_label != PENDING_LABEL:
+                if dream_store.has_fallback(db_dream.analysis_json):
+                    return await self._repair(db, db_dream, accept_degraded)
+                self._repair_round.pop(dream_id, None)
+                return True
+
+            analysis_result = await ml_logic.analyze_new_dream_async(
+                new_dream_text=db_dream.content,
+                current_date_str=str(db_dream.date_occurred),
+                db=db
+            )
+            if analysis_result.get("degraded") and not accept_degraded:
+                return False
+
+            await asyncio.to_thread(self._save, db, db_dream, analysis_result)
+            self._counters["completed"] += 1
+            if analysis_result.get("degraded"):
+                self._counters["degraded"] += 1
+            if analysis_result.get("fallback"):
+                self.schedule_repair(dream_id)
+            return True
+        finally:
+            db.close()
+            await asyncio.to_thread(self._release, dream_id)
+
+    async def _repair(self, db, db_dream, accept_degraded: bool) -> bool:
+        """
+        Doar interpretarea, pentru un vis salvat cu `local_fallback`. Fără Groq, rândul rămâne
+        cum era, iar după ultima încercare visul e reprogramat pentru runda următoare.
+        """
+        interpretation = await ml_logic.interpret_async(db_dream.content)
+        if not interpretation:
+            if accept_degraded:
+                self.schedule_repair(db_dream.id, self._repair_round.pop(db_dream.id, 0) + 1)
+            return accept_degraded
+        self._repair_round.pop(db_dream.id, None)
+        await asyncio.to_thread(self._save_interpretation, db, db_dream, interpretation)
+        self._counters["repaired"] += 1
+        return True
+
+    @staticmethod
+    def _claim(dream_id: int, lease: float) -> tuple:
+        """
+        Revendică rândul atomic (un singur UPDATE, verificat după rowcount).
+        (True, None) - e al nostru; (False, secunde) - alt proces îl are până atunci;
+        (False, None) - nu mai e nimic de făcut (analizat, reparat sau șters).
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            claimed = (
+                db.query(models.Dream)
+                .filter(models.Dream.id == dream_id, _has_work(), _unclaimed(now))
+                .update({"claimed_until": now + timedelta(seconds=lease)}, synchronize_session=False)
+            )
+            db.commit()
+            if claimed:
+                return True, None
+            row = db.query(models.Dream.claimed_until).filter(models.Dream.id == dream_id, _has_work()).first()
+            if row is None or row.claimed_until is None:
+                return False, None
+            return False, max(0.0, (row.claimed_until - now).total_seconds())
+        finally:
+            db.close()
+
+    @staticmethod
+    def _release(dream_id: int):
+        db = SessionLocal()
+        try:
+            db.query(models.Dream).filter(models.Dream.id == dream_id).update(
+                {"claimed_until": None}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save(db, db_dream, analysis_result: dict):
+        dream_store.apply_analysis(db_dream, analysis_result, ml_logic.embedding_columns(analysis_result.get("embedding")))
+        dream_store.update_aggregates(db, db_dream, analysis_result)
+        with metrics.timed("commit"):
+            db.commit()
+        ml_logic.register_dream(db_dream.id, analysis_result.get("embedding"), db_dream.date_occurred, analysis_result.get("simhash"))
+
+    @staticmethod
+    def _save_interpretation(db, db_dream, interpretation: dict):
+        dream_store.replace_interpretation(db, db_dream, interpretation)
+        with metrics.timed("commit"):
+            db.commit()
+
+    @staticmethod
+    def _mark_failed(dream_id: int):
+        db = SessionLocal()
+        try:
+            # Doar rândurile încă în PROCESSING: un vis degradat rămâne cu analiza lui
+            db.query(models.Dream).filter(
+                models.Dream.id == dream_id, models.Dream.cluster_label == PENDING_LABEL, _unclaimed(datetime.utcnow())
+            ).update(
+                {"cluster_label": FAILED_LABEL, "interpretation": "Analysis failed."},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+job_queue = AnalysisJobQueue()
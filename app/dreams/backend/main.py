@@ -1,17 +1,107 @@
-from fastapi import FastAPI, Depends, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()  # pentru raportul de cold start (vezi STARTUP_TIMES)
+
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
-import json
-from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
 
 # Asigură-te că importurile tale locale sunt corecte
-import models, schemas, ml_logic
-from database import SessionLocal, engine, Base
+import models, schemas, ml_logic, cache, dream_store, jobs, daily_stats, clustering, bulk_import, metrics, http_clients, fastjson, search
+import json
+import hashlib
+from database import SessionLocal, engine, migrate_schema
+from sqlalchemy import text
+
+# LOG_LEVEL=DEBUG pentru logurile detaliate din calculul de similaritate
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
 
-# Create DB Tables
-Base.metadata.create_all(bind=engine)
+# "sync" (implicit): răspunsul conține analiza completă; "async": 202 + polling
+DREAM_SUBMIT_MODE = os.getenv("DREAM_SUBMIT_MODE", "sync").lower()
 
-app = FastAPI()
+# =========================
+# PORNIRE (COLD START)
+# =========================
+# Importul nu mai atinge baza de date. Migrarea rulează în lifespan (implicit) sau
+# separat, la deploy: `python manage.py migrate` + MIGRATE_ON_STARTUP=0.
+# După pornire, în background: pool-urile HTTP, prima conexiune DB, indexul de
+# similaritate și SDK-urile importate leneș (groq, bleach) - primul request nu le
+# mai plătește. Dacă vine înainte, totul se încarcă oricum leneș, la nevoie.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") != "0"
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "1") != "0"
+
+# Secunde per fază: import, migrate, startup (până la primul request acceptat), prewarm
+STARTUP_TIMES = {"import": 0.0}
+metrics.gauge("dream_startup_seconds", "Cold start duration by phase (import, migrate, startup, prewarm).",
+              lambda: dict(STARTUP_TIMES), label="phase")
+
+def _prewarm_sync():
+    # Pool-ul DB: TCP + TLS + autentificare la Postgres, o singură dată
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    db = SessionLocal()
+    try:
+        ml_logic.sync_similarity_index_from_db(db)
+    finally:
+        db.close()
+    # Indexul shardat: worker-ii (spawn) pornesc acum, nu la primul query mare
+    warm_up = getattr(ml_logic.get_similarity_index(), "warm_up", None)
+    if warm_up is not None:
+        warm_up()
+    ml_logic.sanitize_text("warm")
+    api_key = os.getenv("GROQ_API_KEY")
+    if api_key:
+        http_clients.clients.groq(api_key)
+
+async def prewarm():
+    """Încălzește pool-urile și indexul după pornire, fără să întârzie primul request."""
+    start = time.perf_counter()
+    try:
+        # Pool-urile HTTP (Groq + HF): contextul TLS costă ~0.1s per client, deci nu în startup
+        await http_clients.clients.startup()
+        await asyncio.to_thread(_prewarm_sync)
+        api_key = os.getenv("GROQ_API_KEY")
+        if api_key:
+            http_clients.clients.async_groq(api_key)  # legat de event loop-ul serverului
+    except Exception:
+        logger.exception("⚠️ Prewarm eșuat (primul request va încărca totul leneș).")
+        return
+    STARTUP_TIMES["prewarm"] = round(time.perf_counter() - start, 4)
+    logger.info("🔥 Prewarm gata în %.2fs (index: %d vise)", STARTUP_TIMES["prewarm"], len(ml_logic.get_similarity_index()))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    if MIGRATE_ON_STARTUP:
+        # Create DB Tables (+ coloanele / indexurile adăugate ulterior)
+        await run_in_threadpool(migrate_schema, engine)
+        STARTUP_TIMES["migrate"] = round(time.perf_counter() - start, 4)
+    await jobs.job_queue.start()
+    STARTUP_TIMES["startup"] = round(time.perf_counter() - start, 4)
+    logger.info("🚀 Pornire: import %.2fs, startup %.2fs (migrare %s)", STARTUP_TIMES["import"],
+                STARTUP_TIMES["startup"], f"{STARTUP_TIMES['migrate']:.2f}s" if MIGRATE_ON_STARTUP else "oprită")
+
+    prewarm_task = asyncio.create_task(prewarm()) if PREWARM_ON_STARTUP else None
+    app.state.prewarm_task = prewarm_task
+    yield
+    if prewarm_task is not None and not prewarm_task.done():
+        prewarm_task.cancel()
+    await jobs.job_queue.stop()
+    await http_clients.clients.shutdown()
+    ml_logic.close_similarity_index()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS SETUP (Neschimbat) ---
 origins = [
@@ -29,6 +119,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Template-ul rutei (ex: /dreams/{dream_id}), nu path-ul concret - cardinalitate mică
+    route = request.scope.get("route")
+    metrics.request_seconds.observe(
+        time.perf_counter() - start,
+        route=getattr(route, "path", "unmatched"), method=request.method, status=response.status_code,
+    )
+    return response
+
+# Valori citite la fiecare scrape
+metrics.gauge("dream_similarity_index_size", "Dreams in the in-memory similarity index.",
+              lambda: len(ml_logic.get_similarity_index()))
+metrics.gauge("dream_similarity_index_bytes", "Memory held by the similarity index vectors.",
+              lambda: ml_logic.get_similarity_index().memory_bytes())
+metrics.gauge("dream_job_queue", "Background analysis queue state.",
+              lambda: {k: jobs.job_queue.stats()[k] for k in ("queue_depth", "active")}, label="state")
+metrics.gauge("dream_cache_stats", "Analysis cache counters and size (see /cache/stats).",
+              lambda: cache.analysis_cache.stats(), label="stat")
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -37,94 +149,310 @@ def get_db():
     finally:
         db.close()
 
-@app.post("/dreams/", response_model=schemas.DreamResponse)
-def create_dream(dream: schemas.DreamCreate, db: Session = Depends(get_db)):
-    
-    # 1. Fetch history for context
-    previous_dreams = db.query(models.Dream).all()
+@app.post("/dreams/", response_model=schemas.DreamResponse, responses={202: {"model": schemas.DreamAccepted}})
+async def create_dream(dream: schemas.DreamCreate, mode: Optional[str] = None, db: Session = Depends(get_db)):
+
+    # Mod async: salvăm imediat și analizăm în background (202 + polling pe GET /dreams/{id})
+    if (mode or DREAM_SUBMIT_MODE) == "async":
+        return await enqueue_dream(dream, db)
     
-    # 2. CALCULATE AI LOGIC
+    # 1 + 2. CALCULATE AI LOGIC
+    # Istoricul nu mai e încărcat aici: ml_logic citește din DB doar id/dată/vector
+    # pentru visele care lipsesc din indexul de similaritate.
+    # Groq și embedding-ul rulează în paralel, fără să țină ocupat un thread.
     # Returneaza: { "interpretation": {...}, "resonance": {...}, "similarity": {...} }
-    analysis_result = ml_logic.analyze_new_dream(
+    analysis_result = await ml_logic.analyze_new_dream_async(
         new_dream_text=dream.content,
-        all_previous_dreams=previous_dreams,
-        current_date_str=dream.date_occurred # Trimitem string-ul original pt logica Python
+        current_date_str=dream.date_occurred, # Trimitem string-ul original pt logica Python
+        db=db
     )
-    
-    # 3. Extract parts
-    interp_data = analysis_result.get("interpretation", {})
-    resonance_data = analysis_result.get("resonance", {})
-    similarity_data = analysis_result.get("similarity", {})
-    
-    # ====================================================
-    # ⬇️ FIX PENTRU SQLITE DATE ERROR ⬇️
-    # ====================================================
-    parsed_date_obj = datetime.now().date() # Default: Azi
-    
-    if dream.date_occurred:
-        try:
-            if isinstance(dream.date_occurred, str):
-                # Încercăm să convertim string-ul "YYYY-MM-DD" în obiect date
-                # Ajustează formatul dacă primești altceva (ex: ISO cu T)
-                parsed_date_obj = datetime.strptime(dream.date_occurred, "%Y-%m-%d").date()
-            else:
-                # Dacă Pydantic a convertit deja în obiect date/datetime
-                parsed_date_obj = dream.date_occurred
-        except ValueError:
-            # Dacă formatul e greșit, rămâne data de azi (fallback)
-            print(f"⚠️ Format dată invalid: {dream.date_occurred}. Se folosește azi.")
-            pass
-    # ====================================================
-
-    # 4. SAVE TO DB (Flat Structure)
-    # Salvăm datele în coloanele existente ale bazei de date
+
+    # 3 - 5. Salvarea e sincronă (SQLAlchemy) -> o rulăm în threadpool
+    return await run_in_threadpool(save_analyzed_dream, db, dream, analysis_result)
+
+def save_analyzed_dream(db: Session, dream: schemas.DreamCreate, analysis_result: dict) -> dict:
+    """Salvează visul analizat și construiește răspunsul pentru `DreamResponse`."""
+
+    # 3 + 4. SAVE TO DB (Flat Structure)
     db_dream = models.Dream(
-        content=dream.content, 
-        
+        content=dream.content,
+
         # FOLOSIM OBIECTUL CONVERTIT, NU STRING-UL!
-        date_occurred=parsed_date_obj, 
-        
-        # Mapăm datele noi la coloanele VECHI din DB
-        cluster_label=resonance_data.get("label", "UNIQUE"),
-        similarity_percentage=resonance_data.get("percentage", 0),
-        similar_count=similarity_data.get("similar_count", 0),
-        
-        # Salvăm sumarul text
-        interpretation=interp_data.get("summary", "Analysis processed."),
-        
-        # Salvăm tot obiectul JSON bogat în coloana 'analysis_json'
-        analysis_json=json.dumps({
-            "ai_data": interp_data,
-            "temporal_matches": similarity_data.get("temporal_matches", 0),
-            "is_sync": resonance_data.get("is_sync", False)
-        })
+        date_occurred=dream_store.parse_date_occurred(dream.date_occurred),
     )
+    dream_store.apply_analysis(db_dream, analysis_result, ml_logic.embedding_columns(analysis_result.get("embedding")))
     
     db.add(db_dream)
-    db.commit()
+    # Agregatele zilei + clusterul semantic se actualizează în aceeași tranzacție cu visul
+    dream_store.update_aggregates(db, db_dream, analysis_result)
+    with metrics.timed("commit"):
+        db.commit()
     db.refresh(db_dream)
+
+    # Visul nou intră direct în indexul de similaritate (fără rebuild)
+    ml_logic.register_dream(db_dream.id, analysis_result.get("embedding"), db_dream.date_occurred, analysis_result.get("simhash"))
+    if analysis_result.get("fallback"):
+        # Groq a picat: interpretarea reală vine din coadă, când providerul își revine
+        jobs.job_queue.schedule_repair(db_dream.id)
     
     # 5. CONSTRUCT RESPONSE (Nested Structure)
     # Construim un dicționar care se potrivește cu noua schemă `DreamResponse`.
-    
-    return {
-        "id": db_dream.id,
-        "content": db_dream.content,
-        "date_occurred": str(db_dream.date_occurred), # Convertim înapoi în string pt JSON response
-        
-        # Construim obiectul 'resonance' cerut de Frontend
-        "resonance": {
-            "label": db_dream.cluster_label, # Luat din DB
-            "percentage": db_dream.similarity_percentage, # Luat din DB
-            "is_sync": resonance_data.get("is_sync", False) # Luat din analiza live
-        },
-        
-        # Construim obiectul 'similarity' cerut de Frontend
-        "similarity": {
-            "similar_count": db_dream.similar_count, # Luat din DB
-            "temporal_matches": similarity_data.get("temporal_matches", 0) # Luat din analiza live
-        },
-        
-        # Trimitem obiectul complet de interpretare
-        "interpretation": interp_data
-    }
\ No newline at end of file
+    return dream_store.dream_to_response(db_dream)
+
+async def enqueue_dream(dream: schemas.DreamCreate, db: Session):
+    def insert_pending():
+        db_dream = models.Dream(
+            content=dream.content,
+            date_occurred=dream_store.parse_date_occurred(dream.date_occurred),
+            cluster_label=jobs.PENDING_LABEL,
+        )
+        db.add(db_dream)
+        db.commit()
+        return db_dream.id
+
+    def delete_pending(dream_id: int):
+        db.query(models.Dream).filter(models.Dream.id == dream_id).delete(synchronize_session=False)
+        db.commit()
+
+    queue_full = JSONResponse(
+        status_code=503,
+        content={"detail": "Analysis queue is full. Try again shortly."},
+        headers={"Retry-After": "5"},
+    )
+
+    await jobs.job_queue.start()  # no-op dacă lifespan-ul l-a pornit deja
+    if jobs.job_queue.full():
+        # Nu salvăm nimic: clientul reîncearcă, fără un rând PROCESSING rămas în urmă
+        return queue_full
+    dream_id = await run_in_threadpool(insert_pending)
+
+    if not jobs.job_queue.submit(dream_id):
+        # Coada s-a umplut între verificare și insert: ștergem rândul înainte de 503
+        await run_in_threadpool(delete_pending, dream_id)
+        return queue_full
+
+    return JSONResponse(
+        status_code=202,
+        content={"id": dream_id, "status": jobs.PENDING_LABEL, "status_url": f"/dreams/{dream_id}"},
+    )
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/dreams/stream")
+async def create_dream_stream(dream: schemas.DreamCreate):
+    """
+    Aceeași analiză ca `POST /dreams/`, trimisă ca Server-Sent Events:
+    `resonance` (rezonanță + similaritate), `token` (fragmente din interpretarea Groq),
+    `interpretation` (JSON-ul final), apoi `done` cu visul salvat (inclusiv id-ul).
+    """
+    async def events():
+        # Sesiune proprie: trebuie să trăiască cât timp rulează streaming-ul
+        db = SessionLocal()
+        try:
+            async for event, data in ml_logic.analyze_new_dream_stream(
+                new_dream_text=dream.content,
+                current_date_str=dream.date_occurred,
+                db=db,
+            ):
+                if event == "result":
+                    saved = await run_in_threadpool(save_analyzed_dream, db, dream, data)
+                    yield sse_event("done", saved)
+                else:
+                    yield sse_event(event, data)
+        except Exception:
+            logger.exception("❌ Stream analiză eșuat")
+            yield sse_event("error", {"detail": "Analysis failed"})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/dreams/bulk", response_model=schemas.BulkImportResponse)
+async def import_dreams_bulk(request: Request):
+    """
+    Import de jurnal: JSON array sau NDJSON (`Content-Type: application/x-ndjson`).
+    Cu `Accept: application/x-ndjson` rezultatele vin streaming, câte o linie per chunk
+    procesat; altfel un singur răspuns JSON cu rezultatele + sumarul.
+    """
+    entries = bulk_import.iter_entries(request.stream(), request.headers.get("content-type", ""))
+
+    async def results():
+        # Sesiune proprie: trebuie să trăiască cât timp rulează streaming-ul
+        db = SessionLocal()
+        try:
+            async for result in bulk_import.import_dreams(db, entries):
+                yield result
+        finally:
+            db.close()
+
+    if "ndjson" in request.headers.get("accept", ""):
+        entries = await bulk_import.prefetch(entries)
+
+        async def lines():
+            async for result in results():
+                yield json.dumps(result) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    items = [result async for result in results()]
+    created = sum(1 for r in items if r["status"] == "created")
+    return {"created": created, "failed": len(items) - created, "results": items}
+
+HISTORY_MAX_LIMIT = 100
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    return bool(header) and (header.strip() == "*" or etag in (t.strip() for t in header.split(",")))
+
+@app.get("/dreams", responses={200: {"model": schemas.DreamHistoryPage}, 304: {"description": "Not Modified"}})
+def list_dreams(
+    request: Request,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    label: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Istoricul visurilor, cele mai noi primele, paginat cu cursor (`next_cursor`).
+    `fields=id,content,analysis` alege câmpurile; `label=A,B` și `start`/`end` filtrează.
+    """
+    requested = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(dream_store.DEFAULT_HISTORY_FIELDS)
+    unknown = [f for f in requested if f not in dream_store.HISTORY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    labels = [l.strip() for l in label.split(",") if l.strip()] if label else None
+
+    try:
+        items, next_cursor = dream_store.history_page(
+            db, max(1, min(limit, HISTORY_MAX_LIMIT)), cursor=cursor, fields=requested,
+            labels=labels, start=start_day, end=end_day,
+        )
+    except dream_store.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Serializăm direct (fără DreamResponse / validare Pydantic) - ETag-ul e hash-ul corpului
+    body = fastjson.dumps({"items": items, "next_cursor": next_cursor})
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/dreams/search", responses={200: {"model": schemas.DreamSearchPage}})
+def search_dreams(
+    q: Optional[str] = None,
+    motif: Optional[str] = None,
+    emotion: Optional[str] = None,
+    theme: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Căutare în jurnal: `q` (full-text pe conținut, rezultate după relevanță) și/sau
+    `motif=water&theme=...` (indexul inversat, cele mai noi primele). `motif=a,b` cere ambele.
+    """
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    terms = {
+        kind: [v for v in value.split(",") if v.strip()]
+        for kind, value in (("motif", motif), ("emotion", emotion), ("theme", theme))
+        if value
+    }
+
+    try:
+        items, next_cursor = search.search_page(
+            db, max(1, min(limit, HISTORY_MAX_LIMIT)), q=q, terms=terms,
+            start=start_day, end=end_day, cursor=cursor,
+        )
+    except search.InvalidSearch as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except dream_store.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return Response(content=fastjson.dumps({"items": items, "next_cursor": next_cursor}), media_type="application/json")
+
+@app.get("/dreams/stats/{date}", response_model=List[schemas.DreamCluster])
+def get_daily_stats(date: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date must be YYYY-MM-DD")
+
+    # ETag = ziua + versiunea agregatelor (se schimbă la fiecare vis nou din ziua respectivă)
+    version = daily_stats.day_version(db, day)
+    etag = f'W/"{day.isoformat()}-{version[1] if version else 0}"'
+
+    # Zilele trecute se schimbă rar (doar jurnale vechi) -> cache mai lung la edge
+    if day < datetime.now().date() - timedelta(days=1):
+        cache_control = "public, max-age=300, s-maxage=3600, stale-while-revalidate=86400"
+    else:
+        cache_control = "public, max-age=30, s-maxage=60, stale-while-revalidate=300"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    if version is None:
+        return []
+    return daily_stats.daily_clusters(db, day)
+
+@app.get("/dreams/clusters", response_model=List[schemas.SemanticClusterInfo])
+def get_semantic_clusters(start: Optional[str] = None, end: Optional[str] = None, limit: int = 12, db: Session = Depends(get_db)):
+    """Clusterele semantice pentru o zi (`start`) sau un interval (`start`..`end`). Implicit: azi."""
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date() if start else datetime.now().date()
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else start_day
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    return clustering.clusters_for_range(db, start_day, end_day, ml_logic.EMBEDDING_MODEL, limit=min(limit, 50))
+
+@app.get("/dreams/{dream_id}", response_model=schemas.DreamStatusResponse)
+def get_dream(dream_id: int, db: Session = Depends(get_db)):
+    db_dream = db.get(models.Dream, dream_id)
+    if db_dream is None:
+        raise HTTPException(status_code=404, detail="Dream not found")
+
+    if db_dream.cluster_label in (jobs.PENDING_LABEL, jobs.FAILED_LABEL):
+        status = db_dream.cluster_label
+    else:
+        status = "DONE"
+    return {**dream_store.dream_to_response(db_dream), "status": status}
+
+@app.get("/jobs/stats")
+def job_stats():
+    # Adâncimea cozii, workeri activi, retry-uri, eșecuri
+    return jobs.job_queue.stats()
+
+@app.get("/cache/stats")
+def cache_stats():
+    # Hit / miss pentru cache-ul de interpretări și embeddings
+    return cache.analysis_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Histograme pe etape (sanitize, groq, embedding, db_fetch, scoring, commit) + contoare
+    return PlainTextResponse(metrics.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+# Durata importului (FastAPI, SQLAlchemy, modele, rute) - fără DB sau rețea
+STARTUP_TIMES["import"] = round(time.perf_counter() - _IMPORT_STARTED, 4)
@@ -0,0 +1,228 @@
+"""
+Comenzi de mentenanță pentru backend-ul de vise.
+
+Exemple:
+    python manage.py migrate
+    python manage.py backfill-embeddings
+    python manage.py backfill-embeddings --batch-size 16 --limit 500
+    python manage.py backfill-simhash
+    python manage.py rebuild-daily-stats
+    python manage.py rebuild-clusters
+    python manage.py build-snapshot
+    python manage.py rebuild-search-index
+"""
+import argparse
+import logging
+import sys
+
+from sqlalchemy import or_, update
+
+import models, ml_logic, daily_stats, clustering, simhash, dream_store, snapshot, search
+from database import SessionLocal, SQLALCHEMY_DATABASE_URL, engine, migrate_schema
+
+
+def migrate() -> None:
+    """
+    Tabele / coloane / indexuri noi. Rulat la deploy (ex: pre-deploy command pe Render),
+    serverul poate porni cu MIGRATE_ON_STARTUP=0 și nu mai atinge schema la cold start.
+    """
+    migrate_schema(engine)
+    print("✅ Schema la zi.")
+
+
+def backfill_embeddings(batch_size: int = 32, limit: int = None) -> int:
+    """
+    Calculează embedding-ul pentru visele care nu au unul salvat
+    (sau au unul generat cu alt model). Returnează numărul de rânduri actualizate.
+    """
+    migrate_schema(engine)
+
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while limit is None or updated < limit:
+            size = batch_size if limit is None else min(batch_size, limit - updated)
+            rows = (
+                db.query(models.Dream.id, models.Dream.content)
+                .filter(models.Dream.id > last_id)
+                .filter(or_(
+                    models.Dream.embedding.is_(None),
+                    models.Dream.embedding_model != ml_logic.EMBEDDING_MODEL,
+                    models.Dream.embedding_model.is_(None),
+                ))
+                .order_by(models.Dream.id)
+                .limit(size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            texts = [ml_logic.sanitize_text(r.content) for r in rows]
+            vectors = ml_logic.get_embedding_from_api(texts)
+            if not vectors or not isinstance(vectors, list) or len(vectors) != len(rows):
+                print(f"❌ Batch eșuat (id {rows[0].id}..{last_id}). Oprim backfill-ul.")
+                break
+
+            for row, vec in zip(rows, vectors):
+                db.query(models.Dream).filter(models.Dream.id == row.id).update(
+                    ml_logic.embedding_columns(vec), synchronize_session=False
+                )
+            db.commit()
+            updated += len(rows)
+            print(f" -> {updated} vise actualizate (ultimul id: {last_id})")
+    finally:
+        db.close()
+
+    print(f"✅ Backfill terminat: {updated} embedding-uri noi.")
+    return updated
+
+
+def backfill_simhash(batch_size: int = 500) -> int:
+    """Amprenta SimHash (near-duplicate lookup) pentru visele salvate înainte de coloana `simhash`."""
+    migrate_schema(engine)
+
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            rows = (
+                db.query(models.Dream.id, models.Dream.content)
+                .filter(models.Dream.id > last_id)
+                .filter(models.Dream.simhash.is_(None))
+                .order_by(models.Dream.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            db.execute(update(models.Dream), [
+                {"id": r.id, "simhash": simhash.to_signed(simhash.fingerprint(ml_logic.sanitize_text(r.content))[0])}
+                for r in rows
+            ])
+            db.commit()
+            updated += len(rows)
+            print(f" -> {updated} amprente (ultimul id: {last_id})")
+    finally:
+        db.close()
+
+    print(f"✅ Backfill SimHash terminat: {updated} vise.")
+    return updated
+
+
+def rebuild_daily_stats() -> int:
+    """Recalculează agregatele zilnice (teme / motive) din visele existente."""
+    migrate_schema(engine)
+
+    db = SessionLocal()
+    try:
+        processed = daily_stats.rebuild(db)
+    finally:
+        db.close()
+    print(f"✅ Agregate reconstruite din {processed} vise.")
+    return processed
+
+
+def rebuild_clusters() -> int:
+    """Re-clusterizează toate visele (clusterele zilnice sunt apoi menținute incremental)."""
+    migrate_schema(engine)
+
+    db = SessionLocal()
+    try:
+        processed = clustering.rebuild(db, ml_logic.EMBEDDING_MODEL)
+    finally:
+        db.close()
+    print(f"✅ Clustere reconstruite din {processed} vise.")
+    return processed
+
+
+def rebuild_search_index() -> int:
+    """Recompune `dream_terms` (motive / emoții / teme) și indexul full-text din visele existente."""
+    migrate_schema(engine)
+
+    db = SessionLocal()
+    try:
+        processed = search.rebuild(db)
+    finally:
+        db.close()
+    print(f"✅ Index de căutare reconstruit din {processed} vise.")
+    return processed
+
+
+def build_snapshot(batch_size: int = 1000) -> int:
+    """
+    Completează snapshot-ul de embedding-uri (SIMILARITY_SNAPSHOT_DIR) din DB, înainte de
+    deploy: workerii cu SIMILARITY_INDEX_MODE=snapshot pornesc apoi fără să citească vectorii.
+    """
+    migrate_schema(engine)
+    index = snapshot.open_snapshot(ml_logic.EMBEDDING_DIM, ml_logic.EMBEDDING_MODEL,
+                                   database=SQLALCHEMY_DATABASE_URL, verify=ml_logic.exact_embeddings)
+    after_id = max(0, index.watermark - ml_logic.INDEX_SYNC_OVERLAP)
+
+    added = 0
+    db = SessionLocal()
+    try:
+        batch = []
+        rows = dream_store.iter_similarity_rows(db, ml_logic.EMBEDDING_MODEL, after_id=after_id, batch_size=batch_size)
+        for row in rows:
+            vec = ml_logic.decode_embedding(row.embedding, row.embedding_dim)
+            if vec is not None:
+                batch.append((row.id, vec, row.date_occurred))
+            if len(batch) >= batch_size:
+                added += index.add_many(*zip(*batch))
+                batch = []
+        if batch:
+            added += index.add_many(*zip(*batch))
+    finally:
+        db.close()
+        index.close()
+    print(f"✅ Snapshot {index.path}: {added} vise noi ({len(index)} în total).")
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dream backend maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("migrate", help="Create missing tables, columns and indexes")
+
+    backfill = sub.add_parser("backfill-embeddings", help="Store embeddings for dreams that do not have one yet")
+    backfill.add_argument("--batch-size", type=int, default=32)
+    backfill.add_argument("--limit", type=int, default=None)
+
+    simhash_backfill = sub.add_parser("backfill-simhash", help="Store SimHash fingerprints for dreams that do not have one yet")
+    simhash_backfill.add_argument("--batch-size", type=int, default=500)
+
+    sub.add_parser("rebuild-daily-stats", help="Recompute the per-day theme/motif aggregates")
+
+    sub.add_parser("rebuild-clusters", help="Recompute the per-day semantic clusters from stored embeddings")
+
+    sub.add_parser("rebuild-search-index", help="Recompute the motif/emotion/theme index and the full-text index")
+
+    build = sub.add_parser("build-snapshot", help="Append stored embeddings to the shared memory-mapped snapshot")
+    build.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    if args.command == "migrate":
+        migrate()
+    elif args.command == "backfill-embeddings":
+        backfill_embeddings(batch_size=args.batch_size, limit=args.limit)
+    elif args.command == "backfill-simhash":
+        backfill_simhash(batch_size=args.batch_size)
+    elif args.command == "rebuild-daily-stats":
+        rebuild_daily_stats()
+    elif args.command == "rebuild-clusters":
+        rebuild_clusters()
+    elif args.command == "rebuild-search-index":
+        rebuild_search_index()
+    elif args.command == "build-snapshot":
+        build_snapshot(batch_size=args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
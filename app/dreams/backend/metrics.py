@@ -0,0 +1,175 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# =========================
+# METRICI (FORMAT PROMETHEUS)
+# =========================
+# Contoare + histograme in-process, expuse ca text la `GET /metrics`.
+# Fără dependințe: formatul text Prometheus e simplu, iar costul pe request
+# e un lookup în dict + un bisect sub lock.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [counts per bucket (+Inf la final), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> dict:
+        series = self._series.get(tuple(sorted(labels.items())))
+        if series is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": series[2], "sum": series[1]}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Valoare citită la fiecare scrape (ex: adâncimea cozii, mărimea indexului)."""
+
+    def __init__(self, name: str, help_text: str, read, label: str = None):
+        self.name = name
+        self.help = help_text
+        self.read = read    # () -> număr sau {valoare_label: număr}
+        self.label = label  # numele label-ului când `read` returnează un dict
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for label_value, v in sorted(value.items()):
+                lines.append(f"{self.name}{_format_labels(((self.label, label_value),))} {_format_value(v)}")
+        elif value is not None:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+_registry = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name: str, help_text: str, read, label: str = None) -> Gauge:
+    return _register(Gauge(name, help_text, read, label))
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# METRICILE APLICAȚIEI
+# -------------------------
+# Etape: sanitize, groq, embedding, db_fetch (completarea indexului), scoring,
+# rerank (vectorii float32 pentru indexul compact), commit
+stage_seconds = _register(Histogram(
+    "dream_stage_duration_seconds", "Duration of each dream analysis stage.",
+))
+request_seconds = _register(Histogram(
+    "dream_http_request_duration_seconds", "HTTP request latency by route.",
+))
+similarity_outcomes = _register(Counter(
+    "dream_similarity_outcomes_total", "Similarity results by label (incl. API_LIMIT, CALC_ERROR, DIM_ERROR).",
+))
+provider_errors = _register(Counter(
+    "dream_provider_errors_total", "Failed provider calls by provider and reason.",
+))
+near_duplicates = _register(Counter(
+    "dream_near_duplicate_total", "Embedding calls skipped because a SimHash near-duplicate supplied the vector.",
+))
+local_fallbacks = _register(Counter(
+    "dream_local_fallback_total", "Interpretations served by local_fallback because Groq failed.",
+))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def timed(stage: str):
+    """`with metrics.timed("groq"): ...` - merge și în jurul unui `await`."""
+    return stage_seconds.time(stage=stage)
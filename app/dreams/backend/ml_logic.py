@@ -1,18 +1,36 @@
+import asyncio
 import json
+import logging
 import os
-import bleach
-import requests
+import threading
+import time
 import numpy as np
-from datetime import datetime, timedelta  # <--- IMPORT NOU
-from sklearn.metrics.pairwise import cosine_similarity
-from groq import Groq
-import traceback # Import necesar pentru a vedea eroarea exactă
+from datetime import datetime, date, timedelta  # <--- IMPORT NOU
+
+import dream_store
+import metrics
+import simhash
+from database import SessionLocal, SQLALCHEMY_DATABASE_URL
+from http_clients import clients
+from resilience import (
+    Deadline, GROQ_BUDGET_SHARE, ANALYSIS_DEADLINE_SECONDS,
+    groq_breaker, embedding_breaker, bulk_groq_breaker, bulk_embedding_breaker,
+)
+from batching import EmbeddingBatcher
+from embeddings import get_embedding_provider
+from cache import analysis_cache
+from vector_index import VectorIndex, index_from_env, normalize
+from simhash import SimHashIndex
+
+# Logurile de debug (pe fiecare vis) costă doar dacă LOG_LEVEL=DEBUG
+logger = logging.getLogger(__name__)
 
 # =========================
 # 1. HELPER FUNCTIONS
 # =========================
 def sanitize_text(text: str) -> str:
     if not text: return ""
+    import bleach  # import leneș: ~25 ms scoși din pornire (vezi main.prewarm)
     return bleach.clean(text, tags=[], strip=True)
 
 def parse_date(date_input):
@@ -33,16 +51,10 @@ def parse_date(date_input):
 # =========================
 # 2. AI INTERPRETATION (GROQ - TEXT)
 # =========================
-# (Această funcție rămâne neschimbată)
-def interpret_dream_groq(dream_text: str) -> dict:
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        print("❌ EROARE: Lipsă GROQ_API_KEY")
-        return None
+GROQ_MODEL = "llama-3.3-70b-versatile"
 
-    client = Groq(api_key=api_key)
-    
-    prompt = f"""
+def build_groq_prompt(dream_text: str) -> str:
+    return f"""
     You are a Jungian dream analyst.
     Return ONLY valid JSON. Do not write an introduction.
 
@@ -60,21 +72,92 @@ def interpret_dream_groq(dream_text: str) -> dict:
     {dream_text}
     """.strip()
 
+def interpret_dream_groq(dream_text: str, timeout: float = None) -> dict:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.error("❌ EROARE: Lipsă GROQ_API_KEY")
+        metrics.provider_errors.inc(provider="groq", reason="missing_key")
+        return None
+
+    client = clients.groq(api_key)  # pool keep-alive partajat, nu client nou per vis
+    prompt = build_groq_prompt(dream_text)
+
     try:
         completion = client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile", 
+            model=GROQ_MODEL, 
             response_format={"type": "json_object"}, 
+            **({"timeout": timeout} if timeout else {}),  # partea Groq din deadline-ul analizei
+        )
+        return json.loads(completion.choices[0].message.content)
+    except Exception as e:
+        logger.warning("Groq API Error: %s", e)
+        metrics.provider_errors.inc(provider="groq", reason=type(e).__name__)
+        return None
+
+async def interpret_dream_groq_async(dream_text: str) -> dict:
+    """Varianta async: nu blochează un worker din threadpool cât așteptăm LLM-ul."""
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.error("❌ EROARE: Lipsă GROQ_API_KEY")
+        metrics.provider_errors.inc(provider="groq", reason="missing_key")
+        return None
+
+    client = clients.async_groq(api_key)
+    prompt = build_groq_prompt(dream_text)
+
+    try:
+        completion = await client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=GROQ_MODEL,
+            response_format={"type": "json_object"},
         )
         return json.loads(completion.choices[0].message.content)
     except Exception as e:
-        print(f"Groq API Error: {e}")
+        logger.warning("Groq API Error: %s", e)
+        metrics.provider_errors.inc(provider="groq", reason=type(e).__name__)
         return None
 
+async def stream_dream_groq_async(dream_text: str, timeout: float = None):
+    """
+    Aceeași cerere ca `interpret_dream_groq_async`, dar cu `stream=True`: produce
+    fragmentele de text pe măsură ce sosesc. JSON mode nu merge cu streaming la Groq,
+    așa că JSON-ul e parsat la final (`parse_interpretation`).
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.error("❌ EROARE: Lipsă GROQ_API_KEY")
+        metrics.provider_errors.inc(provider="groq", reason="missing_key")
+        return
+
+    client = clients.async_groq(api_key)
+    stream = await client.chat.completions.create(
+        messages=[{"role": "user", "content": build_groq_prompt(dream_text)}],
+        model=GROQ_MODEL,
+        stream=True,
+        **({"timeout": timeout} if timeout else {}),
+    )
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+def parse_interpretation(text: str):
+    """JSON-ul din răspunsul (streaming) al modelului; tolerează text în jurul obiectului."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
 # =========================
 # 3. FALLBACK LOGIC
 # =========================
 def local_fallback(dream_text: str):
+    metrics.local_fallbacks.inc()
     return {
         "summary": "Analysis unavailable.",
         "motifs": ["System Offline"],
@@ -85,147 +168,322 @@ def local_fallback(dream_text: str):
     }
 
 # =========================
-# 4. SIMILARITY LOGIC (Hugging Face API - MATH + TIME)
+# 4. SIMILARITY LOGIC (Embedding Provider - MATH + TIME)
 # =========================
-def get_embedding_from_api(text_or_list):
-    hf_token = os.getenv("HF_TOKEN")
-    if not hf_token:
-        print("❌ Lipsă HF_TOKEN")
+# Modelul și dimensiunea vin din providerul selectat (HF implicit, sau local/offline)
+embedding_provider = get_embedding_provider()
+EMBEDDING_MODEL = embedding_provider.name
+EMBEDDING_DIM = embedding_provider.dim
+embedding_batcher = EmbeddingBatcher(embedding_provider)
+
+def encode_embedding(vec) -> bytes:
+    """Serializează vectorul ca float32 little-endian (pentru coloana `Dream.embedding`)."""
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+def decode_embedding(blob, dim: int = None):
+    """Inversul lui `encode_embedding`. Returnează None dacă blob-ul lipsește sau e corupt."""
+    if not blob:
         return None
-        
-    api_url = "https://router.huggingface.co/hf-inference/models/BAAI/bge-small-en-v1.5"
-    headers = {"Authorization": f"Bearer {hf_token}"}
-    
-    # --- FIX 1: Gestionare corectă a input-ului (List vs String) ---
-    if isinstance(text_or_list, list):
-        payload_inputs = text_or_list  # Trimitem lista direct, nu [lista]
+    vec = np.frombuffer(blob, dtype="<f4")
+    if dim and vec.shape[0] != dim:
+        return None
+    return vec
+
+def embedding_columns(vec) -> dict:
+    """Valorile pentru coloanele de embedding ale unui `models.Dream` nou."""
+    if vec is None or len(vec) == 0:
+        return {"embedding": None, "embedding_model": None, "embedding_dim": None}
+    return {
+        "embedding": encode_embedding(vec),
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_dim": len(vec),
+    }
+
+def stored_embedding(d):
+    """
+    Vectorul salvat pentru un vis vechi (obiect ORM sau dict).
+    Ignorăm vectorii generați cu alt model - aceia trebuie refăcuți cu backfill.
+    """
+    if isinstance(d, dict):
+        blob, model, dim = d.get("embedding"), d.get("embedding_model"), d.get("embedding_dim")
     else:
-        payload_inputs = [text_or_list] # Trimitem lista cu un element
-    
-    try:
-        payload = {
-            "inputs": payload_inputs, 
-            "options": {"wait_for_model": True}
-        }
-        
-        response = requests.post(api_url, headers=headers, json=payload, timeout=20) # Timeout mai mare pt batch
-        
-        if response.status_code != 200:
-            print(f"HF API Error: {response.status_code} - {response.text}")
-            return None
-            
-        data = response.json()
-        
-        # Verificăm dacă avem eroare în JSON
-        if isinstance(data, dict) and 'error' in data:
-            print(f"HF API Error Message: {data['error']}")
-            return None
+        blob = getattr(d, "embedding", None)
+        model = getattr(d, "embedding_model", None)
+        dim = getattr(d, "embedding_dim", None)
+
+    if model != EMBEDDING_MODEL:
+        return None
+    return decode_embedding(blob, dim)
+
+def get_embedding_from_api(text_or_list, timeout: float = None):
+    """
+    Embedding prin providerul activ (EMBEDDING_PROVIDER).
+    Un string -> vector plat; o listă de string-uri -> listă de vectori.
+    """
+    if isinstance(text_or_list, list):
+        return embedding_provider.embed(text_or_list, timeout=timeout)
+    vectors = embedding_provider.embed([text_or_list], timeout=timeout)
+    return vectors[0] if vectors else None
 
-        # --- FIX 2: Gestionare corectă a output-ului ---
-        # Dacă am trimis un singur string, vrem un vector 1D (listă de float).
-        # Dacă am trimis o listă de string-uri, vrem o matrice (listă de liste).
+async def get_embedding_async(text_or_list):
+    """
+    Varianta async a `get_embedding_from_api`.
+    Un singur text trece prin micro-batcher: request-urile simultane pleacă într-un singur apel.
+    """
+    if isinstance(text_or_list, list):
+        return await embedding_provider.aembed(text_or_list)
+    if embedding_batcher.enabled:
+        return await embedding_batcher.embed(text_or_list)
+    vectors = await embedding_provider.aembed([text_or_list])
+    return vectors[0] if vectors else None
         
-        if isinstance(text_or_list, str):
-            # API returnează de obicei [[0.1, ...]] pentru un singur input
-            if isinstance(data, list) and len(data) > 0 and isinstance(data[0], list):
-                return data[0] # Returnăm vectorul plat
-            return data
-            
-        # Pentru liste multiple, returnăm tot răspunsul (lista de vectori)
-        return data
+# =========================
+# 4b. INDEX DE SIMILARITATE (tot corpusul, in-memory)
+# =========================
+SYNC_WINDOW_DAYS = 2  # fereastra de sincronicitate (±zile)
 
-    except Exception as e:
-        print(f"Embedding Error: {e}")
+_similarity_index = None
+_similarity_index_lock = threading.Lock()
+
+# Amprentele SimHash ale acelorași vise (completat odată cu indexul de similaritate)
+near_duplicate_index = SimHashIndex()
+
+def exact_embeddings(ids: list) -> dict:
+    """
+    Vectorii float32 salvați în DB, pentru re-ranking-ul indexului compact
+    (SIMILARITY_INDEX_STORAGE=float16/int8). De obicei doar câteva rânduri per query.
+    """
+    with metrics.timed("rerank"), SessionLocal() as db:
+        return {row.id: stored_embedding(row) for row in dream_store.similarity_rows_by_ids(db, ids)}
+
+def get_similarity_index() -> VectorIndex:
+    """Indexul global al procesului (creat leneș, la primul vis)."""
+    global _similarity_index
+    if _similarity_index is None:
+        with _similarity_index_lock:
+            if _similarity_index is None:
+                _similarity_index = index_from_env(EMBEDDING_DIM, rerank=exact_embeddings, model=EMBEDDING_MODEL,
+                                                   database=SQLALCHEMY_DATABASE_URL)
+    return _similarity_index
+
+def close_similarity_index():
+    """La oprire: indexul shardat își oprește pool-ul de procese, snapshot-ul își închide fișierele."""
+    close = getattr(_similarity_index, "close", None)
+    if close is not None:
+        close()
+
+def _dream_attr(d, name):
+    if isinstance(d, dict):
+        return d.get(name)
+    return getattr(d, name, None)
+
+def as_date(value):
+    """datetime / date / string ISO -> date (sau None)."""
+    if value is None:
         return None
-        
-def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj: datetime = None):
-    print(f"--- START MATH: '{new_text[:20]}...' ---")
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return parse_date(value).date()
+    return None
+
+def sync_similarity_index(previous_dreams) -> int:
+    """
+    Adaugă în index visele care lipsesc (fără rebuild).
+    Returnează câte vise au fost adăugate.
+    """
+    index = get_similarity_index()
+    added = 0
+    for d in previous_dreams:
+        dream_id = _dream_attr(d, "id")
+        if dream_id is None or dream_id in index:
+            continue
+        vec = stored_embedding(d)
+        if vec is None:
+            continue
+        if index.add(dream_id, vec, as_date(_dream_attr(d, "date_occurred"))):
+            near_duplicate_index.add(dream_id, _dream_attr(d, "simhash"))
+            added += 1
+    return added
+
+# Câte id-uri re-verificăm sub ultimul id încărcat: tranzacțiile concurente (alt worker)
+# pot face commit în altă ordine decât cea a id-urilor.
+INDEX_SYNC_OVERLAP = 64
+_index_watermark = 0
+
+def _add_rows(index, rows) -> int:
+    added = 0
+    for row in rows:
+        if row.id in index:
+            # Snapshot partajat: vectorul l-a adăugat alt worker, amprenta o ținem noi
+            near_duplicate_index.add(row.id, row.simhash)
+            continue
+        vec = decode_embedding(row.embedding, row.embedding_dim)
+        if vec is not None and index.add(row.id, vec, as_date(row.date_occurred)):
+            near_duplicate_index.add(row.id, row.simhash)
+            added += 1
+    return added
+
+def sync_similarity_index_from_db(db, around_day=None) -> int:
+    """
+    Completează indexul doar cu visele noi din DB (id > ultimul id încărcat).
+    La primul apel încarcă tot corpusul, în loturi, doar coloanele necesare.
+
+    Cu `around_day`, verificăm în plus (range query pe indexul `date_occurred`) că toate
+    visele din fereastra de ±SYNC_WINDOW_DAYS sunt în index - SYNCHRONICITY depinde de ele,
+    chiar dacă au fost salvate de alt worker sau completate ulterior prin backfill.
+    """
+    with metrics.timed("db_fetch"):
+        return _sync_index_from_db(db, around_day)
+
+def _sync_index_from_db(db, around_day) -> int:
+    global _index_watermark
+    index = get_similarity_index()
+    if not _index_watermark and getattr(index, "watermark", 0):
+        # Snapshot-ul partajat are deja vectorii până la `watermark`: nu-i recitim din DB,
+        # luăm doar amprentele SimHash (două coloane mici)
+        _index_watermark = index.watermark
+        for row in dream_store.iter_fingerprints(db, _index_watermark):
+            near_duplicate_index.add(row.id, row.simhash)
+    after_id = max(0, _index_watermark - INDEX_SYNC_OVERLAP)
+
+    added = 0
+    for row in dream_store.iter_similarity_rows(db, EMBEDDING_MODEL, after_id=after_id):
+        added += _add_rows(index, (row,))
+        if row.id > _index_watermark:
+            _index_watermark = row.id
+
+    day = as_date(around_day)
+    if day is not None:
+        window_ids = dream_store.ids_in_date_window(db, EMBEDDING_MODEL, day, SYNC_WINDOW_DAYS)
+        missing = [i for i in window_ids if i not in index]
+        if missing:
+            added += _add_rows(index, dream_store.similarity_rows_by_ids(db, missing))
+    return added
+
+def register_dream(dream_id: int, vec, date_occurred, fingerprint: int = None) -> bool:
+    """Adaugă în index un vis abia salvat, ca următorul request să-l vadă imediat."""
+    if vec is None or len(vec) == 0:
+        return False
+    if not get_similarity_index().add(dream_id, vec, as_date(date_occurred)):
+        return False
+    near_duplicate_index.add(dream_id, fingerprint)
+    return True
+
+def near_duplicate_vector(fingerprint: int, shingle_count: int):
+    """
+    Vectorul unui vis aproape identic (SimHash la distanță ≤ SIMHASH_TWIN_DISTANCE),
+    citit din rândul lui din DB - fără apel la API-ul de embedding. Nu din index: cu
+    SIMILARITY_INDEX_STORAGE=float16/int8 vectorul de acolo e aproximat, iar el se salvează
+    ca embedding-ul visului nou. Scoring-ul îl găsește apoi pe geamăn cu scor 1.0, deci
+    eticheta iese TWIN_CONNECTION / SYNCHRONICITY.
+    None dacă nu e un geamăn sigur (text prea scurt, nicio potrivire) -> drumul normal.
+    Citește din DB (doar când există un candidat): din cod async se apelează în threadpool.
+    """
+    if fingerprint is None or shingle_count < simhash.SIMHASH_MIN_SHINGLES:
+        return None
+    index = get_similarity_index()
+    candidates = [(dream_id, distance) for dream_id, distance in near_duplicate_index.query(fingerprint)
+                  if dream_id in index]
+    if not candidates:
+        return None
+    with SessionLocal() as db:
+        vectors = {row.id: stored_embedding(row)
+                   for row in dream_store.similarity_rows_by_ids(db, [dream_id for dream_id, _ in candidates])}
+    for dream_id, distance in candidates:
+        vec = vectors.get(dream_id)
+        if vec is not None:
+            metrics.near_duplicates.inc()
+            logger.debug(" -> Near-duplicate: visul %d (distanță SimHash %d), fără embedding.", dream_id, distance)
+            return vec
+    return None
+
+def _merge_pending(result: dict, v1, pending: list, thresholds, day, window_days: int, temporal_threshold: float) -> dict:
+    """
+    Adaugă la rezultatul indexului visele `pending` [(vector, dată)] - salvate în aceeași
+    tranzacție, dar încă necomise, deci încă nu sunt în index (ex: chunk-ul din bulk import).
+    """
+    q = normalize(v1)
+    rows = [(normalize(vec), d) for vec, d in pending if vec is not None and len(vec) == q.shape[0]]
+    if not rows:
+        return result
+    scores = np.stack([v for v, _ in rows]) @ q
+    best = int(np.argmax(scores))
+    if not result["scores"] or scores[best] > result["scores"][0]:
+        result = {**result, "ids": [None], "scores": [float(scores[best])], "dates": [rows[best][1]]}
+    counts = [c + int(np.count_nonzero(scores > t)) for c, t in zip(result["counts"], thresholds)]
+    temporal = result["temporal_count"]
+    if day is not None:
+        temporal += sum(
+            1 for s, (_, d) in zip(scores, rows)
+            if d is not None and abs((day - d).days) <= window_days and s > temporal_threshold
+        )
+    return {**result, "counts": counts, "temporal_count": temporal}
+
+def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj: datetime = None, new_vec=None,
+                         pending: list = None):
+    """
+    Compară visul nou cu TOT corpusul din indexul in-memory (+ visele `pending`, necomise).
+    `previous_dreams` e folosit doar pentru a completa indexul cu visele care lipsesc.
+    Doar visul nou trece prin API-ul de embedding (sau deloc, dacă primim `new_vec`).
+    """
+    logger.debug("--- START MATH: '%s...' ---", new_text[:20])
     
     if not current_date_obj:
         current_date_obj = datetime.now()
+    current_day = as_date(current_date_obj)
+
+    index = get_similarity_index()
+    if previous_dreams:
+        added = sync_similarity_index(previous_dreams)
+        if added:
+            logger.debug(" -> %d vise noi adăugate în index.", added)
 
     # 1. Verificare Istoric
-    if not previous_dreams:
-        print(" -> Primul vis din baza de date.")
+    if len(index) == 0 and not pending:
+        if previous_dreams:
+            logger.warning(" -> Niciun vis vechi cu embedding salvat (rulează `python manage.py backfill-embeddings`).")
+        else:
+            logger.info(" -> Primul vis din baza de date.")
         return {"percentage": 0, "count": 0, "label": "ORIGIN_POINT", "days_diff_best_match": 999, "temporal_matches": 0}
 
-    # 2. Vectorizare Text NOU
-    new_vec = get_embedding_from_api(new_text)
-    if not new_vec:
-        print(" -> Eroare API Vectorizare (Nou).")
+    # 2. Vectorizare Text NOU (doar dacă nu l-am primit deja)
+    if new_vec is None:
+        new_vec = embedding_breaker.call(get_embedding_from_api, new_text)
+    if new_vec is None or len(new_vec) == 0:
+        logger.warning(" -> Eroare API Vectorizare (Nou).")
         return {"percentage": 0, "count": 0, "label": "API_LIMIT"}
 
-    # 3. Pregătire Date VECHI
-    recent_dreams = previous_dreams[-100:] 
-    old_data = []
+    # Praguri
+    BROAD_THRESHOLD = 0.45   # Prag pentru Arhetipuri
+    STRICT_THRESHOLD = 0.82  # Prag pentru Identice
 
-    for d in recent_dreams:
-        content = ""
-        if hasattr(d, 'content'): content = d.content
-        elif isinstance(d, dict): content = d.get('content', '')
-        
-        raw_date = None
-        if hasattr(d, 'date_occurred'): raw_date = d.date_occurred
-        elif isinstance(d, dict): raw_date = d.get('date_occurred')
-        
-        # Parsare simplificată a datei
-        try:
-            if isinstance(raw_date, str):
-                parsed_date = parse_date(raw_date) # Folosim helper-ul tău
-            elif isinstance(raw_date, datetime):
-                parsed_date = raw_date
-            elif hasattr(raw_date, 'date'): # date object
-                 parsed_date = datetime(raw_date.year, raw_date.month, raw_date.day)
-            else:
-                parsed_date = datetime.now()
-        except:
-            parsed_date = datetime.now()
-
-        if content and len(content) > 1:
-            old_data.append({
-                "text": content,
-                "date": parsed_date
-            })
-
-    if not old_data:
-         return {"percentage": 0, "count": 0, "label": "ORIGIN_POINT"}
-
-    old_texts = [x['text'] for x in old_data]
-    print(f" -> Comparăm cu {len(old_texts)} vise anterioare.")
+    logger.debug(" -> Comparăm cu %d vise anterioare.", len(index))
 
     try:
-        # 4. Vectorizare Date VECHI (Batch Request)
-        old_vecs = get_embedding_from_api(old_texts)
-        
-        if not old_vecs or not isinstance(old_vecs, list):
-            print(" -> Eroare API Vectorizare (Vechi) sau format incorect.")
-            return {"percentage": 0, "count": 0, "label": "CALC_SKIP"}
+        v1 = np.asarray(new_vec, dtype=np.float32).reshape(-1)
 
-        # 5. MATEMATICĂ & RESHAPE
-        v1 = np.array(new_vec)
-        v2 = np.array(old_vecs) # Aici ar trebui să fie matrice (N, 384)
-        
-        # Corecții dimensiuni pentru Scikit-Learn
-        if v1.ndim == 1: 
-            v1 = v1.reshape(1, -1)
-            
-        # Corecție Critică: Dacă v2 a ieșit 1D (un singur vis vechi), îl facem 2D
-        if v2.ndim == 1: 
-            v2 = v2.reshape(1, -1)
-
-        print(f" -> Dimensiuni Vectori: New={v1.shape}, Old={v2.shape}")
-
-        # Dacă dimensiunile nu se potrivesc (de ex. old_vecs a eșuat parțial), oprim
-        if v1.shape[1] != v2.shape[1]:
-            print(f"❌ Mismatch dimensiuni vectori: {v1.shape[1]} vs {v2.shape[1]}")
+        # Dacă dimensiunile nu se potrivesc (alt model / răspuns corupt), oprim
+        if v1.shape[0] != index.dim:
+            logger.error("❌ Mismatch dimensiuni vectori: %d vs %d", v1.shape[0], index.dim)
             return {"percentage": 0, "count": 0, "label": "DIM_ERROR"}
 
-        # Calcul Cosine Similarity
-        scores = cosine_similarity(v1, v2)[0]
-        
+        # 3. Un singur matvec: top-1 + numărători peste praguri + potrivirile stricte din ±2 zile
+        result = index.query(
+            v1, k=1,
+            thresholds=(BROAD_THRESHOLD, STRICT_THRESHOLD),
+            day=current_day, window_days=SYNC_WINDOW_DAYS,
+            temporal_threshold=STRICT_THRESHOLD,
+        )
+        if pending:
+            result = _merge_pending(result, v1, pending, (BROAD_THRESHOLD, STRICT_THRESHOLD),
+                                    current_day, SYNC_WINDOW_DAYS, STRICT_THRESHOLD)
+
         # --- LOGICA DE SCORING ---
-        raw_max_score = float(max(scores))
-        print(f" -> Scor Maxim Brut: {raw_max_score}")
+        raw_max_score = float(result["scores"][0])
+        logger.debug(" -> Scor Maxim Brut: %s", raw_max_score)
 
         # Calibrare
         NOISE_FLOOR = 0.60
@@ -239,74 +497,21 @@ def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj:
             max_percentage = int(adjusted_score * 100)
             if max_percentage > 100: max_percentage = 100
 
-        # ==========================================
-        # ⬇️ BLOCUL LIPSĂ (Adaugă-l aici) ⬇️
-        # ==========================================
-        
-        # 1. Găsim indexul celui mai bun match (chiar dacă e visul curent)
-        best_match_idx = int(np.argmax(scores))
-        
-        # 2. Inițializăm days_diff cu o valoare mare (default)
+        # Diferența de zile față de cel mai bun match
         days_diff = 999 
+        best_date = result["dates"][0]
+        if best_date is not None and current_day is not None:
+            days_diff = abs((current_day - best_date).days)
         
-        # 3. Calculăm diferența reală de zile
-        if best_match_idx < len(old_data):
-            best_date = old_data[best_match_idx]['date']
-            
-            # Asigurăm compatibilitatea tipurilor de dată
-            if isinstance(best_date, str):
-                 try:
-                    best_date = datetime.fromisoformat(best_date)
-                 except:
-                    pass
-            
-            # Calcul diferență
-            if isinstance(current_date_obj, datetime) and isinstance(best_date, datetime):
-                days_diff = abs((current_date_obj - best_date).days)
-            elif hasattr(current_date_obj, 'date') and hasattr(best_date, 'date'):
-                 days_diff = abs((current_date_obj.date() - best_date.date()).days)
-        
-        print(f" -> Diferență Zile (Best Match): {days_diff}")
-        
-        # ==========================================
-        # ⬆️ GATA BLOCUL LIPSĂ ⬆️
-        # ==========================================
+        logger.debug(" -> Diferență Zile (Best Match): %s", days_diff)
 
-        # Găsim indexul celui mai bun match
-        best_match_idx = int(np.argmax(scores))
-        
-        # --- DEBUG & NUMĂRARE DUALĂ ---
-        count = 0        # Numărătoare largă (> 45%) - Pentru afișare Frontend (Archetypes)
-        strict_count = 0 # Numărătoare strictă (> 82%) - Pentru logica de Twin/Sync
-        temporal_matches = 0
-        
-        # Praguri
-        BROAD_THRESHOLD = 0.45   # Prag pentru Arhetipuri
-        STRICT_THRESHOLD = 0.82  # Prag pentru Identice
-
-        print(f"\n--- ANALIZĂ DETALIATĂ ---")
-
-        for idx, score in enumerate(scores):
-            # 1. Calculăm COUNT (Pentru afișare - include și arhetipurile)
-            if score > BROAD_THRESHOLD:
-                count += 1
-            
-            # 2. Calculăm STRICT_COUNT (Pentru logica de etichetare)
-            if score > STRICT_THRESHOLD:
-                strict_count += 1
-                
-                # Debug doar pentru cele stricte
-                match_text = old_data[idx]['text']
-                match_date = old_data[idx]['date']
-                print(f"   [STRICT MATCH #{strict_count}] Scor: {score:.4f} | Data: {match_date}")
-
-                # Verificăm sincronicitatea (timp)
-                if isinstance(match_date, datetime):
-                     delta = abs((current_date_obj - match_date).days)
-                     if delta <= 2: 
-                         temporal_matches += 1
+        # --- NUMĂRARE DUALĂ ---
+        count, strict_count = result["counts"]  # > 45% (afișare Frontend) / > 82% (Twin/Sync)
+
+        # Sincronicitate (timp): potrivirile stricte din fereastra de ±2 zile (mască vectorizată)
+        temporal_matches = result["temporal_count"]
         
-        print(f"--- TOTAL BROAD: {count} | TOTAL STRICT: {strict_count} ---\n")
+        logger.debug("--- TOTAL BROAD: %d | TOTAL STRICT: %d ---", count, strict_count)
 
         # --- LOGICA ETICHETELOR FINALĂ (Folosim strict_count pentru decizii majore) ---
         label = "UNIQUE_VISION"
@@ -320,7 +525,7 @@ def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj:
                  label = "TWIN_CONNECTION"
 
         # CAZ 2: SINCRONICITATE TEMPORALĂ
-        elif max_percentage > 85 and days_diff <= 2:
+        elif max_percentage > 85 and days_diff <= SYNC_WINDOW_DAYS:
              label = "SYNCHRONICITY" 
 
         # CAZ 3: REZONANȚĂ PUTERNICĂ
@@ -345,7 +550,7 @@ def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj:
             label = "UNIQUE_VISION"
             count = 0 # Forțăm 0 dacă e unic
 
-        print(f" -> REZULTAT FINAL: {max_percentage}% | {label} | Count Afișat: {count}")
+        logger.debug(" -> REZULTAT FINAL: %d%% | %s | Count Afișat: %d", max_percentage, label, count)
 
         return {
             "percentage": max_percentage, 
@@ -355,45 +560,309 @@ def calculate_similarity(new_text: str, previous_dreams: list, current_date_obj:
             "temporal_matches": temporal_matches
         }
 
-    except Exception as e:
-        print("❌ CRITICAL ERROR IN MATH LOGIC:")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("❌ CRITICAL ERROR IN MATH LOGIC:")
         return {"percentage": 0, "count": 0, "label": "CALC_ERROR"}
 
 # =========================
 # 5. MAIN ENTRY POINT
 # =========================
-def analyze_new_dream(new_dream_text: str, all_previous_dreams: list, current_date_str: str = None):
-    """
-    Main entry point.
-    Optional: 'current_date_str' poate fi data visului curent (dacă e din jurnal vechi).
-    Dacă e None, se folosește data de azi.
-    """
-    clean_text = sanitize_text(new_dream_text)
-    
+def _timed(stage: str, fn):
+    """Apelul la provider (doar la cache miss) intră în histograma etapei `stage`."""
+    def run(text):
+        with metrics.timed(stage):
+            return fn(text)
+    return run
+
+def _timed_async(stage: str, fn):
+    async def run(text):
+        with metrics.timed(stage):
+            return await fn(text)
+    return run
+
+def _current_date(current_date_str: str = None) -> datetime:
     # Parsăm data curentă
     if current_date_str:
-        current_date = parse_date(current_date_str)
-    else:
-        current_date = datetime.now()
+        return parse_date(current_date_str)
+    return datetime.now()
 
-    # 1. AI Interpretation (Groq)
-    analysis = interpret_dream_groq(clean_text)
-    if not analysis:
-        analysis = local_fallback(clean_text)
+def _has_previous_dreams() -> bool:
+    with SessionLocal() as db:
+        return dream_store.has_analyzed_dreams(db)
 
-    # 2. Math Stats (HF API + Time Logic)
-    stats = calculate_similarity(clean_text, all_previous_dreams, current_date)
+def _similarity_stats(clean_text: str, new_vec, current_date: datetime, all_previous_dreams: list = None,
+                      pending: list = None) -> dict:
+    # Indexul gol nu înseamnă "primul vis": pot exista vise fără embedding (ex: înainte de backfill)
+    if new_vec is None and (all_previous_dreams or pending or len(get_similarity_index()) > 0 or _has_previous_dreams()):
+        # API-ul a picat deja o dată - nu mai încercăm încă un request
+        return {"percentage": 0, "count": 0, "label": "API_LIMIT"}
+    with metrics.timed("scoring"):
+        return calculate_similarity(clean_text, all_previous_dreams, current_date, new_vec=new_vec, pending=pending)
 
+def _resonance_payload(stats: dict) -> dict:
     return {
-        "interpretation": analysis, 
         "resonance": {
             "percentage": stats.get('percentage', 0),
             "label": stats.get('label', 'UNKNOWN'),
-            "is_sync": stats.get('days_diff_best_match', 999) <= 2  # Flag simplu pentru frontend
+            "is_sync": stats.get('days_diff_best_match', 999) <= SYNC_WINDOW_DAYS  # Flag simplu pentru frontend
         },
         "similarity": {
             "similar_count": stats.get('count', 0),
             "temporal_matches": stats.get('temporal_matches', 0)
         }
-    }
\ No newline at end of file
+    }
+
+def _analysis_result(analysis: dict, new_vec, stats: dict, degraded: bool = False, fingerprint: int = None) -> dict:
+    metrics.similarity_outcomes.inc(label=stats.get('label', 'UNKNOWN'))
+    return {
+        "interpretation": analysis, 
+        "embedding": new_vec,
+        "simhash": simhash.to_signed(fingerprint),
+        # True dacă unul dintre provideri a picat (fallback / fără vector) - util pentru retry
+        "degraded": degraded or new_vec is None,
+        # Doar interpretarea e `local_fallback` (Groq a picat): temele / motivele ei nu sunt reale
+        "fallback": degraded,
+        **_resonance_payload(stats),
+    }
+
+async def _new_vector_async(clean_text: str, twin_vec, deadline: Deadline):
+    """Embedding-ul visului nou (async): vectorul geamănului, din cache sau de la provider."""
+    if twin_vec is not None:
+        return twin_vec
+    return await analysis_cache.get_or_compute_async("embedding", clean_text, EMBEDDING_MODEL, _timed_async("embedding", lambda t: embedding_breaker.acall(
+        get_embedding_async, t, timeout=deadline.budget(1 - GROQ_BUDGET_SHARE)
+    )))
+
+def analyze_new_dream(new_dream_text: str, all_previous_dreams: list = None, current_date_str: str = None, db=None):
+    """
+    Main entry point.
+    Optional: 'current_date_str' poate fi data visului curent (dacă e din jurnal vechi).
+    Dacă e None, se folosește data de azi.
+    Dacă primim `db`, indexul se completează direct din DB (doar visele noi).
+    """
+    with metrics.timed("sanitize"):
+        clean_text = sanitize_text(new_dream_text)
+
+    current_date = _current_date(current_date_str)
+    deadline = Deadline()
+
+    if db is not None:
+        sync_similarity_index_from_db(db, around_day=current_date)
+    fingerprint, shingle_count = simhash.fingerprint(clean_text)
+
+    # 1. AI Interpretation (Groq) - din cache dacă textul a mai fost analizat
+    # Circuit deschis / peste buget -> None -> local_fallback, fără să mai așteptăm
+    analysis = analysis_cache.get_or_compute("interpretation", clean_text, GROQ_MODEL, _timed("groq", lambda t: groq_breaker.call(
+        interpret_dream_groq, t, timeout=deadline.budget(GROQ_BUDGET_SHARE)
+    )))
+    degraded = not analysis
+    if not analysis:
+        analysis = local_fallback(clean_text)
+
+    # 2. Embedding pentru visul NOU (se salvează în DB, nu se mai recalculează)
+    # Un near-duplicate (SimHash) ne dă vectorul direct; altfel embedding-ul primește
+    # ce a rămas din deadline după Groq
+    new_vec = near_duplicate_vector(fingerprint, shingle_count)
+    if new_vec is None:
+        new_vec = analysis_cache.get_or_compute("embedding", clean_text, EMBEDDING_MODEL, _timed("embedding", lambda t: embedding_breaker.call(
+            get_embedding_from_api, t, timeout=deadline.budget()
+        )))
+
+    # 3. Math Stats (vectori salvați + Time Logic)
+    stats = _similarity_stats(clean_text, new_vec, current_date, all_previous_dreams)
+
+    return _analysis_result(analysis, new_vec, stats, degraded, fingerprint)
+
+async def analyze_new_dream_async(new_dream_text: str, all_previous_dreams: list = None, current_date_str: str = None, db=None):
+    """
+    Aceeași analiză ca `analyze_new_dream`, dar Groq și embedding-ul rulează în paralel:
+    latența totală ≈ max(Groq, HF) în loc de suma lor.
+    Lucrul sincron (DB, matematica pe index) rulează în threadpool, nu pe event loop.
+    """
+    with metrics.timed("sanitize"):
+        clean_text = sanitize_text(new_dream_text)
+    current_date = _current_date(current_date_str)
+    deadline = Deadline()
+    # Near-duplicate pe indexul deja încărcat (nu așteptăm sync-ul din DB pentru asta)
+    fingerprint, shingle_count = simhash.fingerprint(clean_text)
+    twin_vec = await asyncio.to_thread(near_duplicate_vector, fingerprint, shingle_count)
+
+    # 1 + 2. Groq și embedding-ul în paralel (cât timp completăm și indexul din DB)
+    # Textele identice (retry, dublu-submit) vin din cache, fără apel la provider.
+    # Fiecare provider are partea lui din deadline; peste ea apelul e anulat -> fallback.
+    tasks = [
+        analysis_cache.get_or_compute_async("interpretation", clean_text, GROQ_MODEL, _timed_async("groq", lambda t: groq_breaker.acall(
+            interpret_dream_groq_async, t, timeout=deadline.budget(GROQ_BUDGET_SHARE)
+        ))),
+        _new_vector_async(clean_text, twin_vec, deadline),
+    ]
+    if db is not None:
+        tasks.append(asyncio.to_thread(sync_similarity_index_from_db, db, current_date))
+    analysis, new_vec, *_ = await asyncio.gather(*tasks)
+
+    degraded = not analysis
+    if not analysis:
+        analysis = local_fallback(clean_text)
+
+    # 3. Math Stats (vectori salvați + Time Logic)
+    stats = await asyncio.to_thread(_similarity_stats, clean_text, new_vec, current_date, all_previous_dreams)
+
+    return _analysis_result(analysis, new_vec, stats, degraded, fingerprint)
+
+# =========================
+# 6. BATCH (IMPORT JURNAL)
+# =========================
+async def embed_texts_async(clean_texts: list) -> list:
+    """
+    Vectorii pentru o listă de texte: ce e în cache vine din cache, restul
+    pleacă într-un singur apel batch la provider. None pe pozițiile eșuate.
+    Breaker separat de traficul live (vezi resilience.py).
+    """
+    def known_vector(text):
+        # Near-duplicate (SimHash) sau cache - ambele fără apel la provider
+        twin_vec = near_duplicate_vector(*simhash.fingerprint(text))
+        return twin_vec if twin_vec is not None else analysis_cache.get("embedding", text, EMBEDDING_MODEL)
+
+    vectors = await asyncio.to_thread(lambda: [known_vector(t) for t in clean_texts])
+    missing = list(dict.fromkeys(t for t, v in zip(clean_texts, vectors) if v is None))
+    if missing:
+        with metrics.timed("embedding"):
+            fresh = await bulk_embedding_breaker.acall(embedding_provider.aembed, missing, timeout=ANALYSIS_DEADLINE_SECONDS)
+        if fresh and len(fresh) == len(missing):
+            by_text = dict(zip(missing, fresh))
+            await asyncio.to_thread(
+                lambda: [analysis_cache.set("embedding", t, EMBEDDING_MODEL, v) for t, v in by_text.items()]
+            )
+            vectors = [v if v is not None else by_text.get(t) for t, v in zip(clean_texts, vectors)]
+    return vectors
+
+async def interpret_async(new_dream_text: str):
+    """
+    Doar interpretarea Groq (cache + circuit breaker), fără similaritate - pentru visele
+    salvate degradat. None dacă providerul e tot indisponibil.
+    """
+    clean_text = sanitize_text(new_dream_text)
+    return await analysis_cache.get_or_compute_async("interpretation", clean_text, GROQ_MODEL, _timed_async("groq", lambda t: groq_breaker.acall(
+        interpret_dream_groq_async, t, timeout=ANALYSIS_DEADLINE_SECONDS * GROQ_BUDGET_SHARE
+    )))
+
+async def interpret_texts_async(clean_texts: list, concurrency: int) -> list:
+    """Interpretările Groq cu cel mult `concurrency` apeluri simultane (rate limit), pe breakerul de import."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(text):
+        async with semaphore:
+            return await analysis_cache.get_or_compute_async("interpretation", text, GROQ_MODEL, _timed_async("groq", lambda t: bulk_groq_breaker.acall(
+                interpret_dream_groq_async, t, timeout=ANALYSIS_DEADLINE_SECONDS * GROQ_BUDGET_SHARE
+            )))
+
+    return await asyncio.gather(*(one(t) for t in clean_texts))
+
+def score_analyzed_dream(clean_text: str, analysis: dict, new_vec, current_date: datetime, pending: list = None) -> dict:
+    """
+    Pasul 3 din `analyze_new_dream` pentru un vis deja interpretat + vectorizat.
+    `pending` [(vector, dată)]: vise din aceeași tranzacție, încă neînregistrate în index.
+    """
+    degraded = not analysis
+    if not analysis:
+        analysis = local_fallback(clean_text)
+    stats = _similarity_stats(clean_text, new_vec, current_date, pending=pending)
+    return _analysis_result(analysis, new_vec, stats, degraded, simhash.fingerprint(clean_text)[0])
+
+# =========================
+# 7. STREAMING (SSE)
+# =========================
+_STREAM_END = object()
+
+async def _stream_interpretation(clean_text: str, deadline: Deadline, queue: asyncio.Queue):
+    """
+    Interpretarea Groq pentru streaming: fragmentele merg în `queue` (terminate cu
+    `_STREAM_END`), rezultatul parsat e returnat. Cache, breaker și deadline ca în
+    `analyze_new_dream_async`.
+    """
+    try:
+        cached = await asyncio.to_thread(analysis_cache.get, "interpretation", clean_text, GROQ_MODEL)
+        if cached:
+            return cached
+        if not groq_breaker.allow():
+            metrics.provider_errors.inc(provider="groq", reason="circuit_open")
+            return None
+
+        parts, reason = [], None
+        timeout = deadline.budget(GROQ_BUDGET_SHARE)
+        stream = stream_dream_groq_async(clean_text, timeout=timeout)
+        start = time.perf_counter()
+        try:
+            with metrics.timed("groq"):
+                while True:
+                    # Bugetul Groq acoperă tot stream-ul, nu doar primul fragment
+                    left = max(0.01, timeout - (time.perf_counter() - start))
+                    delta = await asyncio.wait_for(stream.__anext__(), left)
+                    parts.append(delta)
+                    queue.put_nowait(delta)
+        except StopAsyncIteration:
+            pass
+        except asyncio.TimeoutError:
+            reason = "timeout"
+        except Exception as e:
+            reason = type(e).__name__
+            logger.warning("Groq API Error: %s", e)
+        except BaseException:
+            # Clientul SSE s-a deconectat (groq_task.cancel()): proba din HALF_OPEN nu rămâne ocupată
+            groq_breaker.release()
+            raise
+        finally:
+            await stream.aclose()
+
+        analysis = parse_interpretation("".join(parts)) if reason is None else None
+        groq_breaker.record(bool(analysis), time.perf_counter() - start, reason)
+        if analysis:
+            await asyncio.to_thread(analysis_cache.set, "interpretation", clean_text, GROQ_MODEL, analysis)
+        return analysis
+    finally:
+        queue.put_nowait(_STREAM_END)
+
+async def analyze_new_dream_stream(new_dream_text: str, current_date_str: str = None, db=None):
+    """
+    Aceleași etape ca `analyze_new_dream_async`, dar produce evenimente pe parcurs:
+      ("resonance", {...})       - imediat ce embedding-ul + scoring-ul sunt gata
+      ("token", {"text": ...})   - fragmentele interpretării Groq
+      ("interpretation", {...})  - interpretarea finală (sau local_fallback)
+      ("result", analysis_result) - pentru salvare (apelantul emite id-ul)
+    Groq pornește în paralel cu embedding-ul; fragmentele sosite înainte de rezonanță
+    sunt ținute în coadă și trimise imediat după ea.
+    """
+    with metrics.timed("sanitize"):
+        clean_text = sanitize_text(new_dream_text)
+    current_date = _current_date(current_date_str)
+    deadline = Deadline()
+
+    fingerprint, shingle_count = simhash.fingerprint(clean_text)
+    twin_vec = await asyncio.to_thread(near_duplicate_vector, fingerprint, shingle_count)
+
+    queue = asyncio.Queue()
+    groq_task = asyncio.create_task(_stream_interpretation(clean_text, deadline, queue))
+    try:
+        tasks = [_new_vector_async(clean_text, twin_vec, deadline)]
+        if db is not None:
+            tasks.append(asyncio.to_thread(sync_similarity_index_from_db, db, current_date))
+        new_vec, *_ = await asyncio.gather(*tasks)
+
+        stats = await asyncio.to_thread(_similarity_stats, clean_text, new_vec, current_date)
+        yield "resonance", _resonance_payload(stats)
+
+        while True:
+            delta = await queue.get()
+            if delta is _STREAM_END:
+                break
+            yield "token", {"text": delta}
+
+        analysis = await groq_task
+        degraded = not analysis
+        if not analysis:
+            analysis = local_fallback(clean_text)
+        yield "interpretation", analysis
+        yield "result", _analysis_result(analysis, new_vec, stats, degraded, fingerprint)
+    finally:
+        if not groq_task.done():
+            groq_task.cancel()
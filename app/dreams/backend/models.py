@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Text, LargeBinary, Index
 from database import Base
 
 class Dream(Base):
@@ -6,7 +6,7 @@ class Dream(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
-    date_occurred = Column(Date, nullable=False)
+    date_occurred = Column(Date, nullable=False, index=True)
     
     # --- ANALYSIS DATA ---
     # We store the "Cluster Label" (e.g., "COLLECTIVE_ECHO")
@@ -23,4 +23,105 @@ class Dream(Base):
     
     # NEW: We store the full rich data (Motifs, Emotions, Advice) as a JSON string
     # This allows us to save lists like ["water", "flying"] without creating 10 new tables.
-    analysis_json = Column(Text, nullable=True)
\ No newline at end of file
+    analysis_json = Column(Text, nullable=True)
+
+    # --- EMBEDDING DATA ---
+    # The float32 vector (little-endian bytes), computed once at insert time.
+    # We tag it with the model + dimension so we never compare vectors from different models.
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_model = Column(String, nullable=True)
+    embedding_dim = Column(Integer, nullable=True)
+
+    # The semantic cluster of the day this dream was assigned to (see clustering.py)
+    semantic_cluster_id = Column(Integer, nullable=True, index=True)
+
+    # 64-bit SimHash of the sanitized text (signed), for near-duplicate lookups (see simhash.py)
+    simhash = Column(BigInteger, nullable=True)
+
+    # Background job lease: the worker (in any process) that claimed this row until then (see jobs.py)
+    claimed_until = Column(DateTime, nullable=True)
+
+    # Keyset pagination for GET /dreams walks (date_occurred, id) newest first
+    __table_args__ = (
+        Index("ix_dreams_date_occurred_id", "date_occurred", "id"),
+    )
+
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    # sha256 of (kind, model, sanitized text) - see cache.content_key
+    key = Column(String(64), primary_key=True)
+
+    # "interpretation" (Groq JSON) or "embedding" (vector as a JSON list)
+    kind = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    value = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+# --- INVERTED INDEX (for /dreams/search) ---
+# One row per (dream, kind, term) from the interpretation: motifs, emotions, themes.
+# "Dreams about water this week" is a range scan on ix_dream_terms_lookup, not a json.loads per row.
+
+class DreamTerm(Base):
+    __tablename__ = "dream_terms"
+
+    dream_id = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)  # "motif" | "emotion" | "theme"
+    term = Column(String, primary_key=True)  # normalized like the daily aggregates (lowercase, single spaces)
+
+    # Copied from the dream so date-bounded lookups never touch the dreams table
+    date_occurred = Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("ix_dream_terms_lookup", "kind", "term", "date_occurred", "dream_id"),
+    )
+
+
+# --- DAILY AGGREGATES (for /dreams/stats/{date}) ---
+# Updated incrementally on every analyzed dream, so the stats endpoint never reads raw rows.
+
+class DailyDreamCount(Base):
+    __tablename__ = "daily_dream_counts"
+
+    day = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+    # Bumped on every update - used as the ETag of the day
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+class DailyThemeStat(Base):
+    __tablename__ = "daily_theme_stats"
+
+    day = Column(Date, primary_key=True)
+    theme = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class DailyThemeMotif(Base):
+    __tablename__ = "daily_theme_motifs"
+
+    # How often a motif appeared together with a theme on a given day (the cluster keywords)
+    day = Column(Date, primary_key=True)
+    theme = Column(String, primary_key=True)
+    motif = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# --- SEMANTIC CLUSTERS (incremental, per day) ---
+class SemanticCluster(Base):
+    __tablename__ = "semantic_clusters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    embedding_model = Column(String, nullable=False)
+
+    # Sum of the member vectors (float32 bytes); centroid = sum / size, kept exact when members are added
+    vector_sum = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False, default=0)
+
+    # {"water": 3, "teeth": 1} - used for the label
+    motif_counts = Column(Text, nullable=False, default="{}")
+    label = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# DEADLINE + CIRCUIT BREAKERS PENTRU PROVIDERI
+# =========================
+# Fiecare analiză are un buget total (ANALYSIS_DEADLINE_SECONDS) împărțit între
+# Groq și embedding. Peste buget -> fallback (local_fallback / API_LIMIT), nu așteptare.
+#
+# Breaker per provider: după BREAKER_FAILURE_THRESHOLD eșecuri consecutive (eroare,
+# timeout sau apel mai lent decât pragul) trece în OPEN și răspunde imediat cu
+# fallback. După BREAKER_RESET_SECONDS lasă să treacă un singur apel de probă
+# (HALF_OPEN): succes -> CLOSED, eșec -> din nou OPEN.
+#
+# Importul în bloc are breakerele lui: un batch mare e lent prin natura lui și nu
+# trebuie să deschidă circuitul pentru POST-urile interactive (și nici invers).
+# Pragul de apel lent e dezactivat implicit pentru import; erorile și timeout-urile
+# contează în continuare.
+
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "15"))
+GROQ_BUDGET_SHARE = float(os.getenv("GROQ_BUDGET_SHARE", "0.7"))  # restul merge la embedding
+MIN_PROVIDER_TIMEOUT = 0.5
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+GROQ_SLOW_CALL_SECONDS = float(os.getenv("GROQ_SLOW_CALL_SECONDS", "8"))
+EMBEDDING_SLOW_CALL_SECONDS = float(os.getenv("EMBEDDING_SLOW_CALL_SECONDS", "3"))
+BULK_SLOW_CALL_SECONDS = float(os.getenv("BULK_SLOW_CALL_SECONDS", "0"))  # 0 = fără prag
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class Deadline:
+    """Bugetul de timp al unei analize, împărțit între provideri."""
+
+    def __init__(self, seconds: float = None):
+        self.total = ANALYSIS_DEADLINE_SECONDS if seconds is None else seconds
+        self.expires_at = time.monotonic() + self.total
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, share: float = 1.0) -> float:
+        """Timeout-ul pentru un provider: partea lui din total, fără să depășească ce a rămas."""
+        return max(MIN_PROVIDER_TIMEOUT, min(self.total * share, self.remaining()))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, slow_call_seconds: float = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """False -> apelantul folosește fallback-ul fără să mai cheme providerul."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN: un singur apel de probă la un moment dat
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record(self, ok: bool, duration: float, reason: str = None):
+        if ok and self.slow_call_seconds and duration > self.slow_call_seconds:
+            ok, reason = False, "slow_call"
+        if not ok and reason:
+            # Fără `reason`, providerul a raportat deja eroarea (ex: HTTP 503) în metrici
+            metrics.provider_errors.inc(provider=self.name, reason=reason)
+        with self._lock:
+            self._probe_in_flight = False
+            if ok:
+                if self.state != CLOSED:
+                    logger.info("✅ Circuit %s închis (providerul răspunde din nou).", self.name)
+                self.state, self.failures = CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("⚡ Circuit %s deschis după %d eșecuri (%s).", self.name, self.failures, reason or "error")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """
+        Apelul s-a întrerupt fără rezultat (CancelledError, client deconectat): eliberăm
+        proba din HALF_OPEN fără să-l numărăm ca eșec, altfel circuitul rămâne blocat.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, fn, *args, **kwargs):
+        """Apel sincron protejat. Returnează None dacă circuitul e deschis sau apelul eșuează."""
+        if not self.allow():
+            metrics.provider_errors.inc(provider=self.name, reason="circuit_open")
+            return None
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record(False, time.perf_counter() - start, type(e).__name__)
+            logger.warning("%s error: %s", self.name, e)
+            return None
+        except BaseException:
+            self.release()
+            raise
+        self.record(bool(result), time.perf_counter() - start)
+        return result
+
+    async def acall(self, fn, *args, timeout: float = None):
+        """Varianta async: `timeout` anulează efectiv apelul (și eliberează conexiunea)."""
+        if not self.allow():
+            metrics.provider_errors.inc(provider=self.name, reason="circuit_open")
+            return None
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(*args), timeout)
+        except asyncio.TimeoutError:
+            self.record(False, time.perf_counter() - start, "timeout")
+            logger.warning("%s timeout după %.1fs", self.name, time.perf_counter() - start)
+            return None
+        except Exception as e:
+            self.record(False, time.perf_counter() - start, type(e).__name__)
+            logger.warning("%s error: %s", self.name, e)
+            return None
+        except BaseException:
+            # asyncio.CancelledError nu e Exception
+            self.release()
+            raise
+        self.record(bool(result), time.perf_counter() - start)
+        return result
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+groq_breaker = CircuitBreaker("groq", slow_call_seconds=GROQ_SLOW_CALL_SECONDS)
+embedding_breaker = CircuitBreaker("embedding", slow_call_seconds=EMBEDDING_SLOW_CALL_SECONDS)
+bulk_groq_breaker = CircuitBreaker("groq_bulk", slow_call_seconds=BULK_SLOW_CALL_SECONDS)
+bulk_embedding_breaker = CircuitBreaker("embedding_bulk", slow_call_seconds=BULK_SLOW_CALL_SECONDS)
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+metrics.gauge(
+    "dream_circuit_breaker_state", "Provider circuit state (0=closed, 1=half_open, 2=open).",
+    lambda: {b.name: _STATE_VALUES[b.state] for b in (groq_breaker, embedding_breaker, bulk_groq_breaker, bulk_embedding_breaker)}, label="provider",
+)
@@ -31,4 +31,70 @@ class DreamResponse(BaseModel):
     interpretation: Optional[Dict[str, Any]] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- ASYNC MODE (POST /dreams/?mode=async + polling) ---
+class DreamAccepted(BaseModel):
+    id: int
+    status: str
+    status_url: str
+
+class DreamStatusResponse(DreamResponse):
+    # "PROCESSING" cât timp analiza rulează în background, apoi "DONE" sau "FAILED"
+    status: str
+
+# --- DAILY PATTERNS (GET /dreams/stats/{date}) ---
+# Aceeași formă ca `DreamCluster` din services/dreamApi.ts
+class DreamCluster(BaseModel):
+    date: str
+    dominant_topic: str
+    keywords: List[str]
+    count: int
+
+# --- SEMANTIC CLUSTERS (GET /dreams/clusters) ---
+class SemanticClusterInfo(BaseModel):
+    label: str          # ex: "FLYING / WATER" (top motive din cluster)
+    count: int
+    percentage: int     # cât din visele intervalului sunt în cluster
+    keywords: List[str]
+    start: str
+    end: str
+
+# --- BULK IMPORT (POST /dreams/bulk) ---
+class BulkImportItem(BaseModel):
+    index: int                      # poziția în fișierul importat
+    status: str                     # "created" | "error"
+    id: Optional[int] = None
+    label: Optional[str] = None
+    percentage: Optional[int] = None
+    degraded: Optional[bool] = None
+    error: Optional[Any] = None     # mesaj sau erorile de validare Pydantic
+
+class BulkImportResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkImportItem]
+
+# --- HISTORY (GET /dreams) ---
+# Doar pentru documentație (OpenAPI): răspunsul e serializat direct, cu câmpurile din `fields`
+class DreamHistoryItem(BaseModel):
+    id: Optional[int] = None
+    date_occurred: Optional[str] = None
+    content: Optional[str] = None
+    label: Optional[str] = None
+    percentage: Optional[int] = None
+    similar_count: Optional[int] = None
+    summary: Optional[str] = None
+    status: Optional[str] = None
+    analysis: Optional[Dict[str, Any]] = None  # doar cu fields=analysis
+
+class DreamHistoryPage(BaseModel):
+    items: List[DreamHistoryItem]
+    next_cursor: Optional[str] = None
+
+class DreamSearchItem(DreamHistoryItem):
+    score: Optional[float] = None  # rangul full-text (doar cu `q`), mai mare = mai relevant
+
+class DreamSearchPage(BaseModel):
+    items: List[DreamSearchItem]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,288 @@
+import base64
+import binascii
+import json
+import logging
+import re
+
+from sqlalchemy import Float, Integer, and_, exists, func, literal, literal_column, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, aliased
+
+import models, daily_stats, dream_store
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# CĂUTARE: INDEX INVERSAT (MOTIVE / EMOȚII / TEME) + FULL-TEXT
+# =========================
+# Motivele, emoțiile și temele din interpretare sunt scrise la insert în `dream_terms`
+# (aceeași tranzacție cu visul), cu indexul (kind, term, date_occurred, dream_id):
+# "vise despre apă săptămâna asta" e un range scan, deja în ordinea paginii.
+# Visele salvate cu interpretarea de rezervă (Groq căzut) nu au termeni până când
+# reparația programată în jobs.py (`schedule_repair`) aduce interpretarea reală.
+#
+# Full-text pe `content`:
+#   SQLite   - tabelă FTS5 cu conținut extern (`dreams_fts`), ținută la zi de triggere
+#   Postgres - coloană generată `content_tsv` (tsvector, config 'simple') + index GIN
+# Ambele se instalează din `migrate_schema`; costul unui query depinde de numărul de
+# potriviri (posting lists), nu de mărimea jurnalului.
+
+TERM_KINDS = {"motif": "motifs", "emotion": "emotions", "theme": "themes"}
+MAX_QUERY_WORDS = 16
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_FULLTEXT = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS dreams_fts USING fts5("
+    "content, content='dreams', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS dreams_fts_ai AFTER INSERT ON dreams BEGIN "
+    "INSERT INTO dreams_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS dreams_fts_ad AFTER DELETE ON dreams BEGIN "
+    "INSERT INTO dreams_fts(dreams_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS dreams_fts_au AFTER UPDATE OF content ON dreams BEGIN "
+    "INSERT INTO dreams_fts(dreams_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO dreams_fts(rowid, content) VALUES (new.id, new.content); END",
+)
+
+_POSTGRES_FULLTEXT = (
+    # Coloana generată se completează singură și pentru rândurile vechi (rescrie tabela o dată)
+    "ALTER TABLE dreams ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_dreams_content_tsv ON dreams USING GIN (content_tsv)",
+)
+
+# Dialect / fișier -> există full-text (SQLite poate fi compilat fără FTS5)
+_fulltext_available = {}
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+# -------------------------
+# SCHEMA (DIN migrate_schema)
+# -------------------------
+def install_fulltext(bind) -> bool:
+    """Tabela FTS5 + triggere (SQLite) sau coloana tsvector + GIN (Postgres). Idempotent."""
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        with bind.begin() as conn:
+            for statement in _POSTGRES_FULLTEXT:
+                conn.execute(text(statement))
+        _fulltext_available[str(bind.url)] = True
+        return True
+    if dialect != "sqlite":
+        _fulltext_available[str(bind.url)] = False
+        return False
+
+    with bind.begin() as conn:
+        existed = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dreams_fts'"
+        )).first() is not None
+        try:
+            for statement in _SQLITE_FULLTEXT:
+                conn.execute(text(statement))
+        except OperationalError:
+            logger.warning("⚠️ SQLite fără FTS5: căutarea full-text face scan pe `content`.")
+            _fulltext_available[str(bind.url)] = False
+            return False
+        if not existed:
+            # Visele salvate înainte de tabela FTS
+            conn.execute(text("INSERT INTO dreams_fts(dreams_fts) VALUES ('rebuild')"))
+            logger.info("🛠️ Index full-text nou: dreams_fts")
+    _fulltext_available[str(bind.url)] = True
+    return True
+
+
+def _has_fulltext(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fulltext_available:
+        if bind.dialect.name == "postgresql":
+            found = db.execute(text(
+                "SELECT 1 FROM information_schema.columns WHERE table_name = 'dreams' AND column_name = 'content_tsv'"
+            )).first()
+        else:
+            found = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'dreams_fts'")).first()
+        _fulltext_available[key] = found is not None
+    return _fulltext_available[key]
+
+
+# -------------------------
+# INDEXUL INVERSAT (LA INSERT)
+# -------------------------
+def _terms(interpretation: dict) -> list:
+    interpretation = interpretation or {}
+    return [
+        (kind, term)
+        for kind, key in TERM_KINDS.items()
+        for term in daily_stats.normalize_terms(interpretation.get(key))
+    ]
+
+
+def _insert_ignore(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def _insert_terms(db: Session, dream_id: int, day, terms: list):
+    rows = [{"dream_id": dream_id, "kind": kind, "term": term, "date_occurred": day} for kind, term in terms]
+    db.execute(_insert_ignore(db)(models.DreamTerm).values(rows).on_conflict_do_nothing())
+
+
+def index_dream(db: Session, db_dream, interpretation: dict) -> int:
+    """
+    Termenii visului în `dream_terms`. Nu face commit - se salvează odată cu visul.
+    Un vis nou (fără id încă) e trimis în DB cu flush, în aceeași tranzacție.
+    """
+    terms = _terms(interpretation)
+    if not terms:
+        return 0
+    if db_dream.id is None:
+        db.flush()
+    _insert_terms(db, db_dream.id, db_dream.date_occurred, terms)
+    return len(terms)
+
+
+def rebuild(db: Session) -> int:
+    """Reconstruiește `dream_terms` din `analysis_json` (+ indexul FTS5 pe SQLite), pentru date vechi."""
+    db.query(models.DreamTerm).delete()
+
+    processed = 0
+    rows = (
+        db.query(models.Dream.id, models.Dream.date_occurred, models.Dream.analysis_json)
+        .filter(models.Dream.cluster_label.notin_(["PROCESSING", "FAILED"]))
+        .order_by(models.Dream.id)
+        .yield_per(500)
+    )
+    for row in rows:
+        try:
+            extra = json.loads(row.analysis_json) if row.analysis_json else {}
+        except ValueError:
+            extra = {}
+        # Interpretarea de rezervă nu se indexează (vezi `dream_store.update_aggregates`)
+        terms = [] if extra.get("fallback") else _terms(extra.get("ai_data"))
+        if terms:
+            _insert_terms(db, row.id, row.date_occurred, terms)
+        processed += 1
+    if db.get_bind().dialect.name == "sqlite" and _has_fulltext(db):
+        db.execute(text("INSERT INTO dreams_fts(dreams_fts) VALUES ('rebuild')"))
+    db.commit()
+    return processed
+
+
+# -------------------------
+# CĂUTARE (GET /dreams/search)
+# -------------------------
+def query_words(q: str) -> list:
+    return _WORD_RE.findall((q or "").lower())[:MAX_QUERY_WORDS]
+
+
+def _encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"rank|{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def _decode_offset(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, offset = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split("|")
+        if kind != "rank" or int(offset) < 0:
+            raise ValueError(cursor)
+        return int(offset)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise dream_store.InvalidCursor(cursor)
+
+
+def _fulltext_match(db: Session, query, words: list):
+    """(query filtrat pe `content`, expresia scorului sau None dacă nu avem rang)."""
+    dialect = db.get_bind().dialect.name
+    if not _has_fulltext(db):
+        for word in words:
+            query = query.filter(models.Dream.content.ilike(f"%{word}%"))
+        return query, None
+    if dialect == "postgresql":
+        tsquery = func.plainto_tsquery("simple", " ".join(words))
+        tsv = literal_column("dreams.content_tsv")
+        return query.filter(tsv.op("@@")(tsquery)), func.ts_rank(tsv, tsquery)
+
+    # FTS5: fiecare cuvânt între ghilimele (fără operatori din input), AND implicit; bm25 mai mic = mai bun
+    match = " ".join(f'"{word}"' for word in words)
+    fts = (
+        text("SELECT rowid AS dream_id, -bm25(dreams_fts) AS score FROM dreams_fts WHERE dreams_fts MATCH :match")
+        .bindparams(match=match)
+        .columns(dream_id=Integer, score=Float)
+        .subquery("fts")
+    )
+    return query.join(fts, fts.c.dream_id == models.Dream.id), fts.c.score
+
+
+def search_page(db: Session, limit: int, q: str = None, terms: dict = None, start=None, end=None,
+                cursor: str = None):
+    """
+    (items, next_cursor). `terms` = {"motif": [...], "emotion": [...], "theme": [...]}, toate obligatorii.
+    Cu `q`: rang full-text (scor descrescător), paginat după poziție.
+    Doar cu termeni: cele mai noi primele, paginare keyset pe indexul din `dream_terms`.
+    """
+    words = query_words(q)
+    filters = [
+        (kind, term)
+        for kind, values in (terms or {}).items()
+        for term in daily_stats.normalize_terms(values)
+    ]
+    if not words and not filters:
+        raise InvalidSearch("Give q or at least one motif / emotion / theme")
+
+    columns, slots = dream_store.history_columns()
+    query = db.query(*columns)
+
+    driver = None
+    if not words:
+        # Primul termen conduce: range scan pe (kind, term, date_occurred, dream_id), în ordinea paginii
+        kind, term = filters.pop(0)
+        driver = models.DreamTerm
+        query = query.join(driver, and_(driver.dream_id == models.Dream.id, driver.kind == kind, driver.term == term))
+    for kind, term in filters:
+        other = aliased(models.DreamTerm)
+        query = query.filter(exists().where(other.dream_id == models.Dream.id, other.kind == kind, other.term == term))
+
+    day_column = driver.date_occurred if driver is not None else models.Dream.date_occurred
+    if start:
+        query = query.filter(day_column >= start)
+    if end:
+        query = query.filter(day_column <= end)
+
+    score = None
+    if words:
+        query, score = _fulltext_match(db, query, words)
+
+    if score is not None:
+        offset = _decode_offset(cursor) if cursor else 0
+        rows = (
+            query.add_columns(score.label("score"))
+            .order_by(score.desc(), models.Dream.id.desc())
+            .offset(offset)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = _encode_offset(offset + limit) if has_more else None
+    else:
+        id_column = driver.dream_id if driver is not None else models.Dream.id
+        if cursor:
+            day, dream_id = dream_store.decode_cursor(cursor)
+            query = query.filter(tuple_(day_column, id_column) < (day, dream_id))
+        rows = (
+            query.add_columns(literal(None).label("score"))
+            .order_by(day_column.desc(), id_column.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = dream_store.encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+
+    items = dream_store.history_items(rows, slots)
+    for item, row in zip(items, rows):
+        item["score"] = float(row.score) if row.score is not None else None
+    return items, next_cursor
@@ -0,0 +1,278 @@
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+
+import numpy as np
+
+from vector_index import NO_DAY, day_ordinal, normalize
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# INDEX DE SIMILARITATE SHARDAT (POOL DE PROCESE)
+# =========================
+# La milioane de vise, un singur matvec în thread-ul request-ului folosește un
+# singur core. Aici matricea e împărțită în SIMILARITY_SHARDS bucăți, fiecare
+# într-un fișier memory-mapped (pe /dev/shm când există, deci practic RAM partajat):
+# procesul API scrie rândurile noi, worker-ii le mapează read-only - nimic nu e
+# copiat sau trimis prin pickle în afară de vectorul query-ului.
+#
+# Un query pleacă la toate shard-urile în paralel; fiecare întoarce top-k local,
+# numărătorile peste praguri și potrivirile temporale, iar noi le combinăm în
+# același rezultat ca `VectorIndex.query`. Sub SIMILARITY_SHARD_MIN_ROWS vise
+# scanăm shard-urile direct în proces (overhead-ul IPC ar costa mai mult).
+
+SHARD_RETIRE_SECONDS = 30  # fișierele vechi (după o creștere) rămân cât le mai citesc worker-ii
+
+
+# -------------------------
+# WORKER (RULEAZĂ ÎN PROCESELE DIN POOL)
+# -------------------------
+_attached = {}  # (director, shard) -> (path, matrix, days)
+
+
+def _attach(directory: str, shard: int, path: str, days_path: str, capacity: int, dim: int):
+    key = (directory, shard)
+    cached = _attached.get(key)
+    if cached is None or cached[0] != path:
+        # Shard-ul a crescut (fișier nou) -> renunțăm la maparea veche
+        matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(capacity, dim))
+        days = np.memmap(days_path, dtype=np.int32, mode="r", shape=(capacity,))
+        cached = _attached[key] = (path, matrix, days)
+    return cached[1], cached[2]
+
+
+def _score_block(matrix, days, q, k, thresholds, target, window_days, temporal_threshold):
+    """Top-k local (poziții, scoruri), numărători peste praguri, potriviri temporale."""
+    scores = matrix @ q
+    k = min(k, scores.shape[0])
+    if k > 0:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.zeros(0, dtype=np.int64)
+    counts = [int(np.count_nonzero(scores > t)) for t in thresholds]
+    temporal = 0
+    if temporal_threshold is not None and target != NO_DAY:
+        window = (days != NO_DAY) & (np.abs(days - target) <= window_days)
+        temporal = int(np.count_nonzero(window & (scores > temporal_threshold)))
+    return top.tolist(), scores[top].tolist(), counts, temporal
+
+
+def _scan_shard(directory, shard, path, days_path, capacity, dim, n, q, k, thresholds,
+                target, window_days, temporal_threshold):
+    matrix, days = _attach(directory, shard, path, days_path, capacity, dim)
+    return _score_block(matrix[:n], days[:n], q, k, thresholds, target, window_days, temporal_threshold)
+
+
+# -------------------------
+# INDEXUL (PROCESUL API)
+# -------------------------
+class _Shard:
+    def __init__(self, directory: str, number: int, dim: int, capacity: int):
+        self.number = number
+        self.dim = dim
+        self.count = 0
+        self.generation = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self._open(directory, capacity)
+
+    def _open(self, directory: str, capacity: int):
+        self.capacity = capacity
+        self.path = os.path.join(directory, f"shard{self.number}-g{self.generation}.f32")
+        self.days_path = os.path.join(directory, f"shard{self.number}-g{self.generation}.days")
+        self.matrix = np.memmap(self.path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        self.days = np.memmap(self.days_path, dtype=np.int32, mode="w+", shape=(capacity,))
+
+    def grow(self, directory: str) -> tuple:
+        """Dublează capacitatea într-un fișier nou. Returnează fișierele vechi (de șters mai târziu)."""
+        old_paths = (self.path, self.days_path)
+        old_matrix, old_days = self.matrix, self.days
+        self.generation += 1
+        self._open(directory, self.capacity * 2)
+        self.matrix[:self.count] = old_matrix[:self.count]
+        self.days[:self.count] = old_days[:self.count]
+        ids = np.zeros(self.capacity, dtype=np.int64)
+        ids[:self.count] = self.ids[:self.count]
+        self.ids = ids
+        return old_paths
+
+
+class ShardedVectorIndex:
+    """
+    Aceeași interfață ca `VectorIndex` (add, query, search, count_above, vector),
+    cu scanarea împărțită pe `shards` procese. Doar stocare float32, fără IVF.
+    """
+
+    storage = "float32"
+
+    def __init__(self, dim: int, shards: int = None, min_rows_parallel: int = 50000,
+                 initial_capacity: int = 1024, directory: str = None):
+        self.dim = dim
+        self.shards_count = max(1, shards or os.cpu_count() or 1)
+        self.min_rows_parallel = min_rows_parallel
+        base = directory or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.directory = tempfile.mkdtemp(prefix="dream-shards-", dir=base)
+        per_shard = max(1, initial_capacity // self.shards_count)
+        self._shards = [_Shard(self.directory, i, dim, per_shard) for i in range(self.shards_count)]
+        self._positions = {}  # dream_id -> (shard, poziție)
+        self._count = 0
+        self._retired = []    # (momentul, fișiere) - șterse după SHARD_RETIRE_SECONDS
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_failed = False
+        self._pool_lock = threading.Lock()
+        atexit.register(self.close)
+        logger.info("🧩 Index shardat: %d shard-uri în %s", self.shards_count, self.directory)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, dream_id):
+        return dream_id in self._positions
+
+    def memory_bytes(self) -> int:
+        return self._count * self.dim * 4
+
+    # -------------------------
+    # SCRIERE
+    # -------------------------
+    def _purge_retired(self):
+        now = time.monotonic()
+        keep = []
+        for retired_at, paths in self._retired:
+            if now - retired_at < SHARD_RETIRE_SECONDS:
+                keep.append((retired_at, paths))
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._retired = keep
+
+    def add(self, dream_id: int, vec, date=None) -> bool:
+        v = normalize(vec)
+        if v.shape[0] != self.dim:
+            return False
+        with self._lock:
+            if dream_id in self._positions:
+                return False
+            # Round-robin: shard-urile rămân egale, deci și timpul de scanare
+            shard = self._shards[self._count % self.shards_count]
+            if shard.count >= shard.capacity:
+                self._purge_retired()
+                self._retired.append((time.monotonic(), shard.grow(self.directory)))
+            pos = shard.count
+            shard.matrix[pos] = v
+            shard.days[pos] = day_ordinal(date)
+            shard.ids[pos] = dream_id
+            shard.count += 1
+            self._positions[dream_id] = (shard.number, pos)
+            self._count += 1
+        return True
+
+    def add_many(self, ids, vecs, dates=None) -> int:
+        dates = dates if dates is not None else [None] * len(ids)
+        return sum(1 for i, v, d in zip(ids, vecs, dates) if self.add(i, v, d))
+
+    def vector(self, dream_id: int):
+        with self._lock:
+            location = self._positions.get(dream_id)
+            if location is None:
+                return None
+            shard, pos = location
+            return np.array(self._shards[shard].matrix[pos], dtype=np.float32)
+
+    # -------------------------
+    # CITIRE
+    # -------------------------
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn: fără fork dintr-un proces cu thread-uri (uvicorn, threadpool)
+                    self._pool = ProcessPoolExecutor(max_workers=self.shards_count, mp_context=get_context("spawn"))
+        return self._pool
+
+    def query(self, vec, k: int = 1, thresholds=(), day=None, window_days: int = 2,
+              temporal_threshold: float = None) -> dict:
+        """Ca `VectorIndex.query`: top-k global, numărători și potriviri temporale însumate pe shard-uri."""
+        q = normalize(vec)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"Dimensiune query {q.shape[0]} != index {self.dim}")
+        with self._lock:
+            n = self._count
+            snapshot = [(s.number, s.path, s.days_path, s.capacity, s.count, s.ids, s.matrix, s.days)
+                        for s in self._shards]
+        if n == 0:
+            return {"ids": [], "scores": [], "dates": [], "counts": [0] * len(thresholds), "temporal_count": 0}
+
+        target = day_ordinal(day)
+        args = (k, tuple(thresholds), target, window_days, temporal_threshold)
+        snapshot = [s for s in snapshot if s[4]]
+        shard_ids = [ids for _, _, _, _, _, ids, _, _ in snapshot]
+        partials = None
+        if n >= self.min_rows_parallel and self.shards_count > 1 and not self._pool_failed:
+            try:
+                pool = self._executor()
+                futures = [
+                    pool.submit(_scan_shard, self.directory, number, path, days_path, capacity, self.dim, count, q, *args)
+                    for number, path, days_path, capacity, count, _, _, _ in snapshot
+                ]
+                partials = [f.result() for f in futures]
+            except Exception:
+                # Pool-ul nu pornește (ex: script fără `if __name__ == "__main__"`) -> scanăm local
+                logger.exception("⚠️ Pool-ul de shard-uri a eșuat; scanare în proces de acum încolo.")
+                self._pool_failed = True
+        if partials is None:
+            partials = [_score_block(matrix[:count], days[:count], q, *args)
+                        for _, _, _, _, count, _, matrix, days in snapshot]
+
+        # Combinare: top-k global din top-k-urile locale, restul se adună
+        candidates = []
+        for ids, (top, scores, _, _) in zip(shard_ids, partials):
+            candidates.extend(zip(scores, ids[top].tolist()))
+        candidates.sort(key=lambda c: -c[0])
+        best = candidates[:k]
+        counts = [sum(p[2][i] for p in partials) for i in range(len(thresholds))]
+        temporal_count = sum(p[3] for p in partials)
+
+        dates = []
+        for _, dream_id in best:
+            shard, pos = self._positions[dream_id]
+            d = int(self._shards[shard].days[pos])
+            dates.append(date.fromordinal(d) if d != NO_DAY else None)
+        return {
+            "ids": [dream_id for _, dream_id in best],
+            "scores": [score for score, _ in best],
+            "dates": dates,
+            "counts": counts,
+            "temporal_count": temporal_count,
+        }
+
+    def search(self, vec, k: int = 10):
+        result = self.query(vec, k=k)
+        return list(zip(result["ids"], result["scores"]))
+
+    def count_above(self, vec, thresholds):
+        return self.query(vec, k=0, thresholds=thresholds)["counts"]
+
+    def warm_up(self):
+        """Pornește worker-ii din timp (spawn + import numpy durează ~0.1-0.3s per proces)."""
+        if self.shards_count > 1 and not self._pool_failed:
+            pool = self._executor()
+            for f in [pool.submit(os.getpid) for _ in range(self.shards_count)]:
+                f.result()
+
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+# =========================
+# DETECTARE NEAR-DUPLICATE (SIMHASH + LSH PE BENZI)
+# =========================
+# Retrimiterile (același vis, eventual cu 1-2 cuvinte schimbate) sunt frecvente.
+# Amprenta SimHash de 64 biți a textului sanitizat se calculează local, în
+# microsecunde, și se salvează pe fiecare vis (`Dream.simhash`).
+#
+# Căutarea: amprenta e tăiată în SIMHASH_BANDS benzi; două amprente la distanță
+# Hamming ≤ SIMHASH_BANDS - 1 au sigur o bandă identică (principiul cutiei), deci
+# un lookup în dict per bandă găsește toți candidații, fără scan.
+#
+# Un geamăn sigur (distanță ≤ SIMHASH_TWIN_DISTANCE, text suficient de lung)
+# înlocuiește apelul la API-ul de embedding - vezi `ml_logic.near_duplicate_vector`.
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 2  # perechi de cuvinte: ordinea contează, dar o greșeală de tipar schimbă puțin
+SIMHASH_BANDS = int(os.getenv("SIMHASH_BANDS", "4"))
+SIMHASH_TWIN_DISTANCE = min(int(os.getenv("SIMHASH_TWIN_DISTANCE", "3")), SIMHASH_BANDS - 1)
+SIMHASH_MIN_SHINGLES = int(os.getenv("SIMHASH_MIN_SHINGLES", "8"))  # textele scurte se potrivesc prea ușor
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def shingles(text: str) -> list:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return words
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def _feature_hash(feature: str) -> int:
+    # Stabil între procese (spre deosebire de `hash()`), ca amprentele salvate să rămână valide
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fingerprint(text: str):
+    """
+    (amprenta SimHash pe 64 biți ca int fără semn, numărul de shingles).
+    Amprenta e None pentru textele fără niciun cuvânt.
+    """
+    features = shingles(text)
+    if not features:
+        return None, 0
+    hashes = np.fromiter((_feature_hash(f) for f in features), dtype=np.uint64, count=len(features))
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int32)
+    # Bitul i e 1 dacă majoritatea shingle-urilor au bitul i setat
+    votes = 2 * bits.sum(axis=0) - len(features)
+    value = 0
+    for i in np.flatnonzero(votes > 0):
+        value |= 1 << int(i)
+    return value, len(features)
+
+
+def to_signed(value: int) -> int:
+    """uint64 -> int64, pentru coloana BigInteger (Postgres nu are întregi fără semn)."""
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    if value is None:
+        return None
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """Tabele de lookup pe benzi: banda -> id-urile viselor cu aceeași valoare pe bandă."""
+
+    def __init__(self, bands: int = SIMHASH_BANDS):
+        self.bands = max(1, bands)
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._mask = (1 << self.band_bits) - 1
+        self._tables = [defaultdict(list) for _ in range(self.bands)]
+        self._fingerprints = {}  # dream_id -> amprentă (uint64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def __contains__(self, dream_id):
+        return dream_id in self._fingerprints
+
+    def _keys(self, value: int):
+        return [(value >> (b * self.band_bits)) & self._mask for b in range(self.bands)]
+
+    def add(self, dream_id: int, value: int) -> bool:
+        value = to_unsigned(value)
+        if value is None:
+            return False
+        with self._lock:
+            if dream_id in self._fingerprints:
+                return False
+            self._fingerprints[dream_id] = value
+            for table, key in zip(self._tables, self._keys(value)):
+                table[key].append(dream_id)
+        return True
+
+    def query(self, value: int, max_distance: int = SIMHASH_TWIN_DISTANCE) -> list:
+        """(dream_id, distanță) pentru visele la distanță Hamming ≤ `max_distance`, cele mai apropiate primele."""
+        value = to_unsigned(value)
+        if value is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._tables, self._keys(value)):
+                candidates.update(table.get(key, ()))
+            found = [(i, hamming(value, self._fingerprints[i])) for i in candidates]
+        return sorted((m for m in found if m[1] <= max_distance), key=lambda m: (m[1], m[0]))
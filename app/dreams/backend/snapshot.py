@@ -0,0 +1,333 @@
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+
+from vector_index import NO_DAY, day_ordinal, normalize
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# SNAPSHOT DE EMBEDDING-URI (APPEND-ONLY, MEMORY-MAPPED)
+# =========================
+# Cu mai mulți workeri uvicorn, fiecare proces și-ar ține propria copie a matricei și
+# ar reciti tot corpusul din DB la pornire. Snapshot-ul e un director cu:
+#
+#   header      - o pagină: magic, versiune, dim, count, ultimul id, epoca, numele modelului
+#   vectors.f32 - rândurile float32 normalizate (count x dim)
+#   ids.i64     - id-ul visului pentru fiecare rând
+#   days.i32    - date.toordinal() (NO_DAY = dată necunoscută)
+#
+# Toți workerii mapează aceleași fișiere read-only (deci același page cache, o singură
+# copie în RAM) și pornesc fără să încarce nimic. Scrierea e serializată cu flock pe
+# `writer.lock`: un singur proces adaugă la un moment dat, scrie rândurile cu pwrite,
+# apoi crește `count` în header. Cititorii citesc `count` la fiecare query, deci văd
+# rândurile noi fără reîncărcare; dacă fișierele au crescut, doar le re-mapează.
+#
+# DB-ul rămâne sursa de adevăr: la un crash se pierd cel mult rândurile încă
+# necontorizate, iar sync-ul din DB le adaugă la loc.
+#
+# Snapshot-ul aparține unui singur DB: directorul include un hash al URL-ului (fără
+# parolă; la SQLite, calea absolută), deci benchmark-ul sau staging-ul din același CWD
+# nu îl folosesc pe al producției. După un reset / restore al aceluiași DB (sau id-uri
+# refolosite de SQLite), la deschidere comparăm primul și ultimul rând cu vectorii din
+# DB; dacă diferă, snapshot-ul e golit pe loc (count = 0, epoca + 1) și reconstruit din
+# DB de sync. Cititorii văd epoca nouă și își uită pozițiile.
+
+SNAPSHOT_DIR = os.getenv("SIMILARITY_SNAPSHOT_DIR", "embedding_snapshots")
+SNAPSHOT_MAGIC = b"DREAMSNP"
+SNAPSHOT_VERSION = 2
+HEADER_SIZE = 4096
+MODEL_NAME_BYTES = 256
+SNAPSHOT_GROW_ROWS = 4096  # fișierele cresc în pași (cel puțin dublare), nu rând cu rând
+
+# magic, versiune, dim, count, ultimul id, epoca, lungimea numelui modelului
+_HEADER = struct.Struct("<8sIIQqqI")
+_COUNT_OFFSET = 16  # count, ultimul id, epoca: aliniate la 8 -> scrierea fiecăruia e atomică
+_EPOCH_OFFSET = 32
+_ARRAYS = ("vectors.f32", "days.i32", "ids.i64")  # ids.i64 crește ultimul: dă capacitatea
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def database_key(url: str) -> str:
+    """Identitatea DB-ului din URL: fără parolă, iar la SQLite cu calea absolută a fișierului."""
+    from sqlalchemy.engine import make_url
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database and parsed.database != ":memory:":
+        parsed = parsed.set(database=os.path.abspath(parsed.database))
+    raw = parsed.render_as_string(hide_password=True)  # parola mascată: schimbarea ei nu e alt DB
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def snapshot_path(base_dir: str, model: str, dim: int, database: str = None) -> str:
+    """Un director per model + dimensiune (+ DB): schimbarea modelului nu amestecă vectorii."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model).strip("_") or "model"
+    name = f"{slug}-{dim}-{database_key(database)}" if database else f"{slug}-{dim}"
+    return os.path.join(base_dir, name)
+
+
+def open_snapshot(dim: int, model: str, base_dir: str = None, database: str = None,
+                  verify=None) -> "SnapshotVectorIndex":
+    """
+    `database`: URL-ul DB-ului ai cărui vectori îi ține snapshot-ul.
+    `verify(ids) -> {id: vector}`: vectorii salvați în DB, pentru verificarea de la deschidere.
+    """
+    path = snapshot_path(base_dir or SNAPSHOT_DIR, model, dim, database)
+    return SnapshotVectorIndex(path, dim, model, verify=verify)
+
+
+class SnapshotVectorIndex:
+    """
+    Aceeași interfață ca `VectorIndex` (add, query, search, count_above, vector),
+    peste un snapshot partajat între procese. Scanare exactă float32, fără IVF.
+    """
+
+    storage = "float32"
+
+    def __init__(self, path: str, dim: int, model: str, verify=None):
+        self.path = path
+        self.dim = dim
+        self.model = model
+        os.makedirs(path, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(path, "writer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock = threading.RLock()
+        with self._writer():
+            self._open_header()
+        self._fds = {name: os.open(self._file(name), os.O_RDWR) for name in ("header",) + _ARRAYS}
+        self._mapped_rows = -1
+        self._seen = 0
+        self._epoch = int(self._counters[2])
+        self._positions = {}  # dream_id -> rând (completat incremental din ids.i64)
+        self._remap(self.capacity_rows())
+        if verify is not None:
+            self._discard_if_stale(verify)
+        logger.info("🗂️ Snapshot embeddings: %s (%d vise, model %s)", path, len(self), model)
+
+    # -------------------------
+    # HEADER / FIȘIERE
+    # -------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open_header(self):
+        header_path = self._file("header")
+        name = self.model.encode("utf-8")[:MODEL_NAME_BYTES]
+        if not os.path.exists(header_path) or os.path.getsize(header_path) < HEADER_SIZE:
+            page = bytearray(HEADER_SIZE)
+            _HEADER.pack_into(page, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.dim, 0, 0, 0, len(name))
+            page[_HEADER.size:_HEADER.size + len(name)] = name
+            for array in _ARRAYS:
+                open(self._file(array), "wb").close()
+            with open(header_path, "wb") as f:
+                f.write(page)
+
+        self._header = np.memmap(header_path, dtype=np.uint8, mode="r", shape=(HEADER_SIZE,))
+        magic, version, dim, _, _, _, name_len = _HEADER.unpack_from(self._header, 0)
+        stored_name = bytes(self._header[_HEADER.size:_HEADER.size + name_len])
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{self.path}: nu e un snapshot v{SNAPSHOT_VERSION}")
+        if dim != self.dim or stored_name != name:
+            raise SnapshotError(f"{self.path}: snapshot pentru {stored_name.decode('utf-8', 'replace')}/{dim}, "
+                                f"nu {self.model}/{self.dim}")
+        # count, ultimul id, epoca - citite direct din maparea header-ului la fiecare query
+        self._counters = self._header[_COUNT_OFFSET:_COUNT_OFFSET + 24].view(np.int64)
+
+    def capacity_rows(self) -> int:
+        """Rândurile pentru care toate fișierele au deja loc."""
+        return os.path.getsize(self._file("ids.i64")) // 8
+
+    def _remap(self, rows: int):
+        """(Re)mapează array-urile la dimensiunea curentă a fișierelor."""
+        if rows == self._mapped_rows:
+            return
+        if rows == 0:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._days = np.zeros(0, dtype=np.int32)
+        else:
+            self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, self.dim))
+            self._ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode="r", shape=(rows,))
+            self._days = np.memmap(self._file("days.i32"), dtype=np.int32, mode="r", shape=(rows,))
+        self._mapped_rows = rows
+
+    @contextmanager
+    def _writer(self):
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _refresh(self) -> int:
+        """Citește `count` din header și preia rândurile adăugate de alte procese."""
+        with self._lock:
+            epoch = int(self._counters[2])
+            if epoch != self._epoch:
+                # Snapshot golit de alt proces (DB resetat): pozițiile vechi nu mai sunt valabile
+                self._epoch, self._seen, self._positions = epoch, 0, {}
+            n = int(self._counters[0])
+            if n > self._mapped_rows:
+                self._remap(self.capacity_rows())
+            if n > self._seen:
+                new_ids = self._ids[self._seen:n].tolist()
+                self._positions.update(zip(new_ids, range(self._seen, n)))
+                self._seen = n
+            return n
+
+    def __len__(self):
+        return int(self._counters[0])
+
+    def __contains__(self, dream_id):
+        self._refresh()
+        return dream_id in self._positions
+
+    @property
+    def watermark(self) -> int:
+        """Cel mai mare id din snapshot: sync-ul din DB pornește de aici, nu de la zero."""
+        return int(self._counters[1])
+
+    def memory_bytes(self) -> int:
+        # Page cache partajat: aceeași memorie pentru toți workerii
+        return len(self) * self.dim * 4
+
+    # -------------------------
+    # SCRIERE (UN SINGUR WRITER LA UN MOMENT DAT)
+    # -------------------------
+    def _ensure_capacity(self, rows: int):
+        capacity = self.capacity_rows()
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, SNAPSHOT_GROW_ROWS)
+        for name, itemsize in zip(_ARRAYS, (4 * self.dim, 4, 8)):
+            os.ftruncate(self._fds[name], new_capacity * itemsize)
+        self._remap(new_capacity)
+
+    def add_many(self, ids, vecs, dates=None) -> int:
+        dates = dates if dates is not None else [None] * len(ids)
+        rows = []
+        for dream_id, vec, day in zip(ids, vecs, dates):
+            v = normalize(vec)
+            if v.shape[0] == self.dim:
+                rows.append((int(dream_id), v, day_ordinal(day)))
+        if not rows:
+            return 0
+
+        with self._writer():
+            n = self._refresh()
+            fresh, batch = [], set()
+            for row in rows:
+                if row[0] not in self._positions and row[0] not in batch:
+                    batch.add(row[0])
+                    fresh.append(row)
+            if not fresh:
+                return 0
+            self._ensure_capacity(n + len(fresh))
+            # pwrite în același page cache pe care îl mapează cititorii (inclusiv noi)
+            os.pwrite(self._fds["vectors.f32"], np.stack([v for _, v, _ in fresh]).astype("<f4").tobytes(), n * self.dim * 4)
+            os.pwrite(self._fds["ids.i64"], np.array([r[0] for r in fresh], dtype="<i8").tobytes(), n * 8)
+            os.pwrite(self._fds["days.i32"], np.array([r[2] for r in fresh], dtype="<i4").tobytes(), n * 4)
+            # Rândurile întâi, apoi count: un cititor nu vede niciodată un rând incomplet
+            counters = np.array([n + len(fresh), max(self.watermark, max(batch))], dtype="<i8")
+            os.pwrite(self._fds["header"], counters.tobytes(), _COUNT_OFFSET)
+            self._refresh()
+        return len(fresh)
+
+    def add(self, dream_id: int, vec, date=None) -> bool:
+        return self.add_many([dream_id], [vec], [date]) == 1
+
+    def _discard_if_stale(self, verify):
+        """
+        Primul și ultimul rând trebuie să aibă în DB același vector. Altfel DB-ul a fost
+        resetat / restaurat (id-urile pot fi refolosite): golim snapshot-ul, sync-ul îl reface.
+        """
+        with self._writer():
+            n = self._refresh()
+            if n == 0:
+                return
+            rows = sorted({0, n - 1})
+            ids = [int(self._ids[row]) for row in rows]
+            stored = verify(ids)
+            for row, dream_id in zip(rows, ids):
+                vec = stored.get(dream_id)
+                if vec is None or not np.allclose(normalize(vec), self._vectors[row], atol=1e-5):
+                    break
+            else:
+                return
+            logger.warning("⚠️ Snapshot %s nu corespunde DB-ului (visul %d). Îl golim și îl refacem din DB.",
+                           self.path, dream_id)
+            # count întâi (cititorii nu mai văd rânduri), apoi ultimul id și epoca
+            os.pwrite(self._fds["header"], np.array([0, 0], dtype="<i8").tobytes(), _COUNT_OFFSET)
+            os.pwrite(self._fds["header"], np.array([self._epoch + 1], dtype="<i8").tobytes(), _EPOCH_OFFSET)
+            self._refresh()
+
+    def vector(self, dream_id: int):
+        self._refresh()
+        with self._lock:
+            pos = self._positions.get(dream_id)
+            if pos is None:
+                return None
+            return np.array(self._vectors[pos], dtype=np.float32)
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.fsync(fd)
+                os.close(fd)
+            self._fds = {}
+            os.close(self._lock_fd)
+
+    # -------------------------
+    # CITIRE
+    # -------------------------
+    def query(self, vec, k: int = 1, thresholds=(), day=None, window_days: int = 2,
+              temporal_threshold: float = None) -> dict:
+        """Ca `VectorIndex.query`, pe rândurile [0, count) vizibile acum în snapshot."""
+        q = normalize(vec)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"Dimensiune query {q.shape[0]} != index {self.dim}")
+        with self._lock:
+            n = self._refresh()
+            vectors, ids, days = self._vectors, self._ids, self._days
+        if n == 0:
+            return {"ids": [], "scores": [], "dates": [], "counts": [0] * len(thresholds), "temporal_count": 0}
+
+        scores = vectors[:n] @ q
+        k = min(k, n)
+        if k > 0:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.zeros(0, dtype=np.int64)
+        counts = [int(np.count_nonzero(scores > t)) for t in thresholds]
+
+        target = day_ordinal(day)
+        temporal_count = 0
+        if temporal_threshold is not None and target != NO_DAY:
+            window = (days[:n] != NO_DAY) & (np.abs(days[:n] - target) <= window_days)
+            temporal_count = int(np.count_nonzero(window & (scores > temporal_threshold)))
+
+        return {
+            "ids": ids[top].tolist(),
+            "scores": scores[top].tolist(),
+            "dates": [date.fromordinal(int(d)) if d != NO_DAY else None for d in days[top]],
+            "counts": counts,
+            "temporal_count": temporal_count,
+        }
+
+    def search(self, vec, k: int = 10):
+        result = self.query(vec, k=k)
+        return list(zip(result["ids"], result["scores"]))
+
+    def count_above(self, vec, thresholds):
+        return self.query(vec, k=0, thresholds=thresholds)["counts"]
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+# =========================
+# MEDIUL DE TEST
+# =========================
+# Setat înainte de importul aplicației: modulele citesc configurația la import.
+# SQLite temporar, embedding-uri locale (fără HF), Groq înlocuit de `FakeGroq`.
+_DB_DIR = tempfile.mkdtemp(prefix="dreams-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'dreams.db')}"
+os.environ["EMBEDDING_PROVIDER"] = "local"
+os.environ["GROQ_API_KEY"] = "test-key"
+os.environ["PREWARM_ON_STARTUP"] = "0"
+os.environ["SIMILARITY_INDEX_MODE"] = "exact"
+os.environ["BREAKER_FAILURE_THRESHOLD"] = "1000"  # testele de outage nu deschid circuitul pentru restul
+os.environ["JOB_RETRY_BACKOFF_SECONDS"] = "0"
+os.environ["JOB_REPAIR_DELAY_SECONDS"] = "3600"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+import ml_logic  # noqa: E402
+
+MOTIF_WORDS = ("sea", "fire", "house", "train", "forest", "moon")
+
+
+class FakeGroq:
+    """Interpretare deterministă: motivele sunt cuvintele cunoscute din text."""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    def interpret(self, text: str):
+        self.calls += 1
+        if self.down:
+            return None
+        motifs = [w for w in MOTIF_WORDS if w in text.lower()] or ["void"]
+        return {
+            "summary": text[:40],
+            "motifs": motifs,
+            "emotions": ["calm"],
+            "themes": [f"{motifs[0]}_theme"],
+            "interpretation": "i",
+            "advice": "a",
+        }
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def groq(monkeypatch):
+    fake = FakeGroq()
+
+    async def interpret_async(text, timeout=None):
+        return fake.interpret(text)
+
+    monkeypatch.setattr(ml_logic, "interpret_dream_groq", lambda text, timeout=None: fake.interpret(text))
+    monkeypatch.setattr(ml_logic, "interpret_dream_groq_async", interpret_async)
+    return fake
+
+
+@pytest.fixture
+def embedding_down(monkeypatch):
+    async def unavailable(text, *args, **kwargs):
+        return None
+
+    monkeypatch.setattr(ml_logic, "get_embedding_async", unavailable)
+
+
+@pytest.fixture
+def wait_for_status(client):
+    """Polling pe GET /dreams/{id} până când analiza din background se termină."""
+    def wait(dream_id: int, timeout: float = 10.0) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            body = client.get(f"/dreams/{dream_id}").json()
+            if body["status"] != "PROCESSING" or time.monotonic() > deadline:
+                return body
+            time.sleep(0.05)
+    return wait
@@ -0,0 +1,71 @@
+import json
+
+
+def journal(day_prefix: str, count: int, start: int = 0) -> list:
+    return [
+        {"content": f"I was walking by the sea with my old dog, entry {i}", "date_occurred": f"{day_prefix}-{1 + i % 4:02d}"}
+        for i in range(start, start + count)
+    ]
+
+
+def test_bulk_json_import(client):
+    entries = journal("2026-08", 6)
+    entries.insert(2, {"content": "missing a date"})
+    r = client.post("/dreams/bulk", json=entries)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["failed"]) == (6, 1)
+    assert [item["status"] for item in body["results"]].count("created") == 6
+
+    created = next(item for item in body["results"] if item["status"] == "created")
+    saved = client.get(f"/dreams/{created['id']}").json()
+    assert saved["status"] == "DONE"
+    assert "sea" in saved["interpretation"]["motifs"]
+
+
+def test_bulk_ndjson_streaming(client):
+    lines = "\n".join(json.dumps(e) for e in journal("2026-08", 4, start=10)) + "\n{not json\n"
+    r = client.post(
+        "/dreams/bulk",
+        content=lines,
+        headers={"content-type": "application/x-ndjson", "accept": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in r.text.splitlines()]
+    by_index = {res["index"]: res["status"] for res in results}
+    assert by_index == {0: "created", 1: "created", 2: "created", 3: "created", 4: "error"}
+
+
+def test_history_pagination(client):
+    window = {"start": "2026-07-01", "end": "2026-07-04"}
+    assert client.post("/dreams/bulk", json=journal("2026-07", 11)).json()["created"] == 11
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 4, **window, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/dreams", params=params).json()
+        pages += 1
+        seen += [(item["date_occurred"], item["id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 11
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_history_fields_and_etag(client):
+    r = client.get("/dreams", params={"limit": 2, "fields": "id,label"})
+    assert r.status_code == 200
+    assert all(set(item) == {"id", "label"} for item in r.json()["items"])
+
+    etag = r.headers["etag"]
+    again = client.get("/dreams", params={"limit": 2, "fields": "id,label"}, headers={"if-none-match": etag})
+    assert again.status_code == 304
+
+
+def test_history_rejects_bad_input(client):
+    assert client.get("/dreams", params={"cursor": "zzz"}).status_code == 400
+    assert client.get("/dreams", params={"fields": "nope"}).status_code == 400
+    assert client.get("/dreams", params={"start": "x"}).status_code == 400
@@ -0,0 +1,54 @@
+def post_dream(client, content, day, **params):
+    return client.post("/dreams/", params=params, json={"content": content, "date_occurred": day})
+
+
+def test_create_sync_returns_analysis(client, groq):
+    r = post_dream(client, "I was swimming in a dark sea under a silver moon", "2026-09-01")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["id"] > 0
+    assert body["date_occurred"] == "2026-09-01"
+    assert body["interpretation"]["motifs"] == ["sea", "moon"]
+    assert body["resonance"]["label"]
+    assert groq.calls == 1
+
+
+def test_create_sync_finds_similar_dream(client):
+    text = "A long train crossing a frozen forest at night with no passengers"
+    post_dream(client, text, "2026-09-02")
+    body = post_dream(client, text + " again", "2026-09-02").json()
+    assert body["similarity"]["similar_count"] >= 1
+    assert body["resonance"]["percentage"] > 0
+
+
+def test_create_async_is_processed_in_background(client, wait_for_status):
+    r = post_dream(client, "The house was on fire but nobody woke up", "2026-09-03", mode="async")
+    assert r.status_code == 202
+    accepted = r.json()
+    assert accepted["status"] == "PROCESSING"
+    assert accepted["status_url"] == f"/dreams/{accepted['id']}"
+
+    done = wait_for_status(accepted["id"])
+    assert done["status"] == "DONE"
+    assert done["interpretation"]["motifs"] == ["fire", "house"]
+
+
+def test_get_unknown_dream_is_404(client):
+    assert client.get("/dreams/999999").status_code == 404
+
+
+def test_groq_outage_saves_fallback_without_polluting_aggregates(client, groq):
+    groq.down = True
+    body = post_dream(client, "A forest of glass where every tree was singing", "2026-09-04").json()
+    assert body["interpretation"]["summary"] == "Analysis unavailable."
+
+    # Motivele interpretării de rezervă nu ajung în căutare și nici în statisticile zilei
+    found = client.get("/dreams/search", params={"motif": "System Offline"}).json()
+    assert found["items"] == []
+    assert all("system offline" not in c["keywords"] for c in client.get("/dreams/stats/2026-09-04").json())
+
+
+def test_embedding_outage_is_labelled_api_limit(client, embedding_down):
+    post_dream(client, "I kept missing the last train home in the rain", "2026-09-05")
+    body = post_dream(client, "Someone was knocking on every door of a yellow house", "2026-09-05").json()
+    assert body["resonance"]["label"] == "API_LIMIT"
@@ -0,0 +1,72 @@
+def post_dream(client, content, day):
+    r = client.post("/dreams/", json={"content": content, "date_occurred": day})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_daily_stats_and_etag(client):
+    day = "2026-09-15"
+    for i in range(3):
+        post_dream(client, f"Waves of the sea were climbing the stairs, night {i}", day)
+
+    r = client.get(f"/dreams/stats/{day}")
+    assert r.status_code == 200
+    clusters = r.json()
+    assert sum(c["count"] for c in clusters) == 3
+    assert any("sea" in c["keywords"] for c in clusters)
+    assert all(c["date"] == day for c in clusters)
+
+    etag = r.headers["etag"]
+    assert client.get(f"/dreams/stats/{day}", headers={"if-none-match": etag}).status_code == 304
+
+    # Un vis nou în aceeași zi schimbă versiunea agregatelor -> alt ETag
+    post_dream(client, "The sea turned into a train station full of clocks", day)
+    r = client.get(f"/dreams/stats/{day}", headers={"if-none-match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_daily_stats_empty_day_and_bad_date(client):
+    assert client.get("/dreams/stats/2001-01-01").json() == []
+    assert client.get("/dreams/stats/yesterday").status_code == 400
+
+
+def test_search_full_text_and_motifs(client):
+    window = {"start": "2026-09-20", "end": "2026-09-22"}
+    for i in range(5):
+        post_dream(client, f"An endless forest where the owls kept whispering {i}", f"2026-09-2{i % 3}")
+    post_dream(client, "A burning house full of fire and smoke", "2026-09-21")
+
+    by_text = client.get("/dreams/search", params={"q": "owls", **window}).json()
+    assert len(by_text["items"]) == 5
+
+    by_motif = client.get("/dreams/search", params={"motif": "fire", **window}).json()
+    assert len(by_motif["items"]) == 1
+    assert "burning house" in by_motif["items"][0]["content"]
+
+    both = client.get("/dreams/search", params={"motif": "fire,forest", **window}).json()
+    assert both["items"] == []
+
+
+def test_search_pagination(client):
+    window = {"start": "2026-09-25", "end": "2026-09-27"}
+    for i in range(7):
+        post_dream(client, f"The moon followed me through a crowded market {i}", f"2026-09-2{5 + i % 3}")
+
+    seen, cursor = [], None
+    while True:
+        params = {"motif": "moon", "limit": 3, **window, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/dreams/search", params=params).json()
+        assert len(page["items"]) <= 3
+        seen += [(item["date_occurred"], item["id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 7
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_search_rejects_bad_input(client):
+    assert client.get("/dreams/search").status_code == 400
+    assert client.get("/dreams/search", params={"q": "sea", "cursor": "zz"}).status_code == 400
+    assert client.get("/dreams/search", params={"q": "sea", "start": "soon"}).status_code == 400
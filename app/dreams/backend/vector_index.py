@@ -0,0 +1,387 @@
+import logging
+import os
+import threading
+import numpy as np
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# INDEX DE SIMILARITATE (IN-MEMORY, NUMPY)
+# =========================
+# Ținem toți vectorii într-o singură matrice float32 contiguă, deja normalizată (L2),
+# așa că similaritatea cosinus devine un simplu produs matrice-vector.
+#
+# Stocare compactă (SIMILARITY_INDEX_STORAGE): float16 (2x mai mic) sau int8 cu
+# scală per vector (~4x). Scanăm cu vectorii compacți, apoi rândurile al căror scor
+# aproximativ e prea aproape de un prag (sau de top-k) ca să fie sigur de partea
+# corectă sunt re-scorate cu vectorii float32 din DB (`rerank`). Eroarea fiecărui
+# scor e mărginită, deci numărătorile și top-1 rămân identice cu modul float32.
+
+
+NO_DAY = 0  # ordinal pentru "dată necunoscută" (date.toordinal() începe de la 1)
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+FLOAT16_RELATIVE_ERROR = 2.0 ** -11  # rotunjirea float32 -> float16 (mantisă de 10 biți)
+SCORE_EPSILON = 1e-5                 # acumularea float32 în produsul scalar + subnormale
+SCAN_CHUNK_ROWS = 2048               # vectorii compacți se convertesc în float32 pe bucăți
+
+
+def day_ordinal(value) -> int:
+    """date / datetime -> int (zile de la 0001-01-01), NO_DAY dacă lipsește."""
+    if value is None:
+        return NO_DAY
+    if hasattr(value, "toordinal"):
+        return int(value.toordinal())
+    return NO_DAY
+
+
+def normalize(vec) -> np.ndarray:
+    """Vector float32 de normă 1 (vectorul nul rămâne nul)."""
+    v = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(v))
+    if norm > 0:
+        v = v / norm
+    return v
+
+
+def quantize_int8(v: np.ndarray):
+    """Vector normalizat -> (coduri int8, scală): v ≈ coduri * scală, eroare ≤ scală / 2 pe componentă."""
+    peak = float(np.max(np.abs(v))) if v.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    codes = np.clip(np.rint(v / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+class VectorIndex:
+    """
+    Index exact (brute-force) peste toate visele.
+    - `add` adaugă un vector fără rebuild (capacitatea se dublează amortizat).
+    - `query` răspunde la top-k și la numărători peste praguri cu un singur matvec.
+    - lângă matrice ținem data fiecărui vis ca ordinal int32, ca potrivirile temporale
+      (±N zile) să fie o mască vectorizată, nu o buclă Python.
+
+    Modul aproximativ (`approximate=True`) activează un IVF simplu: după ce indexul
+    trece de `train_threshold` vectori, antrenăm `nlist` centroizi (k-means) și
+    la query scanăm doar cele mai apropiate `nprobe` liste.
+
+    `storage="float16"` / `"int8"` păstrează vectorii compacți; `rerank(ids) -> {id: vector}`
+    dă vectorii float32 pentru rândurile de la limită (fără el, scorurile rămân aproximative).
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024, approximate: bool = False,
+                 nlist: int = None, nprobe: int = 8, train_threshold: int = 20000,
+                 storage: str = "float32", rerank=None):
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"Stocare necunoscută: {storage} (float32, float16, int8)")
+        self.dim = dim
+        self.storage = storage
+        self.rerank = rerank
+        self._matrix = np.zeros((max(initial_capacity, 1), dim), dtype=STORAGE_DTYPES[storage])
+        # int8: scala fiecărui vector (v ≈ coduri * scală)
+        self._scales = np.ones(max(initial_capacity, 1), dtype=np.float32) if storage == "int8" else None
+        self._ids = np.zeros(max(initial_capacity, 1), dtype=np.int64)
+        self._days = np.zeros(max(initial_capacity, 1), dtype=np.int32)
+        self._positions = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+        # --- IVF (opțional) ---
+        self.approximate = approximate
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self._centroids = None
+        self._lists = None
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, dream_id):
+        return dream_id in self._positions
+
+    def vector(self, dream_id: int):
+        """Vectorul (normalizat, float32) al unui vis din index, sau None."""
+        with self._lock:
+            pos = self._positions.get(dream_id)
+            if pos is None:
+                return None
+            return self._rows(self._matrix, self._scales, slice(pos, pos + 1))[0]
+
+    def memory_bytes(self) -> int:
+        """Memoria ocupată de vectori (+ scale) pentru visele din index."""
+        per_row = self._matrix.itemsize * self.dim + (4 if self._scales is not None else 0)
+        return self._count * per_row
+
+    # -------------------------
+    # SCRIERE
+    # -------------------------
+    def _grow(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=self._matrix.dtype)
+        matrix[:self._count] = self._matrix[:self._count]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._count] = self._ids[:self._count]
+        days = np.zeros(capacity, dtype=np.int32)
+        days[:self._count] = self._days[:self._count]
+        scales = None
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:self._count] = self._scales[:self._count]
+        # Înlocuim referințele abia la final - cititorii văd fie vechea, fie noua matrice
+        self._matrix, self._ids, self._days, self._scales = matrix, ids, days, scales
+
+    def add(self, dream_id: int, vec, date=None) -> bool:
+        """Adaugă un vis. Returnează False dacă id-ul există deja sau vectorul e invalid."""
+        v = normalize(vec)
+        if v.shape[0] != self.dim:
+            return False
+        with self._lock:
+            if dream_id in self._positions:
+                return False
+            self._grow(self._count + 1)
+            pos = self._count
+            if self._scales is not None:
+                self._matrix[pos], self._scales[pos] = quantize_int8(v)
+            else:
+                self._matrix[pos] = v
+            self._ids[pos] = dream_id
+            self._days[pos] = day_ordinal(date)
+            self._positions[dream_id] = pos
+            self._count += 1
+
+            if self.approximate:
+                if self._centroids is not None:
+                    self._assign_to_list(pos)
+                elif self._count >= self.train_threshold:
+                    self._train_ivf()
+        return True
+
+    def add_many(self, ids, vecs, dates=None) -> int:
+        dates = dates if dates is not None else [None] * len(ids)
+        return sum(1 for i, v, d in zip(ids, vecs, dates) if self.add(i, v, d))
+
+    # -------------------------
+    # IVF (APROXIMATIV)
+    # -------------------------
+    def _train_ivf(self, iterations: int = 10, sample_size: int = 50000):
+        n = self._count
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = self._rows(self._matrix, self._scales, rng.choice(n, size=min(n, sample_size), replace=False))
+        centroids = sample[rng.choice(len(sample), size=min(nlist, len(sample)), replace=False)].copy()
+
+        # K-means sferic: asignare după produs scalar, centroizi re-normalizați
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = normalize(members.sum(axis=0))
+
+        self._centroids = centroids
+        self._lists = [[] for _ in range(len(centroids))]
+        for start in range(0, n, SCAN_CHUNK_ROWS):
+            block = self._rows(self._matrix, self._scales, slice(start, min(n, start + SCAN_CHUNK_ROWS)))
+            for pos, c in enumerate(np.argmax(block @ centroids.T, axis=1), start):
+                self._lists[int(c)].append(pos)
+
+    def _assign_to_list(self, pos: int):
+        row = self._rows(self._matrix, self._scales, slice(pos, pos + 1))[0]
+        c = int(np.argmax(self._centroids @ row))
+        self._lists[c].append(pos)
+
+    def _candidate_positions(self, q: np.ndarray):
+        probes = np.argsort(self._centroids @ q)[::-1][:self.nprobe]
+        lists = [self._lists[int(c)] for c in probes]
+        return np.fromiter((p for l in lists for p in l), dtype=np.int64)
+
+    # -------------------------
+    # SCORURI PE VECTORI COMPACȚI + RE-RANKING
+    # -------------------------
+    @staticmethod
+    def _rows(matrix, scales, sel) -> np.ndarray:
+        """Rândurile `sel` (slice sau poziții) ca float32."""
+        rows = matrix[sel].astype(np.float32, copy=False)
+        if scales is not None:
+            rows = rows * scales[sel][:, None]
+        return rows
+
+    def _scan(self, matrix, scales, sel, q: np.ndarray) -> np.ndarray:
+        """Scorurile pentru `sel` (slice sau poziții). Stocarea compactă e convertită pe bucăți."""
+        if matrix.dtype == np.float32:
+            return matrix[sel] @ q
+        if isinstance(sel, slice):
+            chunks = [slice(i, min(sel.stop, i + SCAN_CHUNK_ROWS)) for i in range(sel.start, sel.stop, SCAN_CHUNK_ROWS)]
+        else:
+            chunks = [sel[i:i + SCAN_CHUNK_ROWS] for i in range(0, len(sel), SCAN_CHUNK_ROWS)]
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        # Scala se aplică pe scor (un vector), nu pe fiecare componentă a rândului
+        scores = np.concatenate([matrix[c].astype(np.float32) @ q for c in chunks])
+        if scales is not None:
+            scores *= scales[sel]
+        return scores
+
+    def _error_bound(self, scales, sel, q: np.ndarray):
+        """Cât poate diferi scorul compact de cel float32 (scalar sau per rând)."""
+        if self.storage == "float16":
+            return FLOAT16_RELATIVE_ERROR + SCORE_EPSILON
+        # int8: |Δ| ≤ Σ |q_j| * scală / 2
+        return scales[sel] * (0.5 * float(np.abs(q).sum())) + SCORE_EPSILON
+
+    def _refine(self, scores, scales, ids, sel, q, cutoffs=(), k: int = 0) -> int:
+        """
+        Re-scorează în float32 rândurile care ar putea fi de partea greșită a unui prag
+        din `cutoffs` sau ar putea intra în top-`k`. Modifică `scores` pe loc.
+        """
+        if self.storage == "float32" or self.rerank is None or scores.shape[0] == 0:
+            return 0
+        error = self._error_bound(scales, sel, q)
+        near = np.zeros(scores.shape[0], dtype=bool)
+        for cutoff in cutoffs:
+            near |= np.abs(scores - cutoff) <= error
+        if k > 0:
+            # Orice rând al cărui scor maxim posibil ajunge la al k-lea scor minim garantat
+            lower = scores - error
+            kth_lower = np.partition(lower, -k)[-k]
+            near |= scores + error >= kth_lower
+        slots = np.flatnonzero(near)
+        if slots.size == 0:
+            return 0
+
+        positions = slots + sel.start if isinstance(sel, slice) else sel[slots]
+        slot_ids = ids[positions].tolist()
+        exact = self.rerank(slot_ids)
+        refined = 0
+        for slot, dream_id in zip(slots, slot_ids):
+            vec = exact.get(dream_id)
+            if vec is None:
+                continue  # fără vector float32 (ex: vis șters) rămâne scorul aproximativ
+            v = normalize(vec)
+            if v.shape[0] == self.dim:
+                scores[slot] = float(v @ q)
+                refined += 1
+        return refined
+
+    # -------------------------
+    # CITIRE
+    # -------------------------
+    def query(self, vec, k: int = 1, thresholds=(), day=None, window_days: int = 2,
+              temporal_threshold: float = None) -> dict:
+        """
+        Un singur produs matrice-vector peste tot corpusul.
+        Returnează top-k (id, scor, dată), numărul de scoruri > fiecare prag și,
+        dacă primim `day` + `temporal_threshold`, câte vise cu scor > prag sunt
+        la cel mult `window_days` zile distanță (mască vectorizată pe ordinalele int32).
+        """
+        q = normalize(vec)
+        with self._lock:
+            n = self._count
+            matrix, ids, days, scales = self._matrix, self._ids, self._days, self._scales
+            use_ivf = self.approximate and self._centroids is not None
+            candidates = self._candidate_positions(q) if use_ivf else None
+
+        if q.shape[0] != self.dim:
+            raise ValueError(f"Dimensiune query {q.shape[0]} != index {self.dim}")
+
+        if n == 0:
+            return {"ids": [], "scores": [], "dates": [], "counts": [0] * len(thresholds), "temporal_count": 0}
+
+        positions = candidates
+        sel = slice(0, n) if positions is None else positions
+        scores = self._scan(matrix, scales, sel, q)
+
+        target = day_ordinal(day)
+        use_temporal = temporal_threshold is not None and target != NO_DAY
+        k = min(k, scores.shape[0])
+
+        # Stocare compactă: scorurile de la limită (praguri / top-k) devin exacte
+        cutoffs = tuple(thresholds)
+        if use_temporal and positions is None:
+            cutoffs += (temporal_threshold,)
+        self._refine(scores, scales, ids, sel, q, cutoffs=cutoffs, k=k)
+
+        if k == 1:
+            top = np.array([int(np.argmax(scores))], dtype=np.int64)
+        elif k > 0:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.zeros(0, dtype=np.int64)
+        top_pos = top if positions is None else positions[top]
+
+        counts = [int(np.count_nonzero(scores > t)) for t in thresholds]
+
+        temporal_count = 0
+        if use_temporal:
+            window = (days[:n] != NO_DAY) & (np.abs(days[:n] - target) <= window_days)
+            if positions is None:
+                temporal_count = int(np.count_nonzero(window & (scores > temporal_threshold)))
+            else:
+                # IVF: fereastra de zile e mică -> o scorăm exact, nu doar listele sondate
+                in_window = np.flatnonzero(window)
+                if in_window.size:
+                    window_scores = self._scan(matrix, scales, in_window, q)
+                    self._refine(window_scores, scales, ids, in_window, q, cutoffs=(temporal_threshold,))
+                    temporal_count = int(np.count_nonzero(window_scores > temporal_threshold))
+
+        top_days = days[top_pos]
+        return {
+            "ids": ids[top_pos].tolist(),
+            "scores": scores[top].tolist(),
+            "dates": [date.fromordinal(int(d)) if d != NO_DAY else None for d in top_days],
+            "counts": counts,
+            "temporal_count": temporal_count,
+        }
+
+    def search(self, vec, k: int = 10):
+        """Top-k (id, scor)."""
+        result = self.query(vec, k=k)
+        return list(zip(result["ids"], result["scores"]))
+
+    def count_above(self, vec, thresholds):
+        """Câte scoruri depășesc fiecare prag."""
+        return self.query(vec, k=0, thresholds=thresholds)["counts"]
+
+
+def index_from_env(dim: int, rerank=None, model: str = None, database: str = None) -> VectorIndex:
+    """
+    SIMILARITY_INDEX_MODE=exact (implicit), ivf, sharded sau snapshot.
+    Pentru ivf: SIMILARITY_IVF_NLIST, SIMILARITY_IVF_NPROBE, SIMILARITY_IVF_TRAIN_AT.
+    Pentru sharded: SIMILARITY_SHARDS (implicit nr. de core-uri), SIMILARITY_SHARD_MIN_ROWS.
+    Pentru snapshot: SIMILARITY_SNAPSHOT_DIR (fișiere partajate de toți workerii, per `model` și
+    `database`; `rerank` verifică la deschidere că vectorii corespund DB-ului).
+    SIMILARITY_INDEX_STORAGE=float32 (implicit), float16 sau int8; `rerank` dă vectorii float32.
+    """
+    mode = os.getenv("SIMILARITY_INDEX_MODE", "exact").lower()
+    storage = os.getenv("SIMILARITY_INDEX_STORAGE", "float32").lower()
+    if mode in ("sharded", "snapshot") and storage != "float32":
+        logger.warning("⚠️ Indexul %s stochează doar float32 (SIMILARITY_INDEX_STORAGE=%s ignorat).", mode, storage)
+    if mode == "snapshot":
+        from snapshot import open_snapshot
+        return open_snapshot(dim, model or "unknown", database=database, verify=rerank)
+    if mode == "sharded":
+        from sharded_index import ShardedVectorIndex
+        shards = os.getenv("SIMILARITY_SHARDS")
+        return ShardedVectorIndex(
+            dim,
+            shards=int(shards) if shards else None,
+            min_rows_parallel=int(os.getenv("SIMILARITY_SHARD_MIN_ROWS", "50000")),
+        )
+    if mode == "ivf":
+        nlist = os.getenv("SIMILARITY_IVF_NLIST")
+        return VectorIndex(
+            dim,
+            approximate=True,
+            nlist=int(nlist) if nlist else None,
+            nprobe=int(os.getenv("SIMILARITY_IVF_NPROBE", "8")),
+            train_threshold=int(os.getenv("SIMILARITY_IVF_TRAIN_AT", "20000")),
+            storage=storage,
+            rerank=rerank,
+        )
+    return VectorIndex(dim, storage=storage, rerank=rerank)